@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -86,6 +88,44 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Swap in a shared backend (Redis/Memcached) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nairobi-jet-house',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,  # least recently used entries are culled beyond this
+        },
+    }
+}
+
+# Seconds an aircraft search result is reused for identical searches
+SEARCH_CACHE_TIMEOUT = 300
+
+# Seconds an aircraft stays held for a client filling in the booking form
+BOOKING_HOLD_TTL_SECONDS = 600
+
+# Seconds a search result's quoted price can be booked at
+QUOTE_TTL_SECONDS = 1800
+
+# Delivery attempts of a queued email before send_outbox_emails marks it failed
+OUTBOX_MAX_ATTEMPTS = 8
+
+# Seconds a response to an Idempotency-Key is replayed to retries of the same submission
+IDEMPOTENCY_TTL_SECONDS = 86400
+
+# Memory-mapped airport distance matrix shared by all workers
+# (build it with `python manage.py build_distance_matrix`)
+AIRPORT_DISTANCE_MATRIX_PATH = BASE_DIR / 'var' / 'airport_distances.bin'
+if sys.argv[1:2] == ['test']:
+    # Tests create and delete airports; keep their writes out of the real matrix
+    AIRPORT_DISTANCE_MATRIX_PATH = Path(tempfile.mkdtemp(prefix='airport_distances_')) / 'airport_distances.bin'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
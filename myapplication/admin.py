@@ -1,14 +1,35 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Count, Sum
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .codes import typed_code
 from .models import (
     User, AircraftType, Aircraft, AircraftImage, Airport, 
     Availability, Booking, FlightLeg, PricingRule, 
-    ClientPreferences, OwnerPayout, AircraftTracking ,Passenger
+    ClientPreferences, OwnerPayout, AircraftTracking ,Passenger, Quote, Season, OutboxEmail, IdempotencyRecord
 )
+from .spatial import airport_index
+
+
+class CodeSearchMixin:
+    """
+    Admin search that finds a record by a booking, passenger or inquiry code
+    however it was typed (lower case, hyphens, I/L/O for 1/0): a search term
+    that is a valid code is matched exactly on code_search_fields.
+    """
+    code_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        code = typed_code(search_term)
+        if code is None:
+            return super().get_search_results(request, queryset, search_term)
+        query = Q()
+        for field in self.code_search_fields:
+            query |= Q(**{field: code})
+        return queryset.filter(query), False
 
 
 @admin.register(User)
@@ -171,7 +192,7 @@ class AirportAdmin(admin.ModelAdmin):
     list_display = ('icao_code', 'iata_code', 'name', 'city', 'country', 'is_private_aviation_friendly', 'departure_count', 'arrival_count')
     list_filter = ('country', 'is_private_aviation_friendly')
     search_fields = ('icao_code', 'iata_code', 'name', 'city', 'country')
-    readonly_fields = ('departure_count', 'arrival_count')
+    readonly_fields = ('departure_count', 'arrival_count', 'nearby_airports')
     
     def departure_count(self, obj):
         return obj.departing_flights.count()
@@ -180,6 +201,16 @@ class AirportAdmin(admin.ModelAdmin):
     def arrival_count(self, obj):
         return obj.arriving_flights.count()
     arrival_count.short_description = 'Arrivals'
+    
+    def nearby_airports(self, obj):
+        if obj.pk is None:
+            return '-'
+        nearest = airport_index.nearest(obj.latitude, obj.longitude, k=6)
+        return format_html_join(
+            mark_safe('<br>'), '{} - {} ({} nm)',
+            ((airport.icao_code, airport.name, f"{distance:.0f}") for airport, distance in nearest if airport.id != obj.pk)
+        ) or '-'
+    nearby_airports.short_description = 'Nearest Airports'
 
 
 @admin.register(Availability)
@@ -204,7 +235,7 @@ class FlightLegInline(admin.TabularInline):
     ordering = ('sequence',)
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(CodeSearchMixin, admin.ModelAdmin):
     """Booking Admin"""
     list_display = (
         'id', 'client', 'aircraft', 'trip_type', 'status',
@@ -219,6 +250,7 @@ class BookingAdmin(admin.ModelAdmin):
         'client__username', 'client__email',
         'aircraft__registration_number', 'id', 'booking_order_id'
     )
+    code_search_fields = ('booking_order_id',)
     readonly_fields = (
         'created_at', 'updated_at',
         'flight_legs_count', 'total_flight_hours',
@@ -274,22 +306,71 @@ class BookingAdmin(admin.ModelAdmin):
 
 
 @admin.register(FlightLeg)
-class FlightLegAdmin(admin.ModelAdmin):
+class FlightLegAdmin(CodeSearchMixin, admin.ModelAdmin):
     """Flight Leg Admin"""
     list_display = ('booking', 'sequence', 'departure_airport', 'arrival_airport', 'departure_datetime', 'flight_hours', 'passenger_count', 'leg_price')
     list_filter = ('departure_datetime', 'departure_airport__country', 'arrival_airport__country')
     search_fields = ('booking__id', 'departure_airport__icao_code', 'arrival_airport__icao_code')
+    code_search_fields = ('booking__booking_order_id',)
     date_hierarchy = 'departure_datetime'
 
 
+@admin.register(Quote)
+class QuoteAdmin(admin.ModelAdmin):
+    """Quote Admin: prices shown in searches and the bookings made from them"""
+    list_display = ('id', 'aircraft', 'departure_airport', 'arrival_airport', 'departure_datetime', 'trip_type', 'total_price', 'created_at', 'expires_at', 'booking')
+    list_filter = ('trip_type', 'is_empty_leg', ('booking', admin.EmptyFieldListFilter), 'created_at')
+    search_fields = ('id', 'aircraft__registration_number', 'departure_airport__icao_code', 'arrival_airport__icao_code')
+    date_hierarchy = 'created_at'
+    raw_id_fields = ('aircraft', 'departure_airport', 'arrival_airport', 'created_by', 'booking')
+    readonly_fields = ('rule_version', 'created_at')
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Outbox Email Admin: queued, sent and failed emails"""
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipients')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now(), claim_token=None)
+        self.message_user(request, f"{updated} emails queued to be sent again.")
+    retry_now.short_description = "Send selected emails again"
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    """Idempotency Record Admin: responses replayed to retried submissions"""
+    list_display = ('scope', 'key', 'user', 'status_code', 'created_at', 'expires_at')
+    list_filter = ('scope', 'created_at')
+    search_fields = ('key', 'user__username', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('fingerprint', 'created_at')
+
+
 @admin.register(PricingRule)
 class PricingRuleAdmin(admin.ModelAdmin):
     """Pricing Rule Admin"""
-    list_display = ('aircraft_type', 'base_hourly_rate', 'minimum_hours', 'empty_leg_discount', 'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge')
+    list_display = ('aircraft_type', 'base_hourly_rate', 'minimum_hours', 'empty_leg_discount', 'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge', 'agent_commission_rate')
     list_filter = ('aircraft_type',)
     search_fields = ('aircraft_type__name',)
 
 
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    """Season Admin: peak pricing periods"""
+    list_display = ('name', 'region', 'start_date', 'end_date', 'multiplier', 'is_active')
+    list_filter = ('is_active', 'region')
+    list_editable = ('is_active',)
+    search_fields = ('name', 'region')
+    date_hierarchy = 'start_date'
+
+
 @admin.register(ClientPreferences)
 class ClientPreferencesAdmin(admin.ModelAdmin):
     """Client Preferences Admin"""
@@ -305,11 +386,12 @@ class ClientPreferencesAdmin(admin.ModelAdmin):
 
 
 @admin.register(OwnerPayout)
-class OwnerPayoutAdmin(admin.ModelAdmin):
+class OwnerPayoutAdmin(CodeSearchMixin, admin.ModelAdmin):
     """Owner Payout Admin"""
     list_display = ('owner', 'booking', 'amount', 'payout_date', 'status', 'transaction_reference')
     list_filter = ('status', 'payout_date')
     search_fields = ('owner__username', 'booking__id', 'transaction_reference')
+    code_search_fields = ('booking__booking_order_id',)
     readonly_fields = ('booking_link',)
     date_hierarchy = 'payout_date'
     
@@ -355,9 +437,10 @@ class AircraftTrackingAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('aircraft')
 
 @admin.register(Passenger)
-class PassengerAdmin(admin.ModelAdmin):
+class PassengerAdmin(CodeSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'passport_number', 'nationality', 'date_of_birth', 'booking')
     search_fields = ('name', 'passport_number', 'nationality')
+    code_search_fields = ('order', 'booking__booking_order_id')
     list_filter = ('nationality', 'booking')
 
 
@@ -377,12 +460,13 @@ class AirCargoRequestAdmin(admin.ModelAdmin):
 
 
 @admin.register(AircraftLeasingInquiry)
-class AircraftLeasingInquiryAdmin(admin.ModelAdmin):
+class AircraftLeasingInquiryAdmin(CodeSearchMixin, admin.ModelAdmin):
     list_display = (
         'inquiry_code' , 'leasing_type', 'name', 'email', 'telephone', 'created_at'
     )
     list_filter = ('leasing_type', 'created_at')
     search_fields = ('name', 'email', 'company')
+    code_search_fields = ('inquiry_code',)
     readonly_fields = ('created_at',)
 
 from django.contrib import admin
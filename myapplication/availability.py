@@ -0,0 +1,284 @@
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Availability, FlightLeg
+
+# Booking statuses whose flight legs occupy the aircraft
+BUSY_BOOKING_STATUSES = ('confirmed', 'pending')
+
+# Per-day statuses reported by daily_availability
+DAY_STATUS_LABELS = {
+    'unrestricted': 'Available (no restrictions)',
+    'open': 'Available',
+    'limited': 'Limited availability',
+    'blocked': 'Unavailable',
+    'booked': 'Booked',
+    'return_unavailable': 'Return date unavailable',
+}
+AVAILABLE_DAY_STATUSES = ('unrestricted', 'open', 'limited')
+
+
+def make_aware(moment):
+    """Interpret naive datetimes (e.g. from AJAX payloads) in the current timezone"""
+    if timezone.is_naive(moment):
+        return timezone.make_aware(moment)
+    return moment
+
+
+def fetch_intervals(aircraft_ids, start=None, end=None):
+    """
+    Fetch busy flight legs and availability windows for several aircraft in a
+    single UNION query, optionally limited to rows overlapping [start, end].
+
+    Yields (aircraft_id, booking_id, start, end, kind) rows where kind is
+    'busy', 'open' or 'closed'. booking_id is 0 for availability windows.
+    """
+    legs = FlightLeg.objects.filter(
+        booking__aircraft_id__in=aircraft_ids,
+        booking__status__in=BUSY_BOOKING_STATUSES,
+    )
+    windows = Availability.objects.filter(aircraft_id__in=aircraft_ids)
+    if start is not None:
+        legs = legs.filter(arrival_datetime__gt=start)
+        windows = windows.filter(end_datetime__gte=start)
+    if end is not None:
+        legs = legs.filter(departure_datetime__lt=end)
+        windows = windows.filter(start_datetime__lte=end)
+
+    legs = legs.order_by().annotate(
+        owner=F('booking__aircraft_id'),
+        ref=F('booking_id'),
+        span_start=F('departure_datetime'),
+        span_end=F('arrival_datetime'),
+        kind=Value('busy', output_field=CharField()),
+    ).values_list('owner', 'ref', 'span_start', 'span_end', 'kind')
+    windows = windows.order_by().annotate(
+        owner=F('aircraft_id'),
+        ref=Value(0, output_field=IntegerField()),
+        span_start=F('start_datetime'),
+        span_end=F('end_datetime'),
+        kind=Case(
+            When(is_available=True, then=Value('open')),
+            default=Value('closed'),
+            output_field=CharField(),
+        ),
+    ).values_list('owner', 'ref', 'span_start', 'span_end', 'kind')
+
+    return legs.union(windows, all=True)
+
+
+def daily_availability(aircraft_ids, first_day_start, days):
+    """
+    Work out the availability of several aircraft for `days` consecutive days
+    starting at local midnight `first_day_start`.
+
+    All rows come from one range fetch; each interval is then swept onto the
+    days it touches with difference arrays, so the cost is linear in rows plus
+    days rather than a query per aircraft per day. Day semantics match the
+    single-day search: blocking windows and flight legs must overlap the day,
+    while any window touching the day decides between open and limited.
+
+    Returns {aircraft_id: [status, ...]} with keys of DAY_STATUS_LABELS.
+    """
+    span = timedelta(days=1).total_seconds()
+    last_second = span - 1
+
+    def day_range(start, end, strict):
+        offset_start = (start - first_day_start).total_seconds()
+        offset_end = (end - first_day_start).total_seconds()
+        if strict:
+            first = math.floor((offset_start - last_second) / span) + 1
+            last = math.ceil(offset_end / span) - 1
+        else:
+            first = math.ceil((offset_start - last_second) / span)
+            last = math.floor(offset_end / span)
+        return max(first, 0), min(last, days - 1)
+
+    counters = {
+        aircraft_id: {kind: [0] * (days + 1) for kind in ('booked', 'blocked', 'touched', 'open')}
+        for aircraft_id in aircraft_ids
+    }
+
+    def mark(counter, first, last):
+        if first <= last:
+            counter[first] += 1
+            counter[last + 1] -= 1
+
+    window_end = first_day_start + timedelta(days=days)
+    for aircraft_id, _, start, end, kind in fetch_intervals(aircraft_ids, first_day_start, window_end):
+        counter = counters[aircraft_id]
+        if kind == 'busy':
+            mark(counter['booked'], *day_range(start, end, strict=True))
+            continue
+        mark(counter['touched'], *day_range(start, end, strict=False))
+        if kind == 'open':
+            mark(counter['open'], *day_range(start, end, strict=False))
+        else:
+            mark(counter['blocked'], *day_range(start, end, strict=True))
+
+    result = {}
+    for aircraft_id, counter in counters.items():
+        running = dict.fromkeys(counter, 0)
+        statuses = []
+        for day in range(days):
+            for kind in running:
+                running[kind] += counter[kind][day]
+            if running['blocked']:
+                statuses.append('blocked')
+            elif running['booked']:
+                statuses.append('booked')
+            elif running['open']:
+                statuses.append('open')
+            elif running['touched']:
+                statuses.append('limited')
+            else:
+                statuses.append('unrestricted')
+        result[aircraft_id] = statuses
+    return result
+
+
+class IntervalSet:
+    """
+    Intervals sorted by start with a running maximum of their end times, so
+    overlap and containment questions are answered with a single bisect.
+    """
+    __slots__ = ('starts', 'max_ends')
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.starts = [start for start, _ in pairs]
+        self.max_ends = []
+        running = None
+        for _, end in pairs:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start, end):
+        """True if any interval intersects the open range (start, end)"""
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] > start
+
+    def covers(self, start, end):
+        """True if a single interval contains the closed range [start, end]"""
+        i = bisect_right(self.starts, start)
+        return i > 0 and self.max_ends[i - 1] >= end
+
+
+class AircraftSchedule:
+    """Busy intervals and availability windows of one aircraft"""
+    __slots__ = ('busy', 'open', 'has_windows', 'loaded_at')
+
+    def __init__(self, busy, open_windows, has_windows):
+        self.busy = IntervalSet(busy)
+        self.open = IntervalSet(open_windows)
+        self.has_windows = has_windows
+        self.loaded_at = time.monotonic()
+
+    def check_legs(self, flight_legs):
+        """
+        Check that the aircraft is free for every leg
+        Returns: (is_available, message)
+        """
+        for leg in flight_legs:
+            departure_time = make_aware(leg['departure_datetime'])
+            arrival_time = make_aware(leg['arrival_datetime'])
+
+            if self.busy.overlaps(departure_time, arrival_time):
+                return False, f"Aircraft not available from {departure_time} to {arrival_time}"
+
+            # If availability records exist, aircraft must be in an available window
+            if self.has_windows and not self.open.covers(departure_time, arrival_time):
+                return False, f"Aircraft not in available window for {departure_time} to {arrival_time}"
+
+        return True, "Aircraft is available"
+
+
+class AvailabilityIndex:
+    """
+    In-process index of per-aircraft schedules used for booking conflict checks.
+
+    Entries are dropped by the FlightLeg/Availability/Booking signals in
+    signals.py and reloaded on demand with one batched query. Entries also
+    expire after `max_age` seconds so changes made by other worker processes
+    are picked up.
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self._schedules = {}
+        self._booking_owner = {}
+        self._lock = threading.Lock()
+
+    def schedules(self, aircraft_ids, refresh=False):
+        """Return {aircraft_id: AircraftSchedule}, loading cold entries in one query"""
+        now = time.monotonic()
+        with self._lock:
+            found = {
+                aircraft_id: self._schedules[aircraft_id]
+                for aircraft_id in aircraft_ids
+                if not refresh
+                and aircraft_id in self._schedules
+                and now - self._schedules[aircraft_id].loaded_at < self.max_age
+            }
+        missing = [aircraft_id for aircraft_id in aircraft_ids if aircraft_id not in found]
+        if missing:
+            found.update(self._load(missing))
+        return found
+
+    def schedule(self, aircraft_id, refresh=False):
+        return self.schedules([aircraft_id], refresh=refresh)[aircraft_id]
+
+    def check(self, aircraft_id, flight_legs, refresh=False):
+        return self.schedule(aircraft_id, refresh=refresh).check_legs(flight_legs)
+
+    def invalidate(self, aircraft_id):
+        with self._lock:
+            self._schedules.pop(aircraft_id, None)
+
+    def invalidate_booking(self, booking_id, aircraft_id=None):
+        """Drop the schedules that contain, or will contain, a booking's legs"""
+        with self._lock:
+            previous = self._booking_owner.pop(booking_id, None)
+            for owner in {previous, aircraft_id}:
+                self._schedules.pop(owner, None)
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+            self._booking_owner.clear()
+
+    def _load(self, aircraft_ids):
+        busy = {aircraft_id: [] for aircraft_id in aircraft_ids}
+        open_windows = {aircraft_id: [] for aircraft_id in aircraft_ids}
+        has_windows = dict.fromkeys(aircraft_ids, False)
+        owners = {}
+
+        for aircraft_id, booking_id, start, end, kind in fetch_intervals(aircraft_ids):
+            if kind == 'busy':
+                busy[aircraft_id].append((start, end))
+                owners[booking_id] = aircraft_id
+            else:
+                has_windows[aircraft_id] = True
+                if kind == 'open':
+                    open_windows[aircraft_id].append((start, end))
+
+        loaded = {
+            aircraft_id: AircraftSchedule(busy[aircraft_id], open_windows[aircraft_id], has_windows[aircraft_id])
+            for aircraft_id in aircraft_ids
+        }
+        with self._lock:
+            self._schedules.update(loaded)
+            self._booking_owner.update(owners)
+        return loaded
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,31 @@
+from . import fleet_calendar
+from . import search_cache
+from .availability import availability_index
+from .codes import insert_with_codes
+from .models import FlightLeg, Passenger
+
+
+def save_legs_and_passengers(booking, legs, passengers):
+    """
+    Insert a new booking's FlightLegs and Passengers (unsaved instances,
+    booking and order codes are filled in) with one bulk_create each.
+    Returns the saved legs.
+
+    bulk_create skips the FlightLeg post_save handlers, so the availability
+    index, search cache and fleet calendar are refreshed here, once for all
+    legs, the way signals.py does per leg.
+    """
+    for leg in legs:
+        leg.booking = booking
+    for passenger, order in zip(passengers, Passenger.generate_order_codes(len(passengers))):
+        passenger.booking = booking
+        passenger.order = order
+
+    legs = FlightLeg.objects.bulk_create(legs)
+    insert_with_codes(lambda: Passenger.objects.bulk_create(passengers), passengers, 'order')
+
+    spans = [(leg.departure_datetime, leg.arrival_datetime) for leg in legs]
+    availability_index.invalidate_booking(booking.pk, booking.aircraft_id)
+    search_cache.invalidate_span(*spans)
+    fleet_calendar.refresh_calendar(booking.aircraft_id, *spans)
+    return legs
@@ -0,0 +1,82 @@
+import secrets
+
+from django.db import IntegrityError, transaction
+
+# Crockford base32: no I, L, O or U, so codes read back over the phone unambiguously
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+VALUES = {symbol: value for value, symbol in enumerate(ALPHABET)}
+READ_AS = str.maketrans({'I': '1', 'L': '1', 'O': '0'})
+
+# Codes are CODE_LENGTH symbols: random ones, then a check symbol
+CODE_LENGTH = 10
+RANDOM_SYMBOLS = CODE_LENGTH - 1
+
+# The check symbol is the position-weighted sum of the others modulo 37, a prime
+# above the alphabet size, so any single mistyped symbol or two swapped neighbours
+# change it. Crockford's five extra symbols stand for check values 32-36.
+CHECK_MODULUS = 37
+CHECK_SYMBOLS = ALPHABET + '*~$=U'
+
+# Draws before giving up on a unique constraint; with 45 random bits even a
+# million issued codes leave a new code a one in tens of millions collision
+COLLISION_ATTEMPTS = 5
+
+
+def check_symbol(body):
+    return CHECK_SYMBOLS[sum(weight * VALUES[symbol] for weight, symbol in enumerate(body, start=1)) % CHECK_MODULUS]
+
+
+def new_code():
+    """A random code from the OS CSPRNG; uniqueness is left to the column's unique constraint"""
+    value = secrets.randbelow(len(ALPHABET) ** RANDOM_SYMBOLS)
+    body = ''
+    for _ in range(RANDOM_SYMBOLS):
+        value, index = divmod(value, len(ALPHABET))
+        body += ALPHABET[index]
+    return body + check_symbol(body)
+
+
+def new_codes(count):
+    """`count` codes at once, without touching the database"""
+    return [new_code() for _ in range(count)]
+
+
+def normalize_code(code):
+    """Upper-case a typed code, drop spaces and hyphens and read I, L and O as 1 and 0"""
+    return code.strip().upper().replace('-', '').replace(' ', '').translate(READ_AS)
+
+
+def is_valid_code(code):
+    """Whether a (normalized) code was issued by new_code; older codes have no check symbol"""
+    return (
+        len(code) == CODE_LENGTH
+        and all(symbol in VALUES for symbol in code[:-1])
+        and check_symbol(code[:-1]) == code[-1]
+    )
+
+
+def typed_code(term):
+    """
+    The code in a search term typed by staff or read out by a client, if it
+    is one new_code issued: normalized, so it can be matched exactly instead
+    of by substring. None otherwise, including for a code with a typo.
+    """
+    code = normalize_code(term or '')
+    return code if is_valid_code(code) else None
+
+
+def insert_with_codes(insert, instances, field):
+    """
+    Run insert() (a save() or bulk_create of `instances`) in a savepoint and,
+    if a unique constraint rejects it, give every instance a fresh code in
+    `field` and try again. Returns what insert() returns.
+    """
+    for attempt in range(COLLISION_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return insert()
+        except IntegrityError as e:
+            if field not in str(e) or attempt == COLLISION_ATTEMPTS - 1:
+                raise
+            for instance in instances:
+                setattr(instance, field, new_code())
@@ -0,0 +1,241 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+from .geo import airport_coordinates, distances_from, point_from_radians
+from .models import Airport
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+# File layout: header, `capacity` fixed-width ICAO codes, then a capacity x capacity
+# row-major float32 matrix of great-circle distances in nautical miles.
+HEADER = struct.Struct('<8sIII')  # magic, airport count, capacity, revision
+MAGIC = b'NJHDIST1'
+CODE_SIZE = 8
+FLOAT_SIZE = 4
+
+
+def matrix_offset(capacity):
+    return HEADER.size + capacity * CODE_SIZE
+
+
+class DistanceMatrix:
+    """
+    Precomputed pairwise airport distances in a memory-mapped float32 file.
+
+    Every worker process maps the same file read-only, so the matrix is shared
+    through the page cache and a lookup is two dict reads and one array read.
+    Airport signals in signals.py update single rows and columns in place;
+    spare capacity lets new airports be added without a rebuild. Distances
+    are seen by other workers at once; added or removed airports and full
+    rebuilds within `check_interval` seconds (via the header revision).
+
+    Pairs missing from the file (no file yet, airport added elsewhere in the
+    last few seconds) fall back to computing the distance from the cached
+    airport coordinates.
+    """
+
+    def __init__(self, path=None, check_interval=5):
+        self._path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    @property
+    def path(self):
+        return str(self._path or settings.AIRPORT_DISTANCE_MATRIX_PATH)
+
+    def _reset(self):
+        self._view = None
+        self._index = {}
+        self._capacity = 0
+        self._revision = None
+        self._identity = None
+        self._checked_at = 0
+
+    def _current(self):
+        """Return (view, index, capacity), remapping the file if it was replaced or grew"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return self._view, self._index, self._capacity
+            self._checked_at = now
+
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                self._checked_at = now
+                return None, {}, 0
+
+            identity = (stat.st_ino, stat.st_size)
+            if identity != self._identity:
+                with open(self.path, 'rb') as matrix_file:
+                    mapped = mmap.mmap(matrix_file.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, _, capacity, _ = HEADER.unpack_from(mapped, 0)
+                if magic != MAGIC:
+                    raise ValueError(f'{self.path} is not an airport distance matrix')
+                self._identity = identity
+                self._mapped = mapped
+                self._capacity = capacity
+                self._revision = None
+                self._view = memoryview(mapped)[matrix_offset(capacity):].cast('f')
+
+            _, count, _, revision = HEADER.unpack_from(self._mapped, 0)
+            if revision != self._revision:
+                self._revision = revision
+                self._index = read_codes(self._mapped, count)
+            return self._view, self._index, self._capacity
+
+    def distance_nm(self, departure_icao, arrival_icao):
+        """Great-circle distance in nautical miles, or None for unknown airports"""
+        view, index, capacity = self._current()
+        i, j = index.get(departure_icao), index.get(arrival_icao)
+        if i is not None and j is not None:
+            return float(view[i * capacity + j])
+
+        origin, destination = airport_coordinates.get(departure_icao), airport_coordinates.get(arrival_icao)
+        if origin is None or destination is None:
+            return None
+        return distances_from(origin, [destination])[0]
+
+    def build(self):
+        """Rebuild the whole file from the Airport table and swap it in atomically"""
+        points = {
+            icao: point_from_radians(latitude, longitude)
+            for icao, latitude, longitude in Airport.objects.values_list('icao_code', 'latitude_radians', 'longitude_radians')
+        }
+        codes = list(points)
+        coordinates = [points[code] for code in codes]
+        capacity = len(codes) + max(16, len(codes) // 4)
+        padding = array('f', [0.0]) * (capacity - len(codes))
+
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as matrix_file:
+                matrix_file.write(HEADER.pack(MAGIC, len(codes), capacity, 0))
+                matrix_file.write(b''.join(encode_code(code) for code in codes))
+                matrix_file.write(b'\0' * CODE_SIZE * (capacity - len(codes)))
+                for origin in coordinates:
+                    row = array('f', distances_from(origin, coordinates))
+                    row.extend(padding)
+                    row.tofile(matrix_file)
+                empty_row = array('f', [0.0]) * capacity
+                for _ in range(capacity - len(codes)):
+                    empty_row.tofile(matrix_file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+        with self._lock:
+            self._reset()
+        return len(codes)
+
+    def update_airport(self, icao_code, point):
+        """
+        Write the row and column of an added or edited airport (at geo `point`) in place.
+        Does nothing until the file has been built; rebuilds the file when it
+        has no spare capacity left.
+        """
+        if not os.path.exists(self.path):
+            return
+        with self._writable() as (mapped, view):
+            _, count, capacity, revision = HEADER.unpack_from(mapped, 0)
+            index = read_codes(mapped, count)
+            slot = index.get(icao_code)
+            if slot is None:
+                if count == capacity:
+                    slot = None
+                else:
+                    slot = count
+                    count += 1
+            if slot is not None:
+                codes = read_codes(mapped, count)
+                points = airport_coordinates.points()
+                others = [(other, position) for other, position in codes.items() if other != icao_code and other in points]
+                distances = distances_from(point, [points[other] for other, _ in others])
+                for (_, position), distance in zip(others, distances):
+                    view[slot * capacity + position] = distance
+                    view[position * capacity + slot] = distance
+                view[slot * capacity + slot] = 0.0
+                write_code(mapped, slot, icao_code)
+                HEADER.pack_into(mapped, 0, MAGIC, count, capacity, revision + 1)
+        if slot is None:
+            self.build()
+        with self._lock:
+            self._checked_at = 0
+
+    def remove_airport(self, icao_code):
+        """Forget a deleted airport; its slot stays unused until the next rebuild"""
+        if not os.path.exists(self.path):
+            return
+        with self._writable() as (mapped, _):
+            _, count, capacity, revision = HEADER.unpack_from(mapped, 0)
+            slot = read_codes(mapped, count).get(icao_code)
+            if slot is not None:
+                write_code(mapped, slot, '')
+                HEADER.pack_into(mapped, 0, MAGIC, count, capacity, revision + 1)
+        with self._lock:
+            self._checked_at = 0
+
+    def _writable(self):
+        return WritableMatrix(self.path)
+
+
+class WritableMatrix:
+    """Context manager mapping the matrix file read-write under an exclusive file lock"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'r+b')
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        self.mapped = mmap.mmap(self.file.fileno(), 0)
+        _, _, capacity, _ = HEADER.unpack_from(self.mapped, 0)
+        self.view = memoryview(self.mapped)[matrix_offset(capacity):].cast('f')
+        return self.mapped, self.view
+
+    def __exit__(self, *exc_info):
+        self.view.release()
+        self.mapped.flush()
+        self.mapped.close()
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def encode_code(code):
+    return code.encode('ascii')[:CODE_SIZE].ljust(CODE_SIZE, b'\0')
+
+
+def write_code(mapped, slot, code):
+    start = HEADER.size + slot * CODE_SIZE
+    mapped[start:start + CODE_SIZE] = encode_code(code)
+
+
+def read_codes(mapped, count):
+    """{icao_code: slot} for the first `count` slots, skipping removed airports"""
+    codes = {}
+    for slot in range(count):
+        start = HEADER.size + slot * CODE_SIZE
+        code = mapped[start:start + CODE_SIZE].rstrip(b'\0').decode('ascii')
+        if code:
+            codes[code] = slot
+    return codes
+
+
+airport_distances = DistanceMatrix()
@@ -0,0 +1,151 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import AVAILABLE_DAY_STATUSES, daily_availability, make_aware
+from .models import Aircraft, AircraftCalendar
+
+# Rolling horizon covered by each calendar (about 18 months)
+CALENDAR_HORIZON_DAYS = 549
+
+
+def day_start(day):
+    """Local midnight at the start of `day`"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def to_bits(data):
+    return int.from_bytes(bytes(data), 'little')
+
+
+def to_bytes(bits, days):
+    return bits.to_bytes((days + 7) // 8, 'little')
+
+
+def day_bits(statuses):
+    """Free and booked bitmaps (as ints) for a list of daily_availability statuses"""
+    free = booked = 0
+    for offset, status in enumerate(statuses):
+        if status in AVAILABLE_DAY_STATUSES:
+            free |= 1 << offset
+        elif status == 'booked':
+            booked |= 1 << offset
+    return free, booked
+
+
+def build_calendars(aircraft_ids, start_date=None):
+    """
+    (Re)build the calendars of several aircraft for the full horizon from
+    start_date (default: today) with one range fetch and one upsert.
+    """
+    start_date = start_date or timezone.localdate()
+    daily = daily_availability(aircraft_ids, day_start(start_date), CALENDAR_HORIZON_DAYS)
+    calendars = []
+    for aircraft_id in aircraft_ids:
+        free, booked = day_bits(daily[aircraft_id])
+        calendars.append(AircraftCalendar(
+            aircraft_id=aircraft_id,
+            start_date=start_date,
+            days=CALENDAR_HORIZON_DAYS,
+            free_days=to_bytes(free, CALENDAR_HORIZON_DAYS),
+            booked_days=to_bytes(booked, CALENDAR_HORIZON_DAYS),
+            updated_at=timezone.now(),
+        ))
+    AircraftCalendar.objects.bulk_create(
+        calendars,
+        update_conflicts=True,
+        unique_fields=['aircraft'],
+        update_fields=['start_date', 'days', 'free_days', 'booked_days', 'updated_at'],
+    )
+    return {calendar.aircraft_id: calendar for calendar in calendars}
+
+
+def refresh_calendar(aircraft_id, *spans):
+    """
+    Recompute only the days of an aircraft's calendar touched by the given
+    (start, end) datetime spans, after a window, leg or booking changed.
+    `None` spans are ignored; days outside the horizon are left alone.
+    The calendar row stays locked from the read to the save, so concurrent
+    refreshes of the same aircraft cannot overwrite each other's days.
+    """
+    with transaction.atomic():
+        calendar = AircraftCalendar.objects.select_for_update().filter(aircraft_id=aircraft_id).first()
+        if calendar is None:
+            build_calendars([aircraft_id])
+            return
+
+        horizon_end = calendar.start_date + timedelta(days=calendar.days - 1)
+        ranges = []
+        for span in spans:
+            if span is None or None in span:
+                continue
+            first = max(timezone.localdate(make_aware(span[0])), calendar.start_date)
+            last = min(timezone.localdate(make_aware(span[1])), horizon_end)
+            if first <= last:
+                ranges.append((first, last))
+        if not ranges:
+            return
+
+        first = min(first for first, _ in ranges)
+        last = max(last for _, last in ranges)
+        statuses = daily_availability([aircraft_id], day_start(first), (last - first).days + 1)[aircraft_id]
+        free, booked = day_bits(statuses)
+
+        # Splice the recomputed days into the stored bitmaps
+        shift = (first - calendar.start_date).days
+        mask = ((1 << len(statuses)) - 1) << shift
+        free_days = (to_bits(calendar.free_days) & ~mask) | (free << shift)
+        booked_days = (to_bits(calendar.booked_days) & ~mask) | (booked << shift)
+        calendar.free_days = to_bytes(free_days, calendar.days)
+        calendar.booked_days = to_bytes(booked_days, calendar.days)
+        calendar.save(update_fields=['free_days', 'booked_days', 'updated_at'])
+
+
+def free_aircraft_ids(days, aircraft_ids=None):
+    """
+    Ids of active aircraft free on every one of `days` (dates), answered with
+    a bitwise AND per aircraft over the stored calendars. Missing or outdated
+    calendars are rebuilt first.
+    """
+    days = sorted(set(days))
+    if not days:
+        return []
+    if aircraft_ids is None:
+        aircraft_ids = list(Aircraft.objects.filter(is_active=True).values_list('id', flat=True))
+
+    calendars = {
+        aircraft_id: (start_date, length, free_days)
+        for aircraft_id, start_date, length, free_days in AircraftCalendar.objects.filter(
+            aircraft_id__in=aircraft_ids
+        ).values_list('aircraft_id', 'start_date', 'days', 'free_days')
+    }
+
+    def covers(calendar):
+        start_date, length, _ = calendar
+        return start_date <= days[0] and (days[-1] - start_date).days < length
+
+    stale = [aircraft_id for aircraft_id in aircraft_ids if aircraft_id not in calendars or not covers(calendars[aircraft_id])]
+    if stale:
+        today = timezone.localdate()
+        if today <= days[0] and (days[-1] - today).days < CALENDAR_HORIZON_DAYS:
+            for aircraft_id, calendar in build_calendars(stale, today).items():
+                calendars[aircraft_id] = (calendar.start_date, calendar.days, calendar.free_days)
+        else:
+            # Dates outside the rolling horizon are answered without touching the stored calendars
+            length = (days[-1] - days[0]).days + 1
+            daily = daily_availability(stale, day_start(days[0]), length)
+            for aircraft_id in stale:
+                free, _ = day_bits(daily[aircraft_id])
+                calendars[aircraft_id] = (days[0], length, to_bytes(free, length))
+
+    masks = {}
+    free = []
+    for aircraft_id in aircraft_ids:
+        start_date, _, free_days = calendars[aircraft_id]
+        if start_date not in masks:
+            masks[start_date] = sum(1 << (day - start_date).days for day in days)
+        mask = masks[start_date]
+        if to_bits(free_days) & mask == mask:
+            free.append(aircraft_id)
+    return free
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+from .distance_matrix import airport_distances
+
+FlightProfile = namedtuple('FlightProfile', 'taxi_minutes climb_minutes climb_speed_knots descent_minutes descent_speed_knots cruise_speed_knots')
+
+# Defaults for aircraft types that leave profile fields blank:
+# (taxi minutes, climb minutes, climb knots, descent minutes, descent knots)
+CATEGORY_PROFILES = {
+    'helicopter': (10, 4, 70, 4, 80),
+    'chopper': (10, 4, 70, 4, 80),
+    'propeller': (12, 12, 150, 12, 170),
+    'jet': (15, 20, 280, 22, 300),
+    'glider': (5, 10, 50, 10, 55),
+}
+DEFAULT_PROFILE = CATEGORY_PROFILES['jet']
+
+# Cruise speed assumed when an aircraft type has none, as in estimate_flight_time
+DEFAULT_CRUISE_SPEED_KNOTS = 400
+
+
+def flight_profile(aircraft_type):
+    """FlightProfile of an aircraft type, filling blank fields from its category"""
+    defaults = CATEGORY_PROFILES.get(aircraft_type.category, DEFAULT_PROFILE)
+    cruise = aircraft_type.speed_knots or DEFAULT_CRUISE_SPEED_KNOTS
+    values = [
+        value if value is not None else default
+        for value, default in zip(
+            (aircraft_type.taxi_minutes, aircraft_type.climb_minutes, aircraft_type.climb_speed_knots,
+             aircraft_type.descent_minutes, aircraft_type.descent_speed_knots),
+            defaults,
+        )
+    ]
+    # Climb and descent are never flown faster than cruise
+    values[2] = min(values[2], cruise)
+    values[4] = min(values[4], cruise)
+    return FlightProfile(*values, cruise)
+
+
+def block_hours(profile, distance_nm):
+    """
+    Taxi-to-taxi hours for one leg of `distance_nm`: climb and descent at
+    their own speeds, the rest at cruise, plus the taxi allowance. Legs too
+    short to reach cruise altitude are flown entirely in climb and descent,
+    scaled down to the distance.
+    """
+    climb_hours, descent_hours = profile.climb_minutes / 60, profile.descent_minutes / 60
+    transition_nm = climb_hours * profile.climb_speed_knots + descent_hours * profile.descent_speed_knots
+    if distance_nm >= transition_nm:
+        airborne = climb_hours + descent_hours + (distance_nm - transition_nm) / profile.cruise_speed_knots
+    else:
+        airborne = (climb_hours + descent_hours) * distance_nm / transition_nm
+    return airborne + profile.taxi_minutes / 60
+
+
+class FlightTimeModel:
+    """
+    Leg times per (aircraft profile, airport pair), kept in an LRU cache.
+
+    The key holds the profile fields themselves, so editing an aircraft type
+    needs no invalidation; the Airport signals in signals.py clear the cache
+    because they can move the distances.
+    """
+
+    def __init__(self, maxsize=8192):
+        self.maxsize = maxsize
+        self._hours = OrderedDict()
+        self._lock = threading.Lock()
+
+    def leg_hours(self, aircraft_type, departure_icao, arrival_icao):
+        """Block hours between two airports rounded to 0.1, or None for unknown airports"""
+        key = (
+            aircraft_type.category, aircraft_type.speed_knots, aircraft_type.taxi_minutes,
+            aircraft_type.climb_minutes, aircraft_type.climb_speed_knots,
+            aircraft_type.descent_minutes, aircraft_type.descent_speed_knots,
+            departure_icao, arrival_icao,
+        )
+        with self._lock:
+            hours = self._hours.get(key, self)
+            if hours is not self:
+                self._hours.move_to_end(key)
+                return hours
+
+        distance_nm = airport_distances.distance_nm(departure_icao, arrival_icao)
+        hours = round(block_hours(flight_profile(aircraft_type), distance_nm), 1) if distance_nm is not None else None
+
+        with self._lock:
+            self._hours[key] = hours
+            if len(self._hours) > self.maxsize:
+                self._hours.popitem(last=False)
+        return hours
+
+    def clear(self):
+        with self._lock:
+            self._hours.clear()
+
+
+flight_time_model = FlightTimeModel()
@@ -48,7 +48,7 @@ class BookingForm(forms.ModelForm):
     
     class Meta:
         model = Booking
-        fields = ['aircraft', 'trip_type', 'special_requests']
+        fields = ['aircraft', 'trip_type', 'is_empty_leg', 'special_requests']
         widgets = {
             'aircraft': forms.Select(attrs={
                 'class': 'form-control',
@@ -58,6 +58,9 @@ class BookingForm(forms.ModelForm):
                 'class': 'form-control',
                 'id': 'trip_type_select'
             }),
+            'is_empty_leg': forms.CheckboxInput(attrs={
+                'class': 'form-check-input'
+            }),
             'special_requests': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 3,
@@ -335,4 +338,5 @@ class PricingRuleForm(forms.ModelForm):
             'peak_season_multiplier': forms.NumberInput(attrs={'class': 'form-control'}),
             'weekend_surcharge': forms.NumberInput(attrs={'class': 'form-control'}),
             'last_minute_surcharge': forms.NumberInput(attrs={'class': 'form-control'}),
+            'agent_commission_rate': forms.NumberInput(attrs={'class': 'form-control'}),
         }
\ No newline at end of file
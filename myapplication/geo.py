@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+
+from .models import Airport
+
+EARTH_RADIUS_NM = 3440  # Earth radius in nautical miles
+
+
+class AirportCoordinates:
+    """
+    Precomputed airport coordinates keyed by ICAO code.
+
+    Each point is stored as (lat_radians, lon_radians, cos_lat), read from the
+    precomputed radian columns, so distance calculations never touch Decimal
+    values or repeat the trigonometry for the fixed end. Loaded with one query, dropped by the Airport signals in
+    signals.py and reloaded after `max_age` seconds to pick up edits made by
+    other worker processes.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._points = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def points(self):
+        with self._lock:
+            if self._points is None or time.monotonic() - self._loaded_at >= self.max_age:
+                self._points = {
+                    icao: point_from_radians(latitude, longitude)
+                    for icao, latitude, longitude in Airport.objects.values_list('icao_code', 'latitude_radians', 'longitude_radians')
+                }
+                self._loaded_at = time.monotonic()
+            return self._points
+
+    def get(self, icao_code):
+        return self.points().get((icao_code or '').upper())
+
+    def invalidate(self):
+        with self._lock:
+            self._points = None
+
+
+def to_point(latitude, longitude):
+    """Point for coordinates in degrees (floats, Decimals or strings)"""
+    return point_from_radians(math.radians(float(latitude)), math.radians(float(longitude)))
+
+
+def point_from_radians(latitude_radians, longitude_radians):
+    return (latitude_radians, longitude_radians, math.cos(latitude_radians))
+
+
+def distances_from(origin, points):
+    """
+    Great-circle distances in nautical miles from one point to many, computed
+    in a single pass. `None` entries in `points` give `None` distances.
+    """
+    lat1, lon1, cos1 = origin
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    distances = []
+    for point in points:
+        if point is None:
+            distances.append(None)
+            continue
+        lat2, lon2, cos2 = point
+        a = sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * sin((lon2 - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_NM * asin(min(1.0, sqrt(a))))
+    return distances
+
+
+def distance_table(origins, points):
+    """
+    Many-to-many great-circle distances: one `distances_from` row per origin.
+    `None` origins give rows of `None`.
+    """
+    return [distances_from(origin, points) if origin is not None else [None] * len(points) for origin in origins]
+
+
+def bearings_from(origin, points):
+    """
+    Initial great-circle bearings in degrees (0-360, clockwise from true
+    north) from one point to many. `None` entries give `None` bearings.
+    """
+    lat1, lon1, cos1 = origin
+    sin_lat1 = math.sin(lat1)
+    sin, cos, atan2, degrees = math.sin, math.cos, math.atan2, math.degrees
+    bearings = []
+    for point in points:
+        if point is None:
+            bearings.append(None)
+            continue
+        lat2, lon2, cos2 = point
+        delta = lon2 - lon1
+        x = cos2 * sin(delta)
+        y = cos1 * sin(lat2) - sin_lat1 * cos2 * cos(delta)
+        bearings.append(degrees(atan2(x, y)) % 360)
+    return bearings
+
+
+airport_coordinates = AirportCoordinates()
@@ -0,0 +1,121 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import availability_index, make_aware
+from .models import Aircraft, BookingHold
+
+
+class HoldConflict(Exception):
+    """The aircraft is already booked, held or unavailable for the requested legs"""
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, 'BOOKING_HOLD_TTL_SECONDS', 600))
+
+
+def parse_token(token):
+    """UUID of a hold token sent by a client, or None if it is missing or malformed"""
+    try:
+        return uuid.UUID(str(token)) if token else None
+    except ValueError:
+        return None
+
+
+def leg_spans(flight_legs):
+    return [(make_aware(leg['departure_datetime']), make_aware(leg['arrival_datetime'])) for leg in flight_legs]
+
+
+def lock_aircraft(aircraft_id):
+    """
+    Row-lock the aircraft until the surrounding transaction ends. Claims are
+    short transactions, so this only orders concurrent claims on the same
+    aircraft; bookings for other aircraft are never blocked.
+    """
+    list(Aircraft.objects.select_for_update().filter(pk=aircraft_id).values_list('pk', flat=True))
+
+
+def check_conflicts(aircraft_id, flight_legs, exclude_token=None):
+    """
+    Raise HoldConflict if the legs overlap a booked leg or another client's
+    live hold, or fall outside the aircraft's availability windows. Must run
+    with the aircraft locked.
+    """
+    available, message = availability_index.schedule(aircraft_id, refresh=True).check_legs(flight_legs)
+    if not available:
+        raise HoldConflict(message)
+
+    overlap = Q()
+    for start, end in leg_spans(flight_legs):
+        overlap |= Q(start_datetime__lt=end, end_datetime__gt=start)
+    holds = BookingHold.objects.filter(overlap, aircraft_id=aircraft_id, expires_at__gt=timezone.now())
+    if exclude_token:
+        holds = holds.exclude(token=exclude_token)
+    if holds.exists():
+        raise HoldConflict('Aircraft is being booked by another client for these dates. Please try again shortly.')
+
+
+def claim_hold(aircraft, flight_legs, user=None):
+    """
+    Hold the aircraft for the given legs for BOOKING_HOLD_TTL_SECONDS.
+    Any earlier hold of the same user on the aircraft is released.
+    Returns (token, expires_at); raises HoldConflict.
+    """
+    token = uuid.uuid4()
+    expires_at = timezone.now() + hold_ttl()
+    with transaction.atomic():
+        lock_aircraft(aircraft.id)
+        if user is not None and user.is_authenticated:
+            BookingHold.objects.filter(aircraft=aircraft, created_by=user).delete()
+        check_conflicts(aircraft.id, flight_legs)
+        BookingHold.objects.bulk_create([
+            BookingHold(
+                token=token,
+                aircraft=aircraft,
+                start_datetime=start,
+                end_datetime=end,
+                expires_at=expires_at,
+                created_by=user if user is not None and user.is_authenticated else None,
+            ) for start, end in leg_spans(flight_legs)
+        ])
+    return token, expires_at
+
+
+def consume_hold(aircraft, flight_legs, token=None):
+    """
+    Turn a hold into a booking. Call inside the booking's transaction, before
+    its flight legs are created: the aircraft stays locked until the booking
+    commits, so no other claim can slip in between.
+
+    A live hold with `token` covering every leg is accepted as is; without
+    one (expired, missing or for other dates) the legs are checked from
+    scratch. Raises HoldConflict.
+    """
+    lock_aircraft(aircraft.id)
+    token = parse_token(token)
+    spans = leg_spans(flight_legs)
+    held = []
+    if token:
+        held = list(BookingHold.objects.filter(token=token, aircraft=aircraft, expires_at__gt=timezone.now()).values_list('start_datetime', 'end_datetime'))
+
+    covered = all(any(start >= hold_start and end <= hold_end for hold_start, hold_end in held) for start, end in spans)
+    if not covered:
+        check_conflicts(aircraft.id, flight_legs, exclude_token=token)
+    if token:
+        BookingHold.objects.filter(token=token).delete()
+
+
+def release_hold(token):
+    token = parse_token(token)
+    if token:
+        BookingHold.objects.filter(token=token).delete()
+
+
+def sweep_expired_holds():
+    """Delete expired holds; returns how many were removed"""
+    deleted, _ = BookingHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
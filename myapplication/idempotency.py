@@ -0,0 +1,149 @@
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+
+KEY_HEADER = 'Idempotency-Key'
+KEY_FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 255
+
+# An in-progress claim is taken over by a retry if its request has not stored a
+# response within this time (the worker died or timed out)
+CLAIM_LEASE = timedelta(minutes=2)
+
+# Form fields that differ between retries of the same submission
+UNHASHED_FIELDS = {KEY_FIELD, 'csrfmiddlewaretoken'}
+
+
+def idempotency_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 86400))
+
+
+def request_key(request):
+    """The client's idempotency key from the header or form field, or None"""
+    key = request.headers.get(KEY_HEADER)
+    if not key and request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        key = request.POST.get(KEY_FIELD)
+    key = (key or '').strip()
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def request_fingerprint(request):
+    """Hash of the submitted data, so a key reused for a different submission is refused"""
+    digest = hashlib.sha256()
+    if request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        for name, values in sorted(request.POST.lists()):
+            if name not in UNHASHED_FIELDS:
+                digest.update(repr((name, values)).encode())
+        for name, upload in sorted(request.FILES.items()):
+            digest.update(repr((name, upload.name, upload.size)).encode())
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def replay(record):
+    response = HttpResponse(record.response_body, status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Run a POST view at most once per Idempotency-Key (header or form field).
+
+    The first request claims the key with an in-progress record and stores
+    its successful response for IDEMPOTENCY_TTL_SECONDS; retries with the
+    same key are answered from that record with one indexed lookup, without
+    running the view. A retry while the first request is still running gets
+    409, unless the claim is older than CLAIM_LEASE, in which case the retry
+    takes it over and runs the view. Failed responses are not stored, so they
+    can be retried. Requests without a key run as before.
+    """
+    scope = view.__name__
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request_key(request) if request.method == 'POST' else None
+        if not key:
+            return view(request, *args, **kwargs)
+
+        user_id = request.user.pk if request.user.is_authenticated else None
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+
+        record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyRecord.objects.create(
+                        scope=scope, key=key, user_id=user_id, fingerprint=fingerprint, expires_at=now + CLAIM_LEASE
+                    )
+            except IntegrityError:
+                # A concurrent request claimed the key first
+                record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+            else:
+                return run_and_store(record, view, request, *args, **kwargs)
+        elif record.expires_at <= now:
+            # An expired response or an abandoned claim: take the key over, unless
+            # a concurrent retry got there first
+            claimed = IdempotencyRecord.objects.filter(pk=record.pk, expires_at=record.expires_at).update(
+                user_id=user_id, fingerprint=fingerprint, status_code=None, response_body='', content_type='',
+                expires_at=now + CLAIM_LEASE,
+            )
+            if claimed:
+                record.refresh_from_db()
+                return run_and_store(record, view, request, *args, **kwargs)
+            record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+
+        if record is None or record.user_id != user_id or record.fingerprint != fingerprint:
+            return JsonResponse({
+                'success': False,
+                'status': 'error',
+                'message': 'This idempotency key was already used for a different request.'
+            }, status=422)
+        if record.status_code is None:
+            return JsonResponse({
+                'success': False,
+                'status': 'error',
+                'message': 'This request is still being processed. Please wait a moment.'
+            }, status=409)
+        return replay(record)
+
+    return wrapper
+
+
+def run_and_store(record, view, request, *args, **kwargs):
+    """
+    Run the view for a freshly claimed key; keep its response if it succeeded,
+    release the key otherwise. Nothing is written if a retry has taken the
+    claim over in the meantime.
+    """
+    claim = IdempotencyRecord.objects.filter(pk=record.pk, status_code=None, expires_at=record.expires_at)
+    try:
+        response = view(request, *args, **kwargs)
+    except Exception:
+        claim.delete()
+        raise
+    if 200 <= response.status_code < 300 and not response.streaming:
+        claim.update(
+            status_code=response.status_code,
+            response_body=response.content.decode(response.charset),
+            content_type=response.get('Content-Type', ''),
+            expires_at=timezone.now() + idempotency_ttl(),
+        )
+    else:
+        claim.delete()
+    return response
+
+
+def purge_expired_keys():
+    """Delete expired idempotency records; returns how many were removed"""
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
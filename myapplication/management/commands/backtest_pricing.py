@@ -0,0 +1,235 @@
+"""
+Django Management Command: Backtest Pricing Rules
+Place this file in: myapplication/management/commands/backtest_pricing.py
+
+Replays every historical booking through a candidate set of pricing rules
+and reports how revenue, agent commission and owner earnings would have
+changed, per aircraft type and departure month.
+
+Each flight leg is repriced the way create_booking prices it today: the
+aircraft's current hourly rate and minimum hours, the candidate rule of its
+type, the active seasons of the departure country, weekend and last-minute
+surcharges (relative to when the booking was made) and the empty-leg
+return. Actual figures are the stored booking totals.
+
+Legs are read in chunks with iterator() and repriced in a process pool,
+with at most two chunks per worker in flight, so memory stays flat however
+many bookings there are.
+
+The candidate rules are the current PricingRules with overrides from a JSON
+file keyed by aircraft type name or id, e.g.
+    {"Light Jet": {"weekend_surcharge": 15}, "3": {"peak_season_multiplier": 1.4}}
+and/or --set overrides applied to every type.
+
+Usage:
+    python manage.py backtest_pricing --set weekend_surcharge=15
+    python manage.py backtest_pricing --rules candidate_rules.json --workers 8
+    python manage.py backtest_pricing --rules candidate_rules.json --include-cancelled
+"""
+
+import json
+import os
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from myapplication.models import AircraftType, FlightLeg, PricingRule, Season
+from myapplication.money import Money, split_commission
+from myapplication.pricing import DEFAULT_RULE, RULE_COLUMNS, CompiledRule, PricingTable
+from myapplication.seasons import SEASON_COLUMNS, SeasonCalendar
+
+# Just enough of an Aircraft for PricingTable
+ReplayAircraft = namedtuple('ReplayAircraft', 'aircraft_type_id hourly_rate minimum_hours')
+
+LEG_COLUMNS = (
+    'booking_id', 'booking__aircraft__aircraft_type_id', 'booking__aircraft__hourly_rate',
+    'booking__aircraft__minimum_hours', 'booking__is_empty_leg', 'booking__created_at',
+    'booking__total_price', 'booking__agent_commission', 'booking__owner_earnings',
+    'flight_hours', 'departure_datetime', 'departure_airport__country',
+)
+
+# Running totals per (aircraft type id, month), all in cents but the booking count
+TOTAL_FIELDS = ('bookings', 'actual_revenue', 'candidate_revenue', 'actual_commission',
+                'candidate_commission', 'actual_owner', 'candidate_owner')
+
+_table = None
+
+
+def init_worker(rules, seasons):
+    """Process pool initializer: compile the candidate rules once per worker"""
+    global _table
+    django.setup()
+    _table = PricingTable(
+        {aircraft_type_id: CompiledRule(*values) for aircraft_type_id, values in rules.items()},
+        version=0,
+        calendar=SeasonCalendar(seasons),
+    )
+
+
+def replay_bookings(bookings):
+    """
+    Reprice a chunk of bookings, each a list of its LEG_COLUMNS rows in
+    sequence order. Returns {(aircraft_type_id, 'YYYY-MM'): [TOTAL_FIELDS]}.
+    """
+    totals = defaultdict(lambda: [0] * len(TOTAL_FIELDS))
+    for legs in bookings:
+        (_, aircraft_type_id, hourly_rate, minimum_hours, is_empty_leg, created_at,
+         total_price, agent_commission, owner_earnings, _, first_departure, _) = legs[0]
+        aircraft = ReplayAircraft(aircraft_type_id, hourly_rate, minimum_hours)
+
+        candidate = Money()
+        for *_, flight_hours, departure_datetime, region in legs:
+            leg_price = _table.leg_price(aircraft, flight_hours, departure_datetime, created_at, region or '')
+            if is_empty_leg:
+                leg_price = _table.with_empty_leg_return(aircraft, leg_price)
+            candidate += leg_price
+        candidate_commission, candidate_owner = split_commission(candidate, _table.commission_rate(aircraft))
+
+        row = totals[(aircraft_type_id, timezone.localtime(first_departure).strftime('%Y-%m'))]
+        row[0] += 1
+        row[1] += Money.from_decimal(total_price).cents
+        row[2] += candidate.cents
+        row[3] += Money.from_decimal(agent_commission).cents
+        row[4] += candidate_commission.cents
+        row[5] += Money.from_decimal(owner_earnings).cents
+        row[6] += candidate_owner.cents
+    return dict(totals)
+
+
+class Command(BaseCommand):
+    help = 'Replay historical bookings through candidate pricing rules and report the revenue impact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', help='JSON file of rule overrides keyed by aircraft type name or id')
+        parser.add_argument('--set', action='append', default=[], metavar='FIELD=VALUE',
+                            help=f'Override a rule field for every type; one of {", ".join(RULE_COLUMNS)}')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Bookings per worker task (default: 2000)')
+        parser.add_argument('--include-cancelled', action='store_true', help='Also replay cancelled bookings')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        type_names = dict(AircraftType.objects.values_list('id', 'name'))
+        rules = self.candidate_rules(options, type_names)
+        seasons = list(Season.objects.filter(is_active=True).values_list(*SEASON_COLUMNS))
+
+        legs = FlightLeg.objects.order_by('booking_id', 'sequence').values_list(*LEG_COLUMNS)
+        if not options['include_cancelled']:
+            legs = legs.exclude(booking__status='cancelled')
+
+        totals = defaultdict(lambda: [0] * len(TOTAL_FIELDS))
+        chunks = self.booking_chunks(legs.iterator(chunk_size=options['chunk_size']), options['chunk_size'])
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(options['workers'], initializer=init_worker, initargs=(rules, seasons)) as pool:
+                # Executor.map would read every chunk up front; keep two per worker queued instead
+                pending = {pool.submit(replay_bookings, chunk) for chunk in islice(chunks, 2 * options['workers'])}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.merge(totals, future.result())
+                    pending.update(pool.submit(replay_bookings, chunk) for chunk in islice(chunks, len(done)))
+        else:
+            init_worker(rules, seasons)
+            for chunk in chunks:
+                self.merge(totals, replay_bookings(chunk))
+
+        self.report(totals, type_names)
+        self.stdout.write(f"Replayed in {time.perf_counter() - started:.2f}s")
+
+    def candidate_rules(self, options, type_names):
+        """{aircraft_type_id: CompiledRule arguments} of the current rules with the overrides applied"""
+        current = {
+            aircraft_type_id: list(values)
+            for aircraft_type_id, *values in PricingRule.objects.values_list('aircraft_type_id', *RULE_COLUMNS)
+        }
+        default = [getattr(DEFAULT_RULE, slot) for slot in CompiledRule.__slots__]
+        rules = {type_id: current.get(type_id, list(default)) for type_id in type_names}
+
+        overrides = defaultdict(dict)
+        if options['rules']:
+            try:
+                with open(options['rules']) as rules_file:
+                    by_type = json.load(rules_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['rules']}: {e}")
+            ids_by_name = {name: type_id for type_id, name in type_names.items()}
+            for key, fields in by_type.items():
+                type_id = ids_by_name.get(key) or (int(key) if str(key).isdigit() else None)
+                if type_id not in rules:
+                    raise CommandError(f'Unknown aircraft type: {key}')
+                overrides[type_id].update(fields)
+        for assignment in options['set']:
+            field, _, value = assignment.partition('=')
+            for type_id in rules:
+                overrides[type_id][field] = value
+
+        for type_id, fields in overrides.items():
+            for field, value in fields.items():
+                if field not in RULE_COLUMNS:
+                    raise CommandError(f'Unknown rule field: {field}. Use one of: {", ".join(RULE_COLUMNS)}')
+                try:
+                    rules[type_id][RULE_COLUMNS.index(field)] = Decimal(str(value))
+                except InvalidOperation:
+                    raise CommandError(f'Invalid value for {field}: {value}')
+        return rules
+
+    @staticmethod
+    def booking_chunks(leg_rows, chunk_size):
+        """Group leg rows (ordered by booking) into bookings, yielded in lists of chunk_size bookings"""
+        chunk, booking, booking_id = [], [], None
+        for row in leg_rows:
+            if row[0] != booking_id:
+                if booking:
+                    chunk.append(booking)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                booking, booking_id = [], row[0]
+            booking.append(row)
+        if booking:
+            chunk.append(booking)
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def merge(totals, result):
+        for key, values in result.items():
+            row = totals[key]
+            for index, value in enumerate(values):
+                row[index] += value
+
+    def report(self, totals, type_names):
+        if not totals:
+            self.stdout.write(self.style.WARNING('No bookings to replay'))
+            return
+
+        def money(cents):
+            return f"{cents / 100:>14,.2f}"
+
+        def percent(delta, base):
+            return f"{delta / base * 100:>+8.1f}%" if base else f"{'-':>9}"
+
+        header = f"{'Aircraft type':<24} {'Month':<8} {'Bookings':>8} {'Actual revenue':>14} {'Candidate':>14} {'Revenue delta':>14} {'':>9} {'Commission delta':>16} {'Owner delta':>14}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        grand = [0] * len(TOTAL_FIELDS)
+        for (type_id, month), row in sorted(totals.items(), key=lambda item: (type_names.get(item[0][0], ''), item[0][1])):
+            grand = [total + value for total, value in zip(grand, row)]
+            bookings, actual, candidate, actual_commission, candidate_commission, actual_owner, candidate_owner = row
+            self.stdout.write(
+                f"{type_names.get(type_id, type_id):<24.24} {month:<8} {bookings:>8} {money(actual)} {money(candidate)} "
+                f"{money(candidate - actual)} {percent(candidate - actual, actual)} "
+                f"{money(candidate_commission - actual_commission):>16} {money(candidate_owner - actual_owner)}"
+            )
+        bookings, actual, candidate, actual_commission, candidate_commission, actual_owner, candidate_owner = grand
+        self.stdout.write('-' * len(header))
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Total':<33} {bookings:>8} {money(actual)} {money(candidate)} {money(candidate - actual)} "
+            f"{percent(candidate - actual, actual)} {money(candidate_commission - actual_commission):>16} {money(candidate_owner - actual_owner)}"
+        ))
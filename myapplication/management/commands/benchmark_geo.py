@@ -0,0 +1,111 @@
+"""
+Django Management Command: Benchmark Geo Calculations
+Place this file in: myapplication/management/commands/benchmark_geo.py
+
+Times the positioning-distance step of one search (departure airport to the
+current location of every aircraft) computed the old way, one scalar
+haversine per aircraft from Decimal coordinates, against the batched
+geo.distances_from over precomputed points. Also compares the time and
+memory allocated to load every airport's coordinates from the Decimal
+columns against the float radian columns.
+
+Usage:
+    python manage.py benchmark_geo
+    python manage.py benchmark_geo --aircraft 500 --repeat 200
+"""
+
+import math
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from myapplication.geo import EARTH_RADIUS_NM, bearings_from, distances_from, point_from_radians, to_point
+from myapplication.models import Airport
+
+
+def scalar_distance_nm(departure_lat, departure_lng, arrival_lat, arrival_lng):
+    """Per-pair haversine as the views computed it before geo.py"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [float(departure_lat), float(departure_lng), float(arrival_lat), float(arrival_lng)])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_RADIUS_NM * c
+
+
+class Command(BaseCommand):
+    help = 'Benchmark scalar against batched great-circle distance calculations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, default=500, help='Fleet size per search (default: 500)')
+        parser.add_argument('--repeat', type=int, default=200, help='Searches to time (default: 200)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        fleet = [
+            (Decimal(f"{rng.uniform(-60, 60):.6f}"), Decimal(f"{rng.uniform(-180, 180):.6f}"))
+            for _ in range(options['aircraft'])
+        ]
+        departure = (Decimal('-1.319167'), Decimal('36.927778'))  # HKJK
+        repeat = options['repeat']
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            scalar = [scalar_distance_nm(departure[0], departure[1], latitude, longitude) for latitude, longitude in fleet]
+        scalar_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        # Points are converted once, as AirportCoordinates does per process
+        fleet_points = [to_point(latitude, longitude) for latitude, longitude in fleet]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            origin = to_point(*departure)
+            batched = distances_from(origin, fleet_points)
+        batched_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            bearings_from(to_point(*departure), fleet_points)
+        bearings_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        max_error = max(abs(a - b) for a, b in zip(scalar, batched))
+        self.stdout.write(f"Fleet size: {len(fleet)}, searches timed: {repeat}")
+        self.stdout.write(f"  Scalar haversine per aircraft: {scalar_ms:.3f} ms/search")
+        self.stdout.write(f"  Batched distances_from:        {batched_ms:.3f} ms/search")
+        self.stdout.write(f"  Batched bearings_from:         {bearings_ms:.3f} ms/search")
+        self.stdout.write(f"  Largest difference:            {max_error:.6f} nm")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {scalar_ms / batched_ms:.1f}x"))
+
+        self.benchmark_loading(repeat)
+
+    def benchmark_loading(self, repeat):
+        """Load all airport points from the Decimal columns and from the radian columns"""
+        def from_decimals():
+            return {
+                icao: to_point(latitude, longitude)
+                for icao, latitude, longitude in Airport.objects.values_list('icao_code', 'latitude', 'longitude')
+            }
+
+        def from_radians():
+            return {
+                icao: point_from_radians(latitude, longitude)
+                for icao, latitude, longitude in Airport.objects.values_list('icao_code', 'latitude_radians', 'longitude_radians')
+            }
+
+        self.stdout.write(f"Loading {Airport.objects.count()} airport points, {repeat} times:")
+        for label, load in (('Decimal columns', from_decimals), ('Radian columns', from_radians)):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                load()
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            tracemalloc.start()
+            points = load()
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del points
+            self.stdout.write(
+                f"  {label + ':':<17} {elapsed_ms:.3f} ms/load, peak {peak / 1024:.1f} KB, kept {retained / 1024:.1f} KB"
+            )
@@ -0,0 +1,90 @@
+"""
+Django Management Command: Benchmark Fleet Pricing
+Place this file in: myapplication/management/commands/benchmark_pricing.py
+
+Times pricing one search result for a synthetic fleet the way the search
+loop did, one PricingTable.quote_trip call per aircraft, against a single
+columnar PricingTable.quote_fleet pass, and checks both give the same prices.
+No database rows are read or written.
+
+Usage:
+    python manage.py benchmark_pricing
+    python manage.py benchmark_pricing --sizes 10 100 1000 --repeat 200 --empty-leg
+"""
+
+import random
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapplication.models import Aircraft
+from myapplication.pricing import CompiledRule, PricingTable
+from myapplication.seasons import SeasonCalendar
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-aircraft against fleet-wide pricing of search results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Fleet sizes (default: 10 100 1000)')
+        parser.add_argument('--repeat', type=int, default=200, help='Searches to time per fleet size (default: 200)')
+        parser.add_argument('--trip-type', default='round_trip', choices=['one_way', 'round_trip'])
+        parser.add_argument('--empty-leg', action='store_true', help='Price as empty leg searches')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        rules = {
+            type_id: CompiledRule(
+                empty_leg_discount=rng.choice([0, 15, 25]),
+                peak_season_multiplier=rng.choice([1.0, 1.25, 1.5]),
+                weekend_surcharge=rng.choice([0, 5, 10]),
+                last_minute_surcharge=rng.choice([0, 10, 20]),
+            )
+            for type_id in range(1, 9)
+        }
+        calendar = SeasonCalendar([
+            ('', date(2026, 7, 1), date(2026, 8, 31), None),
+            ('', date(2026, 12, 1), date(2027, 1, 5), None),
+        ])
+        table = PricingTable(rules, version=0, calendar=calendar)
+
+        # A Saturday in August, so peak season and weekend pricing both apply
+        departure = timezone.make_aware(datetime(2026, 8, 8, 10, 0))
+        return_datetime = timezone.make_aware(datetime(2026, 8, 11, 16, 0))
+        now = timezone.now()
+        trip_type, is_empty_leg, repeat = options['trip_type'], options['empty_leg'], options['repeat']
+
+        self.stdout.write(f"Trip type: {trip_type}, empty leg: {is_empty_leg}, searches timed: {repeat}")
+        for size in options['sizes']:
+            fleet = [
+                Aircraft(
+                    aircraft_type_id=rng.randint(1, 8),
+                    hourly_rate=Decimal(rng.randrange(1500, 12000, 50)),
+                    minimum_hours=Decimal(rng.choice(['1.0', '1.5', '2.0'])),
+                )
+                for _ in range(size)
+            ]
+            flight_hours = [round(rng.uniform(0.5, 9.0), 1) for _ in range(size)]
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                looped = [
+                    table.quote_trip(aircraft, hours, trip_type, is_empty_leg, departure, return_datetime, now)
+                    for aircraft, hours in zip(fleet, flight_hours)
+                ]
+            loop_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                batched = table.quote_fleet(fleet, flight_hours, trip_type, is_empty_leg, departure, return_datetime, now)
+            batch_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            mismatches = sum(1 for one, other in zip(looped, batched) if one != other)
+            self.stdout.write(f"Fleet size: {size}")
+            self.stdout.write(f"  quote_trip per aircraft: {loop_ms:.3f} ms/search")
+            self.stdout.write(f"  quote_fleet:             {batch_ms:.3f} ms/search")
+            self.stdout.write(f"  Differing quotes:        {mismatches}")
+            self.stdout.write(self.style.SUCCESS(f"  Speedup: {loop_ms / batch_ms:.1f}x"))
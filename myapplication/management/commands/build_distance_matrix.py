@@ -0,0 +1,28 @@
+"""
+Django Management Command: Build Airport Distance Matrix
+Place this file in: myapplication/management/commands/build_distance_matrix.py
+
+Writes the memory-mapped matrix of great-circle distances between all
+airports (settings.AIRPORT_DISTANCE_MATRIX_PATH). Run it once after deploying
+or importing airports; later airport edits update the file in place.
+
+Usage:
+    python manage.py build_distance_matrix
+"""
+
+import os
+
+from django.core.management.base import BaseCommand
+
+from myapplication.distance_matrix import airport_distances
+
+
+class Command(BaseCommand):
+    help = 'Build the precomputed airport distance matrix'
+
+    def handle(self, *args, **options):
+        count = airport_distances.build()
+        size_kb = os.path.getsize(airport_distances.path) / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote distances between {count} airports to {airport_distances.path} ({size_kb:.0f} KB)"
+        ))
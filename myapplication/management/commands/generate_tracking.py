@@ -10,12 +10,12 @@ Usage:
 
 import random
 from datetime import datetime, timedelta
-from decimal import Decimal
 
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.db import transaction
 
+from myapplication.geo import bearings_from, to_point
 from myapplication.models import Aircraft, AircraftTracking
 
 
@@ -95,10 +95,10 @@ class Command(BaseCommand):
                     hours_back=options['hours_back']
                 )
                 
-                # Bulk create all tracking data
+                # Bulk create all tracking data (bulk_create skips save(), so fill the radian columns here)
                 self.stdout.write(f'💾 Saving {len(tracking_data)} tracking points to database...')
                 AircraftTracking.objects.bulk_create([
-                    AircraftTracking(**data) for data in tracking_data
+                    AircraftTracking(**data).update_coordinate_columns() for data in tracking_data
                 ])
 
             self.stdout.write(
@@ -135,6 +135,7 @@ class Command(BaseCommand):
         
         # Generate 20-50 tracking points for the flight
         num_points = random.randint(20, 50)
+        destination = to_point(end_airport['lat'], end_airport['lon'])
         
         for i in range(num_points):
             # Simple interpolation between airports
@@ -147,6 +148,9 @@ class Command(BaseCommand):
             lat += random.uniform(-0.1, 0.1)
             lon += random.uniform(-0.1, 0.1)
             
+            # Head for the destination along the great circle
+            heading = bearings_from(to_point(lat, lon), [destination])[0]
+            
             # Simple altitude profile - start low, go high, then descend
             if progress < 0.2:  # Takeoff
                 altitude = int(progress * 5 * 35000)  # 0 to 35000
@@ -164,10 +168,10 @@ class Command(BaseCommand):
             tracking_points.append({
                 'aircraft': aircraft,
                 'timestamp': current_time,
-                'latitude': Decimal(f"{lat:.6f}"),
-                'longitude': Decimal(f"{lon:.6f}"),
+                'latitude': round(lat, 6),
+                'longitude': round(lon, 6),
                 'altitude': altitude,
-                'heading': random.randint(0, 359),
+                'heading': int(round(heading)) % 360,
                 'speed': speed,
                 'source': random.choice(self.sources)
             })
@@ -195,8 +199,8 @@ class Command(BaseCommand):
             tracking_points.append({
                 'aircraft': aircraft,
                 'timestamp': current_time,
-                'latitude': Decimal(f"{lat:.6f}"),
-                'longitude': Decimal(f"{lon:.6f}"),
+                'latitude': round(lat, 6),
+                'longitude': round(lon, 6),
                 'altitude': random.randint(0, 100),  # Ground level
                 'heading': random.randint(0, 359),
                 'speed': random.randint(0, 30),  # Taxi speed
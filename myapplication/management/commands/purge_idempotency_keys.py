@@ -0,0 +1,23 @@
+"""
+Django Management Command: Purge Idempotency Keys
+Place this file in: myapplication/management/commands/purge_idempotency_keys.py
+
+Deletes stored responses to Idempotency-Key requests once their
+IDEMPOTENCY_TTL_SECONDS have passed. Expired keys are already ignored on
+lookup; this only keeps the table small. Run it daily (e.g. from cron).
+
+Usage:
+    python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+
+from myapplication.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys and their stored responses'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
@@ -0,0 +1,39 @@
+"""
+Django Management Command: Rebuild Aircraft Availability Calendars
+Place this file in: myapplication/management/commands/rebuild_availability_calendars.py
+
+Rolls every aircraft's day bitmap forward so it covers the next 18 months.
+Run it daily (e.g. from cron); writes in between keep the calendars current.
+
+Usage:
+    python manage.py rebuild_availability_calendars
+    python manage.py rebuild_availability_calendars --batch-size 200
+"""
+
+from django.core.management.base import BaseCommand
+
+from myapplication.fleet_calendar import CALENDAR_HORIZON_DAYS, build_calendars
+from myapplication.models import Aircraft
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized availability calendar of every aircraft'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Aircraft rebuilt per query (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        aircraft_ids = list(Aircraft.objects.values_list('id', flat=True))
+        batch_size = options['batch_size']
+
+        for offset in range(0, len(aircraft_ids), batch_size):
+            build_calendars(aircraft_ids[offset:offset + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(aircraft_ids)} calendars covering {CALENDAR_HORIZON_DAYS} days"
+        ))
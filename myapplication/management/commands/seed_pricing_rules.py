@@ -23,6 +23,7 @@ class Command(BaseCommand):
                     'peak_season_multiplier': Decimal(random.choice([1.0, 1.2, 1.5])),
                     'weekend_surcharge': Decimal(random.choice([0, 5, 10])),
                     'last_minute_surcharge': Decimal(random.choice([0, 10, 20])),
+                    'agent_commission_rate': Decimal('10.00'),
                 }
             )
 
@@ -0,0 +1,54 @@
+"""
+Django Management Command: Seed Peak Seasons
+Place this file in: myapplication/management/commands/seed_seasons.py
+
+Creates the default peak pricing seasons for the given years: the northern
+summer and festive holidays (the months that were hardcoded as peak before
+seasons existed), the Kenyan April school holidays and the Great Migration
+in Kenya and Tanzania. School holiday dates are approximate; adjust them in
+the admin to the published term dates. Existing seasons are left untouched.
+
+Usage:
+    python manage.py seed_seasons
+    python manage.py seed_seasons --years 2026 2027
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapplication.models import Season
+
+# (name, region, (start month, day), (end month, day), end in the following year)
+DEFAULT_SEASONS = (
+    ('Northern summer holidays', '', (7, 1), (8, 31), False),
+    ('Festive season', '', (12, 1), (1, 5), True),
+    ('Kenyan April school holidays', 'Kenya', (4, 1), (4, 30), False),
+    ('Great Migration', 'Kenya', (7, 15), (10, 15), False),
+    ('Great Migration', 'Tanzania, United Republic of', (7, 15), (10, 15), False),
+)
+
+
+class Command(BaseCommand):
+    help = 'Seed the default peak pricing seasons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, nargs='+', help='Years to seed (default: this year and next)')
+
+    def handle(self, *args, **options):
+        this_year = timezone.localdate().year
+        years = options['years'] or [this_year, this_year + 1]
+
+        for year in years:
+            for name, region, (start_month, start_day), (end_month, end_day), ends_next_year in DEFAULT_SEASONS:
+                season, created = Season.objects.get_or_create(
+                    name=name,
+                    region=region,
+                    start_date=date(year, start_month, start_day),
+                    defaults={'end_date': date(year + 1 if ends_next_year else year, end_month, end_day)},
+                )
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f"Created season {season}"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Season already exists: {season}"))
@@ -0,0 +1,48 @@
+"""
+Django Management Command: Send Outbox Emails
+Place this file in: myapplication/management/commands/send_outbox_emails.py
+
+Delivers the emails requests queued in the outbox (see outbox.py), a batch
+at a time over one SMTP connection. Failed emails are retried with
+exponential backoff and marked failed after OUTBOX_MAX_ATTEMPTS.
+Without --loop it sends everything that is due and exits (e.g. from cron
+every minute); with --loop it keeps polling as a background worker.
+Several senders can run at once; each claims its own batches.
+
+Usage:
+    python manage.py send_outbox_emails
+    python manage.py send_outbox_emails --loop --interval 5
+    python manage.py send_outbox_emails --batch-size 100
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapplication.outbox import send_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails per SMTP connection (default: 50)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop (default: 5)')
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = send_outbox_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                # A short batch means nothing else is due; a failing one will be retried after its backoff
+                if sent + failed < options['batch_size'] or failed:
+                    break
+            if total_sent or total_failed or not options['loop']:
+                style = self.style.WARNING if total_failed else self.style.SUCCESS
+                self.stdout.write(style(f"Sent {total_sent} emails, {total_failed} failed"))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
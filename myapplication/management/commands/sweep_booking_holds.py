@@ -0,0 +1,22 @@
+"""
+Django Management Command: Sweep Expired Booking Holds
+Place this file in: myapplication/management/commands/sweep_booking_holds.py
+
+Expired holds never block a booking, so this only keeps the table small.
+Run it every few minutes (e.g. from cron).
+
+Usage:
+    python manage.py sweep_booking_holds
+"""
+
+from django.core.management.base import BaseCommand
+
+from myapplication.holds import sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired booking holds'
+
+    def handle(self, *args, **options):
+        deleted = sweep_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired booking holds"))
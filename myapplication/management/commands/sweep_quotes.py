@@ -0,0 +1,28 @@
+"""
+Django Management Command: Sweep Stale Quotes
+Place this file in: myapplication/management/commands/sweep_quotes.py
+
+Every search saves a quote per result, so quotes that expired unbooked are
+deleted as soon as they expire, or --days after expiry to keep them for
+analysing searches. Booked quotes are kept for auditing quote-to-booking
+conversion. Run it every hour or so (e.g. from cron).
+
+Usage:
+    python manage.py sweep_quotes
+    python manage.py sweep_quotes --days 7
+"""
+
+from django.core.management.base import BaseCommand
+
+from myapplication.quotes import sweep_stale_quotes
+
+
+class Command(BaseCommand):
+    help = 'Delete expired unbooked quotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=0, help='Keep unbooked quotes for this many days after expiry (default: 0)')
+
+    def handle(self, *args, **options):
+        deleted = sweep_stale_quotes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} stale quotes"))
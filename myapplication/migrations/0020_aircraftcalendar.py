@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 14:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0019_booking_is_empty_leg_booking_return_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AircraftCalendar',
+            fields=[
+                ('aircraft', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar', serialize=False, to='myapplication.aircraft')),
+                ('start_date', models.DateField()),
+                ('days', models.PositiveIntegerField()),
+                ('free_days', models.BinaryField(help_text='Days the aircraft can be booked')),
+                ('booked_days', models.BinaryField(help_text='Days with confirmed or pending flight legs')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0020_aircraftcalendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(db_index=True)),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='flightleg',
+            index=models.Index(fields=['departure_datetime', 'arrival_datetime'], name='myapplicati_departu_d20baa_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookinghold',
+            name='aircraft',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='myapplication.aircraft'),
+        ),
+        migrations.AddField(
+            model_name='bookinghold',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='bookinghold',
+            index=models.Index(fields=['aircraft', 'start_datetime', 'end_datetime'], name='myapplicati_aircraf_45b302_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0021_bookinghold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aircrafttype',
+            name='climb_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Time to climb to cruise altitude in minutes', null=True),
+        ),
+        migrations.AddField(
+            model_name='aircrafttype',
+            name='climb_speed_knots',
+            field=models.PositiveIntegerField(blank=True, help_text='Average ground speed while climbing in knots', null=True),
+        ),
+        migrations.AddField(
+            model_name='aircrafttype',
+            name='descent_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Time to descend from cruise altitude in minutes', null=True),
+        ),
+        migrations.AddField(
+            model_name='aircrafttype',
+            name='descent_speed_knots',
+            field=models.PositiveIntegerField(blank=True, help_text='Average ground speed while descending in knots', null=True),
+        ),
+        migrations.AddField(
+            model_name='aircrafttype',
+            name='taxi_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Taxi allowance per leg (both ends) in minutes', null=True),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 15:48
+
+import math
+
+from django.db import migrations, models
+
+
+def backfill_coordinate_columns(apps, schema_editor):
+    Airport = apps.get_model('myapplication', 'Airport')
+    AircraftTracking = apps.get_model('myapplication', 'AircraftTracking')
+
+    airports = list(Airport.objects.all())
+    for airport in airports:
+        airport.latitude_radians = math.radians(float(airport.latitude))
+        airport.longitude_radians = math.radians(float(airport.longitude))
+        cos_latitude = math.cos(airport.latitude_radians)
+        airport.unit_x = cos_latitude * math.cos(airport.longitude_radians)
+        airport.unit_y = cos_latitude * math.sin(airport.longitude_radians)
+        airport.unit_z = math.sin(airport.latitude_radians)
+    Airport.objects.bulk_update(airports, ['latitude_radians', 'longitude_radians', 'unit_x', 'unit_y', 'unit_z'], batch_size=500)
+
+    batch = []
+    for point in AircraftTracking.objects.only('latitude', 'longitude').iterator(chunk_size=2000):
+        point.latitude_radians = math.radians(float(point.latitude))
+        point.longitude_radians = math.radians(float(point.longitude))
+        batch.append(point)
+        if len(batch) == 2000:
+            AircraftTracking.objects.bulk_update(batch, ['latitude_radians', 'longitude_radians'])
+            batch = []
+    if batch:
+        AircraftTracking.objects.bulk_update(batch, ['latitude_radians', 'longitude_radians'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0022_aircrafttype_flight_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aircrafttracking',
+            name='latitude_radians',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='aircrafttracking',
+            name='longitude_radians',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='latitude_radians',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='longitude_radians',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='unit_x',
+            field=models.FloatField(default=0.0, editable=False, help_text='Unit-sphere vector of the airport'),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='unit_y',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='unit_z',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(backfill_coordinate_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0023_coordinate_radians'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingrule',
+            name='agent_commission_rate',
+            field=models.DecimalField(decimal_places=2, default=10.0, help_text='Agent commission percentage of the booking price', max_digits=5),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0024_pricingrule_agent_commission_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('departure_datetime', models.DateTimeField()),
+                ('return_datetime', models.DateTimeField(blank=True, null=True)),
+                ('trip_type', models.CharField(choices=[('one_way', 'One Way'), ('round_trip', 'Round Trip'), ('multi_leg', 'Multi-leg')], max_length=20)),
+                ('is_empty_leg', models.BooleanField(default=False)),
+                ('passenger_count', models.PositiveIntegerField()),
+                ('flight_hours', models.DecimalField(decimal_places=1, max_digits=5)),
+                ('legs', models.JSONField(help_text='Priced legs in order: departure and arrival times, flight hours and leg price')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('commission_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('rule_version', models.BigIntegerField(help_text='Version of the pricing rules the legs were priced with')),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('aircraft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to='myapplication.aircraft')),
+                ('arrival_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrival_quotes', to='myapplication.airport')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quotes', to='myapplication.booking')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quotes', to=settings.AUTH_USER_MODEL)),
+                ('departure_airport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='departure_quotes', to='myapplication.airport')),
+            ],
+        ),
+    ]
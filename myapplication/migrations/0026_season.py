@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0025_quote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('region', models.CharField(blank=True, help_text='Departure country (as on the airport) the season applies to; blank for everywhere', max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(help_text='Last day of the season (inclusive)')),
+                ('multiplier', models.DecimalField(blank=True, decimal_places=2, help_text="Overrides the pricing rule's peak season multiplier when set", max_digits=5, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['start_date', 'name'],
+            },
+        ),
+    ]
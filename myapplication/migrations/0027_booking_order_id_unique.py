@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapplication', '0026_season'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_order_id',
+            field=models.CharField(blank=True, max_length=10, null=True, unique=True),
+        ),
+    ]
@@ -1,8 +1,14 @@
+import math
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from .codes import insert_with_codes, new_code, new_codes
+
 class User(AbstractUser):
     """Custom user model that extends Django's built-in user model"""
     USER_TYPE_CHOICES = (
@@ -47,6 +53,13 @@ class AircraftType(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='helicopter')
     price_per_hour_usd = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Flight profile used by flight_time.py; blank fields use the category default
+    taxi_minutes = models.PositiveIntegerField(blank=True, null=True, help_text="Taxi allowance per leg (both ends) in minutes")
+    climb_minutes = models.PositiveIntegerField(blank=True, null=True, help_text="Time to climb to cruise altitude in minutes")
+    climb_speed_knots = models.PositiveIntegerField(blank=True, null=True, help_text="Average ground speed while climbing in knots")
+    descent_minutes = models.PositiveIntegerField(blank=True, null=True, help_text="Time to descend from cruise altitude in minutes")
+    descent_speed_knots = models.PositiveIntegerField(blank=True, null=True, help_text="Average ground speed while descending in knots")
+
     def __str__(self):
         return self.name
 
@@ -77,6 +90,20 @@ class AircraftImage(models.Model):
     def __str__(self):
         return self.caption or f"Aircraft Image {self.id}"
 
+def radians_of(latitude, longitude):
+    return math.radians(float(latitude)), math.radians(float(longitude))
+
+
+def with_derived_fields(update_fields, derived):
+    """Extend a save()'s update_fields with derived columns when the coordinates are saved"""
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    if update_fields & {'latitude', 'longitude'}:
+        update_fields.update(derived)
+    return update_fields
+
+
 class Airport(models.Model):
     """Airport information"""
     icao_code = models.CharField(max_length=4, unique=True)
@@ -88,6 +115,28 @@ class Airport(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     is_private_aviation_friendly = models.BooleanField(default=False)
 
+    # Derived from latitude/longitude on save, read by the distance code (geo.py, spatial.py)
+    latitude_radians = models.FloatField(default=0.0, editable=False)
+    longitude_radians = models.FloatField(default=0.0, editable=False)
+    unit_x = models.FloatField(default=0.0, editable=False, help_text="Unit-sphere vector of the airport")
+    unit_y = models.FloatField(default=0.0, editable=False)
+    unit_z = models.FloatField(default=0.0, editable=False)
+
+    COORDINATE_COLUMNS = ['latitude_radians', 'longitude_radians', 'unit_x', 'unit_y', 'unit_z']
+
+    def update_coordinate_columns(self):
+        """Recompute the radian and unit-vector columns from latitude/longitude"""
+        self.latitude_radians, self.longitude_radians = radians_of(self.latitude, self.longitude)
+        cos_latitude = math.cos(self.latitude_radians)
+        self.unit_x = cos_latitude * math.cos(self.longitude_radians)
+        self.unit_y = cos_latitude * math.sin(self.longitude_radians)
+        self.unit_z = math.sin(self.latitude_radians)
+
+    def save(self, *args, **kwargs):
+        self.update_coordinate_columns()
+        kwargs['update_fields'] = with_derived_fields(kwargs.get('update_fields'), self.COORDINATE_COLUMNS)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.icao_code} - {self.name}"
 
@@ -106,8 +155,22 @@ class Availability(models.Model):
     def __str__(self):
         return f"{self.aircraft} available from {self.start_datetime} to {self.end_datetime}"
 
-import random
-import string
+
+class AircraftCalendar(models.Model):
+    """
+    Materialized day-by-day availability of an aircraft: bit i of each bitmap
+    is the (i)th day from start_date. Maintained by fleet_calendar.py
+    """
+    aircraft = models.OneToOneField(Aircraft, on_delete=models.CASCADE, primary_key=True, related_name='calendar')
+    start_date = models.DateField()
+    days = models.PositiveIntegerField()
+    free_days = models.BinaryField(help_text="Days the aircraft can be booked")
+    booked_days = models.BinaryField(help_text="Days with confirmed or pending flight legs")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Calendar of {self.aircraft} from {self.start_date}"
+
 
 from django.core.validators import MinValueValidator
 
@@ -138,7 +201,7 @@ class Booking(models.Model):
     owner_earnings = models.DecimalField(max_digits=12, decimal_places=2)
     payment_status = models.BooleanField(default=False)
     special_requests = models.TextField(blank=True)
-    booking_order_id =  models.CharField(max_length=10, blank=True, null=True)
+    booking_order_id =  models.CharField(max_length=10, blank=True, null=True, unique=True)
 
     # New fields for empty leg functionality
     is_empty_leg = models.BooleanField(default=False)
@@ -147,23 +210,16 @@ class Booking(models.Model):
     stay_duration_days = models.PositiveIntegerField(null=True, blank=True)
     
     def generate_booking_order_id(self):
-        """Generate a unique 10-character alphanumeric booking order ID"""
-        while True:
-            # Generate 8 random alphanumeric characters + 2 digits
-            letters_digits = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            # Add 2 more digits at the end
-            digits = ''.join(random.choices(string.digits, k=2))
-            code = letters_digits + digits
-            
-            # Check if code already exists
-            if not Booking.objects.filter(booking_order_id=code).exists():
-                return code
+        """Generate a random 10-character booking order ID ending in a check symbol; see codes.py"""
+        return new_code()
     
     def save(self, *args, **kwargs):
-        # Generate booking order ID only if it doesn't exist
-        if not self.booking_order_id:
-            self.booking_order_id = self.generate_booking_order_id()
-        super().save(*args, **kwargs)
+        # Generate booking order ID only if it doesn't exist, drawing a new one if it is taken
+        if self.booking_order_id:
+            return super().save(*args, **kwargs)
+        self.booking_order_id = self.generate_booking_order_id()
+        save = super().save
+        insert_with_codes(lambda: save(*args, **kwargs), [self], 'booking_order_id')
 
     def __str__(self):
         return f"Booking #{self.id} - {self.client} for {self.aircraft}"
@@ -182,10 +238,122 @@ class FlightLeg(models.Model):
 
     class Meta:
         ordering = ['booking', 'sequence']
+        indexes = [
+            models.Index(fields=['departure_datetime', 'arrival_datetime']),
+        ]
 
     def __str__(self):
         return f"Leg {self.sequence} of Booking {self.booking.id}: {self.departure_airport} to {self.arrival_airport}"
 
+
+class BookingHold(models.Model):
+    """
+    Short-lived reservation of an aircraft for the legs of a booking in
+    progress. Claimed when the client opens the booking form and consumed
+    when the booking is created; see holds.py
+    """
+    token = models.UUIDField(db_index=True)
+    aircraft = models.ForeignKey(Aircraft, on_delete=models.CASCADE, related_name='holds')
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='booking_holds')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['aircraft', 'start_datetime', 'end_datetime']),
+        ]
+
+    def __str__(self):
+        return f"Hold on {self.aircraft} from {self.start_datetime} to {self.end_datetime} until {self.expires_at}"
+
+class Quote(models.Model):
+    """
+    Price snapshot of one search result. Saved for every aircraft a search
+    shows and reused by create_booking, so the client books the legs and
+    price they were shown; see quotes.py
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    aircraft = models.ForeignKey(Aircraft, on_delete=models.CASCADE, related_name='quotes')
+    departure_airport = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name='departure_quotes')
+    arrival_airport = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name='arrival_quotes')
+    departure_datetime = models.DateTimeField()
+    return_datetime = models.DateTimeField(null=True, blank=True)
+    trip_type = models.CharField(max_length=20, choices=Booking.TRIP_TYPE_CHOICES)
+    is_empty_leg = models.BooleanField(default=False)
+    passenger_count = models.PositiveIntegerField()
+    flight_hours = models.DecimalField(max_digits=5, decimal_places=1)
+    legs = models.JSONField(help_text="Priced legs in order: departure and arrival times, flight hours and leg price")
+    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+    commission_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    rule_version = models.BigIntegerField(help_text="Version of the pricing rules the legs were priced with")
+    expires_at = models.DateTimeField(db_index=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='quotes')
+    created_at = models.DateTimeField(auto_now_add=True)
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='quotes')
+
+    def __str__(self):
+        return f"Quote {self.id} for {self.aircraft}: {self.departure_airport} to {self.arrival_airport} at {self.total_price}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    First response to a POST sent with an Idempotency-Key, replayed to
+    retries of the same submission until it expires; see idempotency.py
+    """
+    scope = models.CharField(max_length=100, help_text="View the key was sent to")
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='idempotency_records')
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the submitted data")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Empty while the first request is running")
+    response_body = models.TextField(blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status_code or 'in progress'})"
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued by a request in its own transaction and delivered later by
+    the send_outbox_emails command, so requests never wait on SMTP; see
+    outbox.py
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(help_text="List of recipient addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not sent before this time; pushed back after each failure")
+    claim_token = models.UUIDField(null=True, blank=True, editable=False, help_text="Sender batch currently delivering this email")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
 class PricingRule(models.Model):
     """Rules for calculating prices based on various factors"""
     aircraft_type = models.ForeignKey(AircraftType, on_delete=models.CASCADE)
@@ -199,10 +367,51 @@ class PricingRule(models.Model):
                                           help_text="Additional percentage for weekend flights")
     last_minute_surcharge = models.DecimalField(max_digits=5, decimal_places=2, default=0,
                                               help_text="Additional percentage for bookings made within 24 hours")
+    agent_commission_rate = models.DecimalField(max_digits=5, decimal_places=2, default=10.00,
+                                                help_text="Agent commission percentage of the booking price")
 
     def __str__(self):
         return f"Pricing for {self.aircraft_type}"
 
+class Season(models.Model):
+    """
+    Peak pricing period, e.g. Christmas or the migration season. Departures
+    within it pay the aircraft type's peak_season_multiplier, or the
+    season's own multiplier when set; see seasons.py
+    """
+    name = models.CharField(max_length=100)
+    region = models.CharField(max_length=100, blank=True,
+                              help_text="Departure country (as on the airport) the season applies to; blank for everywhere")
+    start_date = models.DateField()
+    end_date = models.DateField(help_text="Last day of the season (inclusive)")
+    multiplier = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True,
+                                     help_text="Overrides the pricing rule's peak season multiplier when set")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['start_date', 'name']
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'The season cannot end before it starts.'})
+
+    def __str__(self):
+        region = f" ({self.region})" if self.region else ""
+        return f"{self.name}{region}: {self.start_date} to {self.end_date}"
+
+
+class PricingVersion(models.Model):
+    """
+    Single row counting PricingRule and Season edits. Every worker compares
+    it with the version of its compiled pricing table, so an edit saved by
+    one process is priced with everywhere at once; see pricing.py
+    """
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Pricing version {self.version}"
+
 class ClientPreferences(models.Model):
     """Client preferences and frequent flyer information"""
     client = models.OneToOneField(User, on_delete=models.CASCADE, related_name='preferences')
@@ -243,15 +452,26 @@ class AircraftTracking(models.Model):
     speed = models.PositiveIntegerField(help_text="Speed in knots")
     source = models.CharField(max_length=50, help_text="Source of tracking data")
 
+    # Derived from latitude/longitude on save; bulk_create callers call update_coordinate_columns()
+    latitude_radians = models.FloatField(default=0.0, editable=False)
+    longitude_radians = models.FloatField(default=0.0, editable=False)
+
     class Meta:
         ordering = ['-timestamp']
         get_latest_by = 'timestamp'
 
+    def update_coordinate_columns(self):
+        self.latitude_radians, self.longitude_radians = radians_of(self.latitude, self.longitude)
+        return self
+
+    def save(self, *args, **kwargs):
+        self.update_coordinate_columns()
+        kwargs['update_fields'] = with_derived_fields(kwargs.get('update_fields'), ['latitude_radians', 'longitude_radians'])
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.aircraft} at {self.timestamp}"
     
-import random
-import string
 from django.db import models
 
 class Passenger(models.Model):
@@ -262,24 +482,22 @@ class Passenger(models.Model):
     passport_number = models.CharField(max_length=100, blank=True)
     order = models.CharField(max_length=10, blank=True, unique=True)
     
+    @staticmethod
+    def generate_order_codes(count):
+        """`count` order codes for bulk inserts, drawn without a query; see codes.py"""
+        return new_codes(count)
+
     def generate_order_code(self):
-        """Generate a unique 10-character alphanumeric code"""
-        while True:
-            # Generate 8 random alphanumeric characters + 2 digits
-            letters_digits = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            # Add 2 more digits at the end
-            digits = ''.join(random.choices(string.digits, k=2))
-            code = letters_digits + digits
-            
-            # Check if code already exists
-            if not Passenger.objects.filter(order=code).exists():
-                return code
+        """Generate a random 10-character code ending in a check symbol"""
+        return new_code()
     
     def save(self, *args, **kwargs):
-        # Generate code only if it doesn't exist
-        if not self.order:
-            self.order = self.generate_order_code()
-        super().save(*args, **kwargs)
+        # Generate code only if it doesn't exist, drawing a new one if it is taken
+        if self.order:
+            return super().save(*args, **kwargs)
+        self.order = self.generate_order_code()
+        save = super().save
+        insert_with_codes(lambda: save(*args, **kwargs), [self], 'order')
     
     def __str__(self):
         return f"{self.name} - {self.passport_number or 'No Passport'}"
@@ -310,14 +528,11 @@ class AirCargoRequest(models.Model):
     def __str__(self):
         return f"Cargo Request #{self.id} - {self.departure} to {self.destination}"
 
-import string
-import random
 from django.db import models
 
 def generate_inquiry_code():
-    """Generate a random 10-character alphanumeric code"""
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(10))
+    """Generate a random 10-character code ending in a check symbol; see codes.py"""
+    return new_code()
 
 class AircraftLeasingInquiry(models.Model):
     LEASING_TYPE_CHOICES = [
@@ -350,14 +565,13 @@ class AircraftLeasingInquiry(models.Model):
     supporting_document_2 = models.FileField(upload_to='aircraft_leasing/documents/', blank=True, null=True)
     
     def save(self, *args, **kwargs):
-        # Ensure unique code generation in case of collision
+        # The unique constraint catches collisions of new codes; draw another and retry
         if not self.inquiry_code:
-            while True:
-                code = generate_inquiry_code()
-                if not AircraftLeasingInquiry.objects.filter(inquiry_code=code).exists():
-                    self.inquiry_code = code
-                    break
-        super().save(*args, **kwargs)
+            self.inquiry_code = generate_inquiry_code()
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        save = super().save
+        insert_with_codes(lambda: save(*args, **kwargs), [self], 'inquiry_code')
     
     def __str__(self):
         return f"Inquiry {self.inquiry_code} - {self.get_leasing_type_display()}"
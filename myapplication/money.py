@@ -0,0 +1,114 @@
+import functools
+from decimal import ROUND_HALF_UP, Decimal
+
+
+def scale_cents(cents, factor):
+    """
+    Whole cents times a factor (float, Decimal or int), multiplied in Decimal
+    and rounded half up, so e.g. a 1.15 multiplier is applied as exactly 1.15
+    """
+    return int((Decimal(cents) * Decimal(str(factor))).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+@functools.total_ordering
+class Money:
+    """
+    An amount in integer minor units (cents). Pricing, commission and payout
+    arithmetic stays in whole cents, so totals are exact sums of their parts;
+    amounts become Decimal only when they are written to the database
+    (to_decimal) and float only for JSON and templates.
+    """
+    __slots__ = ('cents',)
+
+    def __init__(self, cents=0):
+        self.cents = cents
+
+    @classmethod
+    def from_decimal(cls, value):
+        """Money for a Decimal (or str or int) amount in major units, rounded to the cent"""
+        return cls(int((Decimal(value) * 100).to_integral_value(rounding=ROUND_HALF_UP)))
+
+    def to_decimal(self):
+        return Decimal(self.cents).scaleb(-2)
+
+    def scale(self, factor):
+        """This amount multiplied by a factor (hours, multipliers), rounded to the cent; see scale_cents"""
+        return Money(scale_cents(self.cents, factor))
+
+    def allocate(self, ratios):
+        """
+        Split into len(ratios) amounts proportional to the (non-negative
+        integer) ratios that add up to exactly this amount. Leftover cents
+        go to the shares with the largest remainders, earlier shares first.
+        """
+        total = sum(ratios)
+        if total <= 0:
+            raise ValueError('Cannot allocate money by ratios that add up to zero')
+        shares, remainders = [], []
+        for ratio in ratios:
+            share, remainder = divmod(self.cents * ratio, total)
+            shares.append(share)
+            remainders.append(remainder)
+        leftover = self.cents - sum(shares)
+        for index in sorted(range(len(ratios)), key=lambda index: -remainders[index])[:leftover]:
+            shares[index] += 1
+        return [Money(share) for share in shares]
+
+    def split(self, parts):
+        """`parts` amounts, as equal as possible, that add up to exactly this amount"""
+        return self.allocate([1] * parts)
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return bool(self.cents)
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __str__(self):
+        units, cents = divmod(abs(self.cents), 100)
+        return f"{'-' if self.cents < 0 else ''}{units}.{cents:02d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+
+def split_commission(total, commission_rate):
+    """
+    (agent_commission, owner_earnings) of `total` at commission_rate percent
+    (a Decimal or str with up to two decimals); the two always add up to total.
+    """
+    basis_points = int(Decimal(str(commission_rate)) * 100)
+    return tuple(total.allocate([basis_points, 10000 - basis_points]))
@@ -0,0 +1,98 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# A claimed batch is retried by another sender if it is not settled within this time
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def max_attempts():
+    return getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the `attempts`th failure: 1, 2, 4 ... minutes, at most 6 hours"""
+    return timedelta(seconds=min(60 * 2 ** (attempts - 1), 6 * 3600))
+
+
+def enqueue_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """
+    Queue an email with send_mail's arguments. Call it inside the transaction
+    that creates what the email is about, so the email is sent if and only if
+    that commits.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def claim_batch(batch_size, now):
+    """
+    Claim up to batch_size due emails for this sender: the claim moves
+    next_attempt_at past the lease, so concurrent senders skip them.
+    """
+    token = uuid.uuid4()
+    due = OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    due.filter(pk__in=ids).update(claim_token=token, next_attempt_at=now + CLAIM_LEASE)
+    return list(OutboxEmail.objects.filter(claim_token=token).order_by('pk'))
+
+
+def send_outbox_batch(batch_size=50):
+    """
+    Deliver one batch of due emails over a single SMTP connection.
+    Failures are retried with exponential backoff until max_attempts().
+    Returns (sent, failed) counts.
+    """
+    now = timezone.now()
+    emails = claim_batch(batch_size, now)
+    if not emails:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # No connection: the whole batch is retried later
+        for email in emails:
+            record_failure(email, e)
+        return 0, len(emails)
+
+    sent_ids, failed = [], 0
+    try:
+        for email in emails:
+            message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                record_failure(email, e)
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    OutboxEmail.objects.filter(pk__in=sent_ids).update(status='sent', sent_at=timezone.now(), claim_token=None)
+    return len(sent_ids), failed
+
+
+def record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.claim_token = None
+    if email.attempts >= max_attempts():
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'claim_token', 'status', 'next_attempt_at'])
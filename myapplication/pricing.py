@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import make_aware
+from .models import PricingRule, PricingVersion
+from .money import Money, scale_cents
+from .seasons import load_calendar
+
+# Applied to aircraft types without a PricingRule, as the hardcoded pricing did before
+DEFAULT_EMPTY_LEG_DISCOUNT = 25.0
+DEFAULT_COMMISSION_RATE = 10.0
+
+# Departures closer than this to the time of quoting pay the last-minute surcharge
+LAST_MINUTE_WINDOW = timedelta(hours=24)
+
+# PricingRule columns compiled into a CompiledRule, in its argument order
+RULE_COLUMNS = ('empty_leg_discount', 'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge', 'agent_commission_rate')
+
+
+def is_last_minute(departure_datetime, now):
+    return departure_datetime is not None and make_aware(departure_datetime) - now < LAST_MINUTE_WINDOW
+
+
+class CompiledRule:
+    """A PricingRule reduced to plain floats (percentages stay percentages)"""
+    __slots__ = ('empty_leg_discount', 'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge', 'commission_rate')
+
+    def __init__(self, empty_leg_discount=DEFAULT_EMPTY_LEG_DISCOUNT, peak_season_multiplier=1.0,
+                 weekend_surcharge=0.0, last_minute_surcharge=0.0, commission_rate=DEFAULT_COMMISSION_RATE):
+        self.empty_leg_discount = float(empty_leg_discount)
+        self.peak_season_multiplier = float(peak_season_multiplier)
+        self.weekend_surcharge = float(weekend_surcharge)
+        self.last_minute_surcharge = float(last_minute_surcharge)
+        self.commission_rate = float(commission_rate)
+
+
+DEFAULT_RULE = CompiledRule()
+
+
+class PricingTable:
+    """
+    Every PricingRule compiled into a lookup keyed by aircraft type id.
+
+    The aircraft's own hourly_rate and minimum_hours give the base price of a
+    leg, as before; the type's rule adds the peak-season multiplier (for
+    departures within a Season of the compiled SeasonCalendar), weekend
+    and last-minute surcharges, the empty-leg discount and the agent
+    commission. Pricing never queries the database.
+    """
+
+    def __init__(self, rules, version, calendar):
+        self.rules = rules
+        self.version = version
+        self.calendar = calendar
+
+    def rule_for(self, aircraft):
+        return self.rules.get(aircraft.aircraft_type_id, DEFAULT_RULE)
+
+    def adjustment(self, rule, departure_datetime, now=None, region=''):
+        """Price factor for a leg departing from `region` (a country) at departure_datetime, quoted at `now`"""
+        if departure_datetime is None:
+            return 1.0
+        departure_datetime = make_aware(departure_datetime)
+        local = timezone.localtime(departure_datetime)
+        factor = self.calendar.multiplier(local.date(), region, rule.peak_season_multiplier)
+        surcharge = rule.weekend_surcharge if local.weekday() >= 5 else 0.0
+        if now is not None and is_last_minute(departure_datetime, now):
+            surcharge += rule.last_minute_surcharge
+        return factor * (1 + surcharge / 100)
+
+    def leg_price(self, aircraft, flight_hours, departure_datetime=None, now=None, region=''):
+        """Price of one leg as Money, billing at least the aircraft's minimum hours"""
+        billable_hours = max(float(flight_hours), float(aircraft.minimum_hours))
+        adjustment = self.adjustment(self.rule_for(aircraft), departure_datetime, now, region)
+        return Money.from_decimal(aircraft.hourly_rate).scale(billable_hours * adjustment)
+
+    def with_empty_leg_return(self, aircraft, one_way_price):
+        """One-way price plus the discounted empty-leg return flight"""
+        discount = self.rule_for(aircraft).empty_leg_discount
+        return one_way_price + one_way_price.scale(1 - discount / 100)
+
+    def commission_rate(self, aircraft):
+        return self.rule_for(aircraft).commission_rate
+
+    def quote_trip(self, aircraft, flight_hours, trip_type, is_empty_leg, departure_datetime=None, return_datetime=None, now=None,
+                   departure_region='', return_region=''):
+        """
+        Price a search result. Returns leg_prices (outbound, plus the return
+        leg of a round trip), base_price (outbound), total_price, for empty
+        legs original_price (outbound before the empty-leg return), all as
+        Money, and the commission_rate and rule_version a booking at this
+        price uses. Seasons are looked up for the country each leg departs from.
+        """
+        outbound = self.leg_price(aircraft, flight_hours, departure_datetime, now, departure_region)
+        original_price = outbound if is_empty_leg else None
+        if is_empty_leg:
+            outbound = self.with_empty_leg_return(aircraft, outbound)
+        leg_prices = [outbound]
+
+        if trip_type == 'round_trip':
+            inbound = self.leg_price(aircraft, flight_hours, return_datetime or departure_datetime, now, return_region)
+            leg_prices.append(self.with_empty_leg_return(aircraft, inbound) if is_empty_leg else inbound)
+
+        return {
+            'leg_prices': leg_prices,
+            'base_price': outbound,
+            'total_price': sum(leg_prices, Money()),
+            'original_price': original_price,
+            'commission_rate': self.commission_rate(aircraft),
+            'rule_version': self.version,
+        }
+
+    def quote_fleet(self, fleet, flight_hours, trip_type, is_empty_leg, departure_datetime=None, return_datetime=None, now=None,
+                    departure_region='', return_region=''):
+        """
+        quote_trip for a whole search at once: prices every aircraft in
+        `fleet` flying the matching entry of `flight_hours`. Rules and date
+        adjustments are looked up once per aircraft type, then the prices are
+        worked out column by column in integer cents. Returns one quote
+        record per aircraft.
+        """
+        round_trip = trip_type == 'round_trip'
+        factors_by_type = {}
+        for aircraft in fleet:
+            if aircraft.aircraft_type_id not in factors_by_type:
+                rule = self.rule_for(aircraft)
+                factors_by_type[aircraft.aircraft_type_id] = (
+                    self.adjustment(rule, departure_datetime, now, departure_region),
+                    self.adjustment(rule, return_datetime or departure_datetime, now, return_region) if round_trip else None,
+                    1 - rule.empty_leg_discount / 100,
+                    rule.commission_rate,
+                )
+        factors = [factors_by_type[aircraft.aircraft_type_id] for aircraft in fleet]
+
+        billable_hours = [max(float(hours), float(aircraft.minimum_hours)) for aircraft, hours in zip(fleet, flight_hours)]
+        hourly_cents = [Money.from_decimal(aircraft.hourly_rate).cents for aircraft in fleet]
+
+        outbound = [scale_cents(rate, hours * factor[0]) for rate, hours, factor in zip(hourly_cents, billable_hours, factors)]
+        original_prices = [Money(cents) for cents in outbound] if is_empty_leg else [None] * len(fleet)
+        if is_empty_leg:
+            outbound = [cents + scale_cents(cents, factor[2]) for cents, factor in zip(outbound, factors)]
+
+        if round_trip:
+            inbound = [scale_cents(rate, hours * factor[1]) for rate, hours, factor in zip(hourly_cents, billable_hours, factors)]
+            if is_empty_leg:
+                inbound = [cents + scale_cents(cents, factor[2]) for cents, factor in zip(inbound, factors)]
+            leg_cents = [(out, back) for out, back in zip(outbound, inbound)]
+        else:
+            leg_cents = [(out,) for out in outbound]
+
+        return [
+            {
+                'leg_prices': [Money(cents) for cents in legs],
+                'base_price': Money(legs[0]),
+                'total_price': Money(sum(legs)),
+                'original_price': original_price,
+                'commission_rate': factor[3],
+                'rule_version': self.version,
+            }
+            for legs, original_price, factor in zip(leg_cents, original_prices, factors)
+        ]
+
+    def price_legs(self, aircraft, flight_legs, now=None, is_empty_leg=False):
+        """
+        Price explicit flight legs (dicts with flight_hours and, optionally,
+        departure_datetime and departure_airport), each leg as quote_trip
+        prices one, including the empty-leg return. Returns (leg_prices as
+        Money, total_hours, actual_flight_hours).
+        """
+        minimum_hours = float(aircraft.minimum_hours)
+        leg_prices = []
+        total_hours = actual_flight_hours = 0.0
+        for leg in flight_legs:
+            flight_hours = float(leg['flight_hours'])
+            actual_flight_hours += flight_hours
+            total_hours += max(flight_hours, minimum_hours)
+            region = getattr(leg.get('departure_airport'), 'country', '')
+            price = self.leg_price(aircraft, flight_hours, leg.get('departure_datetime'), now, region)
+            leg_prices.append(self.with_empty_leg_return(aircraft, price) if is_empty_leg else price)
+        return leg_prices, total_hours, actual_flight_hours
+
+
+def current_version():
+    """Version of the pricing rules shared by all workers: one primary key lookup, 0 before the first edit"""
+    return PricingVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """Move the shared pricing version, so every worker recompiles its table on its next quote"""
+    if not PricingVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        PricingVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+class PricingEngine:
+    """
+    Holds the compiled PricingTable of this process. The table and its
+    season calendar are rebuilt with two queries whenever the shared
+    version in the database moves, which the PricingRule and Season signals
+    in signals.py do on every save and delete, so every worker prices with
+    an edit from its next quote on. Checking the version costs one primary
+    key lookup per table() call. The table is also rebuilt after `max_age`
+    seconds, picking up edits that bypassed the signals (e.g. queryset
+    updates).
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self._table = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def table(self):
+        version = current_version()
+        with self._lock:
+            if (
+                self._table is None
+                or self._table.version != version
+                or time.monotonic() - self._loaded_at >= self.max_age
+            ):
+                rules = {
+                    aircraft_type_id: CompiledRule(*values)
+                    for aircraft_type_id, *values in PricingRule.objects.values_list('aircraft_type_id', *RULE_COLUMNS)
+                }
+                self._table = PricingTable(rules, version, load_calendar())
+                self._loaded_at = time.monotonic()
+            return self._table
+
+    def invalidate(self):
+        bump_version()
+        with self._lock:
+            self._table = None
+
+
+pricing_engine = PricingEngine()
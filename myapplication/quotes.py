@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .holds import parse_token
+from .models import Quote
+from .money import Money
+from .pricing import current_version
+
+
+def quote_ttl():
+    return timedelta(seconds=getattr(settings, 'QUOTE_TTL_SECONDS', 1800))
+
+
+def booking_leg_times(departure_datetime, return_datetime, trip_type, flight_hours):
+    """Departure and arrival times of the legs create_booking will create"""
+    duration = timedelta(hours=float(flight_hours))
+    legs = [{'departure_datetime': departure_datetime, 'arrival_datetime': departure_datetime + duration}]
+    if trip_type == 'round_trip' and return_datetime:
+        legs.append({'departure_datetime': return_datetime, 'arrival_datetime': return_datetime + duration})
+    return legs
+
+
+def save_search_quotes(params, results, user=None):
+    """
+    Save a Quote for every search result (quote_aircraft dicts) with one
+    insert. Returns copies of the results carrying their quote_id; the
+    results themselves may be shared through the search cache.
+    """
+    expires_at = timezone.now() + quote_ttl()
+    quotes = []
+    for result in results:
+        flight_hours = Decimal(str(result['estimated_flight_hours']))
+        legs = booking_leg_times(params['departure_datetime'], params['return_datetime'], params['trip_type'], flight_hours)
+        quotes.append(Quote(
+            aircraft=result['aircraft'],
+            departure_airport=params['departure_airport'],
+            arrival_airport=params['arrival_airport'],
+            departure_datetime=params['departure_datetime'],
+            return_datetime=params['return_datetime'],
+            trip_type=params['trip_type'],
+            is_empty_leg=params['is_empty_leg'],
+            passenger_count=params['passenger_count'],
+            flight_hours=flight_hours,
+            legs=[
+                {
+                    'departure_datetime': leg['departure_datetime'].isoformat(),
+                    'arrival_datetime': leg['arrival_datetime'].isoformat(),
+                    'flight_hours': str(flight_hours),
+                    'leg_price': str(leg_price),
+                } for leg, leg_price in zip(legs, result['leg_prices'])
+            ],
+            total_price=result['total_price'].to_decimal(),
+            commission_rate=Decimal(str(result['commission_rate'])),
+            rule_version=result['rule_version'],
+            expires_at=expires_at,
+            created_by=user if user is not None and user.is_authenticated else None,
+        ))
+    Quote.objects.bulk_create(quotes)
+    return [dict(result, quote_id=quote.id) for result, quote in zip(results, quotes)]
+
+
+def live_quote(quote_id, aircraft_id, departure_code, arrival_code, departure_datetime, return_datetime, trip_type, is_empty_leg,
+               passenger_count):
+    """
+    The unexpired Quote `quote_id` with its aircraft and airports, if it is
+    for exactly this trip and was priced with the current pricing rules.
+    Returns None for a missing, malformed, expired, mismatched or repriced
+    quote, in which case the booking is priced afresh.
+    """
+    quote_id = parse_token(quote_id)
+    if not quote_id:
+        return None
+    quote = Quote.objects.select_related(
+        'aircraft__aircraft_type', 'departure_airport', 'arrival_airport'
+    ).filter(pk=quote_id, expires_at__gt=timezone.now(), booking__isnull=True).first()
+    if quote is None:
+        return None
+
+    if trip_type != 'round_trip':
+        return_datetime = None
+    matches = (
+        str(quote.aircraft_id) == str(aircraft_id)
+        and quote.departure_airport.icao_code == departure_code
+        and quote.arrival_airport.icao_code == arrival_code
+        and quote.departure_datetime == departure_datetime
+        and (quote.return_datetime if quote.trip_type == 'round_trip' else None) == return_datetime
+        and quote.trip_type == trip_type
+        and quote.is_empty_leg == is_empty_leg
+        and quote.passenger_count == passenger_count
+        and quote.rule_version == current_version()
+    )
+    return quote if matches else None
+
+
+def quoted_legs(quote):
+    """Leg times and prices of a quote, as booking_leg_times dicts with a Money leg_price"""
+    return [
+        {
+            'departure_datetime': datetime.fromisoformat(leg['departure_datetime']),
+            'arrival_datetime': datetime.fromisoformat(leg['arrival_datetime']),
+            'flight_hours': Decimal(leg['flight_hours']),
+            'leg_price': Money.from_decimal(leg['leg_price']),
+        } for leg in quote.legs
+    ]
+
+
+def sweep_stale_quotes(days=0):
+    """
+    Delete quotes that expired over `days` days ago (by default as soon as they
+    expire) without being booked; returns how many were removed
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Quote.objects.filter(expires_at__lte=cutoff, booking__isnull=True).delete()
+    return deleted
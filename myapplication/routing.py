@@ -0,0 +1,150 @@
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+from .flight_time import block_hours, flight_profile
+from .geo import airport_coordinates, distances_from
+from .spatial import airport_index
+
+# Share of the published range planned per leg, keeping a fuel reserve
+RANGE_RESERVE_FACTOR = 0.9
+
+# Itineraries needing more fuel stops than this are treated as infeasible
+MAX_FUEL_STOPS = 3
+
+
+def usable_range_nm(aircraft_type):
+    return aircraft_type.range_nautical_miles * RANGE_RESERVE_FACTOR
+
+
+class RoutePlan:
+    """Itinerary of one aircraft type between two airports"""
+    __slots__ = ('stops', 'leg_distances')
+
+    def __init__(self, stops, leg_distances):
+        self.stops = stops
+        self.leg_distances = leg_distances
+
+    @property
+    def distance_nm(self):
+        return sum(self.leg_distances)
+
+    def flight_hours(self, aircraft_type):
+        """Block hours for the itinerary, each leg flown with the type's full flight profile"""
+        profile = flight_profile(aircraft_type)
+        return round(sum(block_hours(profile, distance) for distance in self.leg_distances), 1)
+
+
+class FuelStopPlanner:
+    """
+    Finds the itinerary with the fewest fuel stops (then the shortest total
+    distance) an aircraft type needs between two airports, using A* over the
+    airport graph with legs limited to the usable range. Each expanded
+    airport only looks at the airports within range of it, found through the
+    spatial index.
+
+    Plans are kept in an LRU cache keyed on (aircraft type, range, airport
+    pair), and dropped by the Airport signals in signals.py.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan(self, aircraft_type, departure_icao, arrival_icao):
+        """Return a RoutePlan, or None if the route needs more than MAX_FUEL_STOPS stops"""
+        key = (aircraft_type.id, aircraft_type.range_nautical_miles, departure_icao, arrival_icao)
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                return self._plans[key]
+
+        plan = self._search(usable_range_nm(aircraft_type), departure_icao, arrival_icao)
+
+        with self._lock:
+            self._plans[key] = plan
+            if len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def _search(self, leg_range, departure_icao, arrival_icao):
+        points = airport_coordinates.points()
+        origin, destination = points.get(departure_icao), points.get(arrival_icao)
+        if origin is None or destination is None:
+            # Unknown coordinates: nothing to check against, keep the nonstop assumption
+            return RoutePlan([], [])
+
+        direct = distances_from(origin, [destination])[0]
+        if direct <= leg_range:
+            return RoutePlan([], [direct])
+        if leg_range <= 0 or math.ceil(direct / leg_range) - 1 > MAX_FUEL_STOPS:
+            return None
+
+        codes = list(points)
+        coordinates = [points[code] for code in codes]
+        to_destination = dict(zip(codes, distances_from(destination, coordinates)))
+
+        def estimate(code):
+            # Lower bound on (legs, distance) still to fly; consistent by the triangle inequality
+            remaining = to_destination[code]
+            return (math.ceil(remaining / leg_range), remaining)
+
+        legs_left, remaining = estimate(departure_icao)
+        queue = [(legs_left, remaining, 0, 0.0, departure_icao)]
+        best = {departure_icao: (0, 0.0)}
+        previous = {}
+
+        while queue:
+            _, _, legs, distance, code = heapq.heappop(queue)
+            if code == arrival_icao:
+                break
+            if best.get(code, (legs, distance)) < (legs, distance):
+                continue
+            for airport, hop in airport_index.around_airport(code, leg_range):
+                neighbour = airport.icao_code
+                if neighbour not in to_destination:
+                    # Added since the coordinates were loaded
+                    continue
+                cost = (legs + 1, distance + hop)
+                legs_left, remaining = estimate(neighbour)
+                # Prune itineraries that can no longer finish within MAX_FUEL_STOPS
+                if cost[0] + legs_left > MAX_FUEL_STOPS + 1:
+                    continue
+                if neighbour not in best or cost < best[neighbour]:
+                    best[neighbour] = cost
+                    previous[neighbour] = (code, hop)
+                    heapq.heappush(queue, (cost[0] + legs_left, cost[1] + remaining, cost[0], cost[1], neighbour))
+        else:
+            return None
+
+        stops, leg_distances = [], []
+        code = arrival_icao
+        while code != departure_icao:
+            code, hop = previous[code]
+            leg_distances.append(hop)
+            stops.append(code)
+        stops.pop()
+        return RoutePlan(stops[::-1], leg_distances[::-1])
+
+
+def plan_routes(aircraft_list, departure_airport, arrival_airport):
+    """
+    Keep the aircraft able to fly the route within MAX_FUEL_STOPS fuel stops.
+    Each kept aircraft gets a route_plan attribute (a RoutePlan).
+    """
+    feasible = []
+    for aircraft in aircraft_list:
+        plan = fuel_stop_planner.plan(aircraft.aircraft_type, departure_airport.icao_code, arrival_airport.icao_code)
+        if plan is not None:
+            aircraft.route_plan = plan
+            feasible.append(aircraft)
+    return feasible
+
+
+fuel_stop_planner = FuelStopPlanner()
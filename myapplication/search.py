@@ -0,0 +1,182 @@
+from django.db.models import Exists, OuterRef, Value, BooleanField
+
+from .flight_time import block_hours, flight_profile
+from .geo import airport_coordinates, distances_from
+from .models import Aircraft, Availability
+from .routing import plan_routes
+
+# Repositioning candidates offered when few aircraft are parked at the departure airport
+MAX_REPOSITIONING_CANDIDATES = 10
+
+
+def day_bounds(moment):
+    """Return the (start, end) datetimes of the calendar day containing `moment`"""
+    return (
+        moment.replace(hour=0, minute=0, second=0),
+        moment.replace(hour=23, minute=59, second=59),
+    )
+
+
+def annotate_availability(queryset, start_date, end_date, return_datetime=None):
+    """
+    Annotate an Aircraft queryset with everything the search needs to know
+    about availability, so the whole fleet is resolved in a single query:
+
+    - departure_conflict: a blocking (is_available=False) window overlaps the departure day
+    - return_conflict: a blocking window overlaps the return day (round trips only)
+    - has_window: any availability window touches the departure day
+    - has_open_window: an open (is_available=True) window touches the departure day
+    """
+    blocking = Availability.objects.filter(aircraft=OuterRef('pk'), is_available=False)
+    touching = Availability.objects.filter(
+        aircraft=OuterRef('pk'),
+        start_datetime__lte=end_date,
+        end_datetime__gte=start_date,
+    )
+
+    if return_datetime:
+        return_start, return_end = day_bounds(return_datetime)
+        return_conflict = Exists(blocking.filter(
+            start_datetime__lt=return_end,
+            end_datetime__gt=return_start,
+        ))
+    else:
+        return_conflict = Value(False, output_field=BooleanField())
+
+    return queryset.annotate(
+        departure_conflict=Exists(blocking.filter(
+            start_datetime__lt=end_date,
+            end_datetime__gt=start_date,
+        )),
+        return_conflict=return_conflict,
+        has_window=Exists(touching),
+        has_open_window=Exists(touching.filter(is_available=True)),
+    )
+
+
+def available_aircraft(queryset, start_date, end_date, return_datetime=None):
+    """Filter an Aircraft queryset down to aircraft free on the departure (and return) day"""
+    return annotate_availability(queryset, start_date, end_date, return_datetime).filter(
+        departure_conflict=False,
+        return_conflict=False,
+    )
+
+
+def find_suitable_aircraft(departure_airport, arrival_airport, departure_date_start, departure_date_end, passenger_count, return_datetime=None):
+    """
+    Find aircraft suitable for the trip with lenient criteria.
+
+    Aircraft without the range to fly the route within MAX_FUEL_STOPS fuel
+    stops are dropped before ranking and pricing.
+
+    Availability is resolved with annotated subqueries, so the search costs
+    at most two queries however large the fleet is.
+    """
+    candidates = Aircraft.objects.filter(
+        is_active=True,
+        aircraft_type__passenger_capacity__gte=passenger_count
+    ).select_related('aircraft_type', 'owner')
+
+    # Primary search: aircraft currently at the departure location that have the range for the route
+    suitable_aircraft = plan_routes(
+        available_aircraft(
+            candidates.filter(current_location=departure_airport.icao_code),
+            departure_date_start, departure_date_end, return_datetime
+        ),
+        departure_airport, arrival_airport
+    )
+    for aircraft in suitable_aircraft:
+        mark_in_position(aircraft)
+
+    # If not enough options, add the closest aircraft that could be positioned
+    if len(suitable_aircraft) < 5:
+        repositioning = rank_by_positioning_distance(
+            plan_routes(
+                available_aircraft(
+                    candidates.exclude(current_location=departure_airport.icao_code),
+                    departure_date_start, departure_date_end, return_datetime
+                ),
+                departure_airport, arrival_airport
+            ),
+            departure_airport
+        )
+        suitable_aircraft += repositioning[:MAX_REPOSITIONING_CANDIDATES]
+
+    return suitable_aircraft
+
+
+def flexible_search_candidates(departure_airport, arrival_airport, passenger_count):
+    """
+    Candidate aircraft for a flexible-date search, independent of the date:
+    every capable aircraft at the departure airport plus the nearest
+    repositioning candidates. Availability is resolved per day by the caller.
+    """
+    ranked = rank_by_positioning_distance(
+        plan_routes(
+            Aircraft.objects.filter(
+                is_active=True,
+                aircraft_type__passenger_capacity__gte=passenger_count
+            ).select_related('aircraft_type', 'owner'),
+            departure_airport, arrival_airport
+        ),
+        departure_airport
+    )
+    at_departure = [mark_in_position(aircraft) for aircraft in ranked if aircraft.current_location == departure_airport.icao_code]
+    elsewhere = [aircraft for aircraft in ranked if aircraft.current_location != departure_airport.icao_code]
+    return at_departure + elsewhere[:MAX_REPOSITIONING_CANDIDATES]
+
+
+def mark_in_position(aircraft):
+    """Aircraft already at the departure airport need no positioning"""
+    aircraft.positioning_distance_nm = 0.0
+    aircraft.positioning_hours = 0.0
+    aircraft.positioning_cost = 0.0
+    return aircraft
+
+
+def rank_by_positioning_distance(aircraft_list, departure_airport):
+    """
+    Order aircraft by great-circle distance from their current location to the
+    departure airport, nearest first.
+
+    Distances for the whole list are computed in one pass over the cached
+    airport coordinates. Each aircraft gets positioning_distance_nm,
+    positioning_hours and positioning_cost attributes; aircraft parked at an
+    unknown airport get None values and are ranked last.
+    """
+    aircraft_list = list(aircraft_list)
+    origin = airport_coordinates.get(departure_airport.icao_code)
+    if origin is None:
+        distances = [None] * len(aircraft_list)
+    else:
+        distances = distances_from(
+            origin,
+            [airport_coordinates.get(aircraft.current_location) for aircraft in aircraft_list]
+        )
+
+    for aircraft, distance in zip(aircraft_list, distances):
+        aircraft.positioning_distance_nm = None if distance is None else round(distance, 1)
+        if distance is None:
+            aircraft.positioning_hours = None
+            aircraft.positioning_cost = None
+        else:
+            aircraft.positioning_hours = round(block_hours(flight_profile(aircraft.aircraft_type), distance), 1)
+            aircraft.positioning_cost = round(aircraft.positioning_hours * float(aircraft.hourly_rate), 2)
+
+    aircraft_list.sort(key=lambda aircraft: (
+        aircraft.positioning_distance_nm is None,
+        aircraft.positioning_distance_nm or 0,
+    ))
+    return aircraft_list
+
+
+def get_availability_status(aircraft):
+    """
+    Get a human-readable availability status from the annotations added by
+    `annotate_availability`
+    """
+    if not aircraft.has_window:
+        return "Available (no restrictions)"
+    if aircraft.has_open_window:
+        return "Available"
+    return "Limited availability"
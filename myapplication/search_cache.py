@@ -0,0 +1,110 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .availability import make_aware
+from .pricing import current_version, is_last_minute
+
+# Writes spanning more days than this bump the global generation instead of every day
+MAX_INVALIDATION_DAYS = 62
+
+GLOBAL_GENERATION_KEY = 'search:generation'
+
+
+def get_cache():
+    return caches[getattr(settings, 'SEARCH_CACHE_ALIAS', 'default')]
+
+
+def day_generation_key(day):
+    return f'search:day:{day.isoformat()}'
+
+
+def local_day(moment):
+    return timezone.localdate(make_aware(moment))
+
+
+def generations(keys):
+    """
+    Read the current value of several generation counters in one round trip.
+
+    A missing counter (never set, deleted by an invalidation or evicted) is
+    started from the current time, so it can never fall back to a value that
+    older cache entries were stored under.
+    """
+    cache = get_cache()
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns())
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def search_key(params):
+    """
+    Cache key for a search: the route, day(s), passengers, trip type and empty
+    leg flag, plus the generations of everything the results depend on.
+    Prices also depend on whether each leg is within the last-minute window
+    at the time of the search and on the shared pricing version, so those
+    are part of the key too: a pricing edit reaches the cached searches of
+    every worker, even with a per-process cache.
+    """
+    now = timezone.now()
+    departure_day = local_day(params['departure_datetime'])
+    return_day = local_day(params['return_datetime']) if params['return_datetime'] else None
+
+    generation_keys = [GLOBAL_GENERATION_KEY, day_generation_key(departure_day)]
+    if return_day:
+        generation_keys.append(day_generation_key(return_day))
+
+    parts = [
+        params['departure_airport'].icao_code,
+        params['arrival_airport'].icao_code,
+        departure_day.isoformat(),
+        return_day.isoformat() if return_day else '-',
+        str(params['passenger_count']),
+        params['trip_type'],
+        'empty' if params['is_empty_leg'] else 'charter',
+        'last-minute' if is_last_minute(params['departure_datetime'], now) else 'advance',
+        'last-minute' if is_last_minute(params['return_datetime'], now) else 'advance',
+        str(current_version()),
+    ]
+    parts += [str(generation) for generation in generations(generation_keys)]
+    return 'search:results:' + ':'.join(parts)
+
+
+def cached_search(params, compute):
+    """Return cached results for a search, calling compute(params) on a miss"""
+    cache = get_cache()
+    key = search_key(params)
+    results = cache.get(key)
+    if results is None:
+        results = compute(params)
+        cache.set(key, results, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+    return results
+
+
+def invalidate_all():
+    """Invalidate every cached search (fleet, aircraft type or airport changes)"""
+    get_cache().delete(GLOBAL_GENERATION_KEY)
+
+
+def invalidate_span(*spans):
+    """
+    Invalidate cached searches for every local day touched by the given
+    (start, end) datetime spans. `None` spans are ignored.
+    """
+    days = set()
+    for span in spans:
+        if span is None or None in span:
+            continue
+        first, last = local_day(span[0]), local_day(span[1])
+        if (last - first).days > MAX_INVALIDATION_DAYS:
+            invalidate_all()
+            return
+        days.update(first + timedelta(days=offset) for offset in range((last - first).days + 1))
+    if days:
+        get_cache().delete_many([day_generation_key(day) for day in days])
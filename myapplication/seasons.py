@@ -0,0 +1,71 @@
+import bisect
+
+from .models import Season
+
+SEASON_COLUMNS = ('region', 'start_date', 'end_date', 'multiplier')
+
+# Timeline value of peak days priced at the pricing rule's peak_season_multiplier
+RULE_MULTIPLIER = 'rule'
+
+
+class SeasonCalendar:
+    """
+    Active Seasons compiled into sorted, non-overlapping date intervals per
+    region, so a departure date resolves to its season with one bisect.
+
+    Each region's timeline holds its own seasons plus the seasons without a
+    region; regions with no seasons of their own use the global timeline.
+    Where seasons overlap, the highest multiplier set on a season wins.
+    """
+
+    def __init__(self, seasons=()):
+        """`seasons`: (region, start_date, end_date, multiplier) tuples, multiplier None to use the pricing rule's"""
+        seasons = list(seasons)
+        regions = {region for region, *_ in seasons if region}
+        self.default = self._timeline([season for season in seasons if not season[0]])
+        self.by_region = {
+            region: self._timeline([season for season in seasons if season[0] in ('', region)])
+            for region in regions
+        }
+
+    @staticmethod
+    def _timeline(seasons):
+        """
+        (starts, values): interval i covers date ordinals [starts[i], starts[i + 1])
+        and its value is None off-peak, a season multiplier or RULE_MULTIPLIER
+        """
+        boundaries = sorted({start.toordinal() for _, start, _, _ in seasons} | {end.toordinal() + 1 for _, _, end, _ in seasons})
+        starts, values = [], []
+        for lo, hi in zip(boundaries, boundaries[1:]):
+            covering = [multiplier for _, start, end, multiplier in seasons if start.toordinal() <= lo and hi - 1 <= end.toordinal()]
+            if covering:
+                overrides = [float(multiplier) for multiplier in covering if multiplier is not None]
+                value = max(overrides) if overrides else RULE_MULTIPLIER
+            else:
+                value = None
+            # Merge neighbouring intervals with the same outcome
+            if values and values[-1] == value:
+                continue
+            starts.append(lo)
+            values.append(value)
+        if values and values[-1] is not None:
+            starts.append(boundaries[-1])
+            values.append(None)
+        return starts, values
+
+    def multiplier(self, day, region, rule_multiplier):
+        """
+        Price multiplier for a departure on `day` (a date) from `region`:
+        1.0 off-peak, otherwise the season's multiplier or rule_multiplier.
+        """
+        starts, values = self.by_region.get(region, self.default)
+        index = bisect.bisect_right(starts, day.toordinal()) - 1
+        value = values[index] if index >= 0 else None
+        if value is None:
+            return 1.0
+        return rule_multiplier if value is RULE_MULTIPLIER else value
+
+
+def load_calendar():
+    """SeasonCalendar of all active seasons, with one query"""
+    return SeasonCalendar(Season.objects.filter(is_active=True).values_list(*SEASON_COLUMNS))
@@ -1,7 +1,17 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from datetime import date
-from .models import Booking, OwnerPayout
+from .models import Aircraft, AircraftType, Airport, Availability, Booking, FlightLeg, OwnerPayout, PricingRule, Season
+from .availability import availability_index
+from .geo import airport_coordinates, point_from_radians
+from .spatial import airport_index
+from .routing import fuel_stop_planner
+from .flight_time import flight_time_model
+from .pricing import pricing_engine
+from .distance_matrix import airport_distances
+from . import fleet_calendar
+from . import search_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,4 +49,164 @@ def create_owner_payout(sender, instance, created, **kwargs):
                 logger.error(f"Error creating OwnerPayout: {e}")
         else:
             print(f"OwnerPayout already exists for this booking: {existing_payout}")
-            logger.info(f"OwnerPayout already exists for booking {instance.id}")
\ No newline at end of file
+            logger.info(f"OwnerPayout already exists for booking {instance.id}")
+
+
+@receiver([post_save, post_delete], sender=Availability)
+def refresh_availability_index_for_window(sender, instance, **kwargs):
+    """Drop the cached schedule of the aircraft whose availability changed"""
+    availability_index.invalidate(instance.aircraft_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def refresh_availability_index_for_booking(sender, instance, **kwargs):
+    """Status or aircraft changes decide which schedule a booking's legs occupy"""
+    availability_index.invalidate_booking(instance.pk, instance.aircraft_id)
+
+
+@receiver([post_save, post_delete], sender=FlightLeg)
+def refresh_availability_index_for_leg(sender, instance, **kwargs):
+    """Drop the cached schedule of the aircraft flying this leg"""
+    try:
+        aircraft_id = instance.booking.aircraft_id
+    except Booking.DoesNotExist:
+        aircraft_id = None
+    availability_index.invalidate_booking(instance.booking_id, aircraft_id)
+
+
+@receiver([post_save, post_delete], sender=Airport)
+def refresh_airport_coordinates(sender, instance, **kwargs):
+    """Reload the cached airport coordinates, spatial index, fuel-stop plans and leg times after an airport is added, edited or removed"""
+    airport_coordinates.invalidate()
+    airport_index.invalidate()
+    fuel_stop_planner.clear()
+    flight_time_model.clear()
+
+
+@receiver(post_save, sender=Airport)
+def update_airport_distances(sender, instance, **kwargs):
+    """Rewrite the airport's row and column of the distance matrix once the save commits"""
+    icao_code = instance.icao_code
+    point = point_from_radians(instance.latitude_radians, instance.longitude_radians)
+    transaction.on_commit(lambda: airport_distances.update_airport(icao_code, point))
+
+
+@receiver(post_delete, sender=Airport)
+def remove_airport_distances(sender, instance, **kwargs):
+    icao_code = instance.icao_code
+    transaction.on_commit(lambda: airport_distances.remove_airport(icao_code))
+
+
+@receiver(pre_save, sender=Availability)
+@receiver(pre_save, sender=FlightLeg)
+def remember_previous_span(sender, instance, **kwargs):
+    """Keep the stored span and aircraft of an edited window or leg so the days it leaves are refreshed too"""
+    instance._previous_span = None
+    instance._previous_aircraft_id = None
+    if instance.pk:
+        if sender is Availability:
+            fields = ('start_datetime', 'end_datetime', 'aircraft_id')
+        else:
+            fields = ('departure_datetime', 'arrival_datetime', 'booking__aircraft_id')
+        previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        if previous:
+            instance._previous_span = previous[:2]
+            instance._previous_aircraft_id = previous[2]
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_aircraft(sender, instance, **kwargs):
+    instance._previous_aircraft_id = None
+    if instance.pk:
+        instance._previous_aircraft_id = Booking.objects.filter(pk=instance.pk).values_list('aircraft_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Availability)
+def invalidate_search_cache_for_window(sender, instance, **kwargs):
+    search_cache.invalidate_span(
+        (instance.start_datetime, instance.end_datetime),
+        getattr(instance, '_previous_span', None),
+    )
+
+
+@receiver([post_save, post_delete], sender=FlightLeg)
+def invalidate_search_cache_for_leg(sender, instance, **kwargs):
+    search_cache.invalidate_span(
+        (instance.departure_datetime, instance.arrival_datetime),
+        getattr(instance, '_previous_span', None),
+    )
+
+
+@receiver(post_save, sender=Booking)
+def invalidate_search_cache_for_booking(sender, instance, **kwargs):
+    """Status or aircraft changes affect the days the booking's legs are flown"""
+    search_cache.invalidate_span(
+        *FlightLeg.objects.filter(booking=instance).values_list('departure_datetime', 'arrival_datetime')
+    )
+
+
+@receiver([post_save, post_delete], sender=Aircraft)
+@receiver([post_save, post_delete], sender=AircraftType)
+@receiver([post_save, post_delete], sender=Airport)
+@receiver([post_save, post_delete], sender=PricingRule)
+@receiver([post_save, post_delete], sender=Season)
+def invalidate_search_cache(sender, instance, **kwargs):
+    """Fleet, aircraft type, airport, pricing rule and season changes can affect any search"""
+    search_cache.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=PricingRule)
+@receiver([post_save, post_delete], sender=Season)
+def recompile_pricing_rules(sender, instance, **kwargs):
+    """Move the shared pricing version so every worker recompiles its pricing table and season calendar"""
+    pricing_engine.invalidate()
+
+
+def refresh_calendars(current_aircraft_id, previous_aircraft_id, span, previous_span):
+    """Refresh the calendar days an object occupied before and after a write"""
+    if previous_aircraft_id and previous_aircraft_id != current_aircraft_id:
+        fleet_calendar.refresh_calendar(previous_aircraft_id, previous_span)
+        previous_span = None
+    if current_aircraft_id:
+        fleet_calendar.refresh_calendar(current_aircraft_id, span, previous_span)
+
+
+@receiver([post_save, post_delete], sender=Availability)
+def refresh_calendar_for_window(sender, instance, **kwargs):
+    refresh_calendars(
+        instance.aircraft_id,
+        getattr(instance, '_previous_aircraft_id', None),
+        (instance.start_datetime, instance.end_datetime),
+        getattr(instance, '_previous_span', None),
+    )
+
+
+@receiver([post_save, post_delete], sender=FlightLeg)
+def refresh_calendar_for_leg(sender, instance, **kwargs):
+    try:
+        aircraft_id = instance.booking.aircraft_id
+    except Booking.DoesNotExist:
+        aircraft_id = None
+    refresh_calendars(
+        aircraft_id,
+        getattr(instance, '_previous_aircraft_id', None),
+        (instance.departure_datetime, instance.arrival_datetime),
+        getattr(instance, '_previous_span', None),
+    )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_calendar_for_booking(sender, instance, created, **kwargs):
+    """Status or aircraft changes move the booking's legs on or off the calendars"""
+    if created:
+        return
+    spans = list(FlightLeg.objects.filter(booking=instance).values_list('departure_datetime', 'arrival_datetime'))
+    previous_aircraft_id = getattr(instance, '_previous_aircraft_id', None)
+    for aircraft_id in {instance.aircraft_id, previous_aircraft_id} - {None}:
+        fleet_calendar.refresh_calendar(aircraft_id, *spans)
+
+
+@receiver(post_save, sender=Aircraft)
+def build_calendar_for_new_aircraft(sender, instance, created, **kwargs):
+    if created:
+        fleet_calendar.build_calendars([instance.pk])
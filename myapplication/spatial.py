@@ -0,0 +1,206 @@
+import bisect
+import heapq
+import math
+import threading
+import time
+from collections import namedtuple
+
+from .geo import EARTH_RADIUS_NM
+from .models import Airport
+
+AirportPoint = namedtuple('AirportPoint', 'id icao_code iata_code name city country latitude longitude is_private_aviation_friendly')
+
+AIRPORT_COLUMNS = (
+    'id', 'icao_code', 'iata_code', 'name', 'city', 'country', 'is_private_aviation_friendly',
+    'latitude_radians', 'longitude_radians', 'unit_x', 'unit_y', 'unit_z',
+)
+
+
+def unit_vector(latitude, longitude):
+    lat, lon = math.radians(float(latitude)), math.radians(float(longitude))
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def chord_for(distance_nm):
+    """Straight-line distance on the unit sphere for a great-circle distance"""
+    return 2 * math.sin(min(distance_nm / EARTH_RADIUS_NM, math.pi) / 2)
+
+
+def distance_for(squared_chord):
+    """Great-circle distance in nautical miles for a squared unit-sphere chord"""
+    return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+class KDTree:
+    """
+    Static 3-d tree over unit-sphere vectors. Nodes are laid out implicitly:
+    the node of a slice [lo, hi) is its middle element, split on axis
+    depth % 3, so the tree is just a reordering of the input.
+    """
+
+    def __init__(self, vectors):
+        self.order = list(range(len(vectors)))
+        self.vectors = vectors
+        self._build(0, len(self.order), 0)
+
+    def _build(self, lo, hi, depth):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        self.order[lo:hi] = sorted(self.order[lo:hi], key=lambda index: self.vectors[index][axis])
+        mid = (lo + hi) // 2
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+    def within(self, target, radius):
+        """[(squared_chord, index)] of the vectors within `radius` (a chord) of target"""
+        found = []
+        limit = radius * radius
+        stack = [(0, len(self.order), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            index = self.order[mid]
+            vector = self.vectors[index]
+            squared = (vector[0] - target[0]) ** 2 + (vector[1] - target[1]) ** 2 + (vector[2] - target[2]) ** 2
+            if squared <= limit:
+                found.append((squared, index))
+            offset = target[depth % 3] - vector[depth % 3]
+            if offset <= radius:
+                stack.append((lo, mid, depth + 1))
+            if offset >= -radius:
+                stack.append((mid + 1, hi, depth + 1))
+        return found
+
+    def nearest(self, target, k):
+        """[(squared_chord, index)] of the k vectors closest to target, closest first"""
+        best = []  # max-heap of (-squared, index)
+
+        def visit(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            index = self.order[mid]
+            vector = self.vectors[index]
+            squared = (vector[0] - target[0]) ** 2 + (vector[1] - target[1]) ** 2 + (vector[2] - target[2]) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-squared, index))
+            elif squared < -best[0][0]:
+                heapq.heapreplace(best, (-squared, index))
+            offset = target[depth % 3] - vector[depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if offset < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near, depth + 1)
+            if len(best) < k or offset * offset < -best[0][0]:
+                visit(*far, depth + 1)
+
+        if k > 0:
+            visit(0, len(self.order), 0)
+        return sorted((-squared, index) for squared, index in best)
+
+
+class AirportIndex:
+    """
+    In-memory spatial index of all airports for radius, nearest-k and
+    bounding-box queries.
+
+    Radius and nearest-k queries use a KD-tree over the airports' stored
+    unit-sphere vectors (so the antimeridian and the poles need no special
+    cases); bounding boxes use a latitude-sorted list. A second tree holds only private-aviation
+    friendly airports. Loaded with one query on first use, dropped by the
+    Airport signals in signals.py and reloaded after `max_age` seconds to pick
+    up edits made by other worker processes.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._state = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._state is None or time.monotonic() - self._loaded_at >= self.max_age:
+                airports, vectors = [], []
+                for *details, is_private, latitude, longitude, x, y, z in Airport.objects.values_list(*AIRPORT_COLUMNS):
+                    airports.append(AirportPoint(
+                        *details, round(math.degrees(latitude), 6), round(math.degrees(longitude), 6), is_private
+                    ))
+                    vectors.append((x, y, z))
+                private = [index for index, airport in enumerate(airports) if airport.is_private_aviation_friendly]
+                by_latitude = sorted(range(len(airports)), key=lambda index: airports[index].latitude)
+                self._state = {
+                    'airports': airports,
+                    'by_code': {airport.icao_code: airport for airport in airports},
+                    'positions': {airport.icao_code: index for index, airport in enumerate(airports)},
+                    'tree': KDTree(vectors),
+                    'private_tree': KDTree([vectors[index] for index in private]),
+                    'private': private,
+                    'by_latitude': by_latitude,
+                    'latitudes': [airports[index].latitude for index in by_latitude],
+                }
+                self._loaded_at = time.monotonic()
+            return self._state
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+
+    def get(self, icao_code):
+        return self._load()['by_code'].get((icao_code or '').upper())
+
+    def _results(self, state, matches, private_only):
+        airports = state['airports']
+        if private_only:
+            return [(airports[state['private'][index]], distance_for(squared)) for squared, index in matches]
+        return [(airports[index], distance_for(squared)) for squared, index in matches]
+
+    def within_radius(self, latitude, longitude, radius_nm, private_only=False):
+        """[(AirportPoint, distance_nm)] within radius_nm of a point, closest first"""
+        state = self._load()
+        tree = state['private_tree'] if private_only else state['tree']
+        matches = sorted(tree.within(unit_vector(latitude, longitude), chord_for(radius_nm)))
+        return self._results(state, matches, private_only)
+
+    def around_airport(self, icao_code, radius_nm):
+        """
+        [(AirportPoint, distance_nm)] of the other airports within radius_nm of
+        an airport, measured from its stored unit vector; [] for unknown codes
+        """
+        state = self._load()
+        position = state['positions'].get(icao_code)
+        if position is None:
+            return []
+        tree = state['tree']
+        matches = [match for match in tree.within(tree.vectors[position], chord_for(radius_nm)) if match[1] != position]
+        return self._results(state, matches, False)
+
+    def nearest(self, latitude, longitude, k=5, private_only=False):
+        """[(AirportPoint, distance_nm)] of the k airports closest to a point, closest first"""
+        state = self._load()
+        tree = state['private_tree'] if private_only else state['tree']
+        return self._results(state, tree.nearest(unit_vector(latitude, longitude), k), private_only)
+
+    def in_bounding_box(self, min_latitude, min_longitude, max_latitude, max_longitude, private_only=False):
+        """
+        AirportPoints inside a latitude/longitude box, by latitude. A box with
+        min_longitude > max_longitude crosses the antimeridian.
+        """
+        state = self._load()
+        lo = bisect.bisect_left(state['latitudes'], min_latitude)
+        hi = bisect.bisect_right(state['latitudes'], max_latitude)
+        if min_longitude <= max_longitude:
+            inside = lambda longitude: min_longitude <= longitude <= max_longitude
+        else:
+            inside = lambda longitude: longitude >= min_longitude or longitude <= max_longitude
+        found = []
+        for index in state['by_latitude'][lo:hi]:
+            airport = state['airports'][index]
+            if inside(airport.longitude) and (airport.is_private_aviation_friendly or not private_only):
+                found.append(airport)
+        return found
+
+
+airport_index = AirportIndex()
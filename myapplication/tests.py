@@ -1,3 +1,348 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .codes import ALPHABET, CODE_LENGTH, check_symbol, insert_with_codes, is_valid_code, new_codes, typed_code
+from .geo import airport_coordinates
+from .models import Aircraft, AircraftLeasingInquiry, AircraftType, Airport, Booking, IdempotencyRecord, Inquiry, Passenger, Quote, User
+from .money import Money, split_commission
+from .pricing import bump_version, current_version
+from .quotes import live_quote
+from .routing import fuel_stop_planner, usable_range_nm
+from .spatial import airport_index
+
+
+class CreateBookingQueryCountTests(TestCase):
+    """create_booking inserts legs and passengers in bulk, so its queries do not grow with the party size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', 'client@example.com', 'password', user_type='client')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', user_type='owner')
+        aircraft_type = AircraftType.objects.create(
+            name='Light Jet', category='jet', passenger_capacity=19,
+            range_nautical_miles=2000, speed_knots=430, price_per_hour_usd=Decimal('4000'),
+        )
+        cls.aircraft = Aircraft.objects.create(
+            owner=owner, aircraft_type=aircraft_type, registration_number='5Y-TST', model_name='Test Jet',
+            year_manufactured=2015, base_airport='HKJK', current_location='HKJK', hourly_rate=Decimal('4000'),
+        )
+        Airport.objects.create(icao_code='HKJK', name='Jomo Kenyatta', city='Nairobi', country='Kenya',
+                               latitude=Decimal('-1.319167'), longitude=Decimal('36.927778'))
+        Airport.objects.create(icao_code='HKMO', name='Moi International', city='Mombasa', country='Kenya',
+                               latitude=Decimal('-4.034833'), longitude=Decimal('39.594250'))
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def book(self, passenger_count, departure_datetime, return_datetime):
+        data = {
+            'aircraft_id': self.aircraft.pk,
+            'departure_airport': 'HKJK',
+            'arrival_airport': 'HKMO',
+            'departure_datetime': departure_datetime,
+            'return_datetime': return_datetime,
+            'trip_type': 'round_trip',
+            'passenger_count': passenger_count,
+            'client_name': 'Test Client',
+            'client_email': 'client@example.com',
+            'client_phone': '+254700000000',
+        }
+        for i in range(1, passenger_count + 1):
+            data[f'passenger_{i}_name'] = f'Passenger {i}'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/create-booking/', data)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), len(queries)
+
+    def test_group_booking_costs_no_more_queries_than_a_single_passenger(self):
+        # The first booking also loads the pricing rules, airports and calendars into their caches
+        self.book(1, '2027-02-06 10:00', '2027-02-09 15:00')
+        single, single_queries = self.book(1, '2027-03-06 10:00', '2027-03-09 15:00')
+        group, group_queries = self.book(19, '2027-04-06 10:00', '2027-04-09 15:00')
+
+        self.assertEqual(group_queries, single_queries)
+        booking = Booking.objects.get(pk=group['booking_id'])
+        self.assertEqual(booking.passengers.count(), 19)
+        self.assertEqual(len(set(Passenger.objects.values_list('order', flat=True))), 21)
+        self.assertEqual([leg['sequence'] for leg in group['flight_legs']], [1, 2])
+        self.assertEqual([(leg['departure'], leg['arrival']) for leg in group['flight_legs']], [('HKJK', 'HKMO'), ('HKMO', 'HKJK')])
+        self.assertEqual(group['total_price'], sum(leg['leg_price'] for leg in group['flight_legs']))
+
+
+class IdempotentInquiryTests(TransactionTestCase):
+    """
+    Retries of an inquiry with the same Idempotency-Key are replayed only
+    once it succeeded. Runs in autocommit like the live site: a failed
+    save() marks an enclosing test transaction for rollback.
+    """
+
+    def post_inquiry(self, key, passengers):
+        return self.client.post('/save-inquiry/', {
+            'fullName': 'Test Client',
+            'email': 'client@example.com',
+            'phone': '+254700000000',
+            'departure': 'Nairobi',
+            'destination': 'Mombasa',
+            'passengers': passengers,
+            'date': '2027-03-06',
+        }, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_failed_inquiry_is_not_replayed(self):
+        first = self.post_inquiry('inquiry-1', 'many')
+        retry = self.post_inquiry('inquiry-1', 'many')
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertFalse(IdempotencyRecord.objects.filter(key='inquiry-1').exists())
+
+    def test_successful_inquiry_is_replayed(self):
+        first = self.post_inquiry('inquiry-2', 3)
+        retry = self.post_inquiry('inquiry-2', 3)
+
+        self.assertEqual(first.json(), {'success': True})
+        self.assertEqual(retry.json(), {'success': True})
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Inquiry.objects.count(), 1)
+
+    def test_abandoned_claim_is_taken_over(self):
+        # A worker claimed the key and died before storing a response
+        IdempotencyRecord.objects.create(
+            scope='save_inquiry', key='inquiry-3', fingerprint='', expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        retry = self.post_inquiry('inquiry-3', 3)
+
+        self.assertEqual(retry.json(), {'success': True})
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(Inquiry.objects.count(), 1)
+        record = IdempotencyRecord.objects.get(key='inquiry-3')
+        self.assertEqual(record.status_code, 200)
+        self.assertGreater(record.expires_at, timezone.now() + timedelta(hours=1))
+
+    def test_running_claim_is_not_taken_over(self):
+        self.post_inquiry('inquiry-4', 3)
+        # As if the first request were still inside its lease
+        IdempotencyRecord.objects.filter(key='inquiry-4').update(
+            status_code=None, expires_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        self.assertEqual(self.post_inquiry('inquiry-4', 3).status_code, 409)
+        self.assertEqual(Inquiry.objects.count(), 1)
+
+
+class FuelStopPlannerTests(TestCase):
+    """Routes beyond an aircraft's range get fuel stops; routes that need too many are refused"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', 'client@example.com', 'password', user_type='client')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', user_type='owner')
+        # 300 nm range, 270 nm usable: Nairobi-Mombasa is in range, Nairobi-Dar es Salaam is not
+        cls.aircraft_type = AircraftType.objects.create(
+            name='Piston Twin', category='piston', passenger_capacity=5,
+            range_nautical_miles=300, speed_knots=180, price_per_hour_usd=Decimal('1200'),
+        )
+        cls.aircraft = Aircraft.objects.create(
+            owner=owner, aircraft_type=cls.aircraft_type, registration_number='5Y-PST', model_name='Test Twin',
+            year_manufactured=2010, base_airport='HKJK', current_location='HKJK', hourly_rate=Decimal('1200'),
+        )
+        for icao_code, name, city, country, latitude, longitude in [
+            ('HKJK', 'Jomo Kenyatta', 'Nairobi', 'Kenya', '-1.319167', '36.927778'),
+            ('HKMO', 'Moi International', 'Mombasa', 'Kenya', '-4.034833', '39.594250'),
+            ('HTDA', 'Julius Nyerere', 'Dar es Salaam', 'Tanzania', '-6.878111', '39.202625'),
+            ('FAOR', 'O. R. Tambo', 'Johannesburg', 'South Africa', '-26.139166', '28.246111'),
+        ]:
+            Airport.objects.create(icao_code=icao_code, name=name, city=city, country=country,
+                                   latitude=Decimal(latitude), longitude=Decimal(longitude))
+
+    def setUp(self):
+        # Other test cases' airports may still be in the process-wide caches
+        airport_coordinates.invalidate()
+        airport_index.invalidate()
+        fuel_stop_planner.clear()
+
+    def test_route_in_range_is_flown_nonstop(self):
+        plan = fuel_stop_planner.plan(self.aircraft_type, 'HKJK', 'HKMO')
+
+        self.assertEqual(plan.stops, [])
+        self.assertEqual(len(plan.leg_distances), 1)
+
+    def test_route_beyond_range_gets_one_fuel_stop(self):
+        plan = fuel_stop_planner.plan(self.aircraft_type, 'HKJK', 'HTDA')
+
+        self.assertEqual(plan.stops, ['HKMO'])
+        self.assertEqual(len(plan.leg_distances), 2)
+        self.assertTrue(all(distance <= usable_range_nm(self.aircraft_type) for distance in plan.leg_distances))
+        self.assertGreater(plan.flight_hours(self.aircraft_type), 0)
+
+    def test_route_needing_too_many_stops_cannot_be_routed(self):
+        self.assertIsNone(fuel_stop_planner.plan(self.aircraft_type, 'HKJK', 'FAOR'))
+
+    def test_hold_is_refused_for_a_route_that_cannot_be_routed(self):
+        self.client.force_login(self.client_user)
+        response = self.client.post('/api/booking-holds/claim/', {
+            'aircraft_id': self.aircraft.pk,
+            'departure_airport': 'HKJK',
+            'arrival_airport': 'FAOR',
+            'departure_datetime': '2027-03-06 10:00',
+            'trip_type': 'one_way',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cannot fly this route', response.json()['message'])
+
+
+class LiveQuoteTests(TestCase):
+    """create_booking only honours a quote saved for exactly the trip being booked, at the current prices"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', user_type='owner')
+        aircraft_type = AircraftType.objects.create(
+            name='Light Jet', category='jet', passenger_capacity=8,
+            range_nautical_miles=2000, speed_knots=430, price_per_hour_usd=Decimal('4000'),
+        )
+        cls.aircraft = Aircraft.objects.create(
+            owner=owner, aircraft_type=aircraft_type, registration_number='5Y-QTE', model_name='Test Jet',
+            year_manufactured=2015, base_airport='HKJK', current_location='HKJK', hourly_rate=Decimal('4000'),
+        )
+        cls.departure_airport = Airport.objects.create(
+            icao_code='HKJK', name='Jomo Kenyatta', city='Nairobi', country='Kenya',
+            latitude=Decimal('-1.319167'), longitude=Decimal('36.927778'),
+        )
+        cls.arrival_airport = Airport.objects.create(
+            icao_code='HKMO', name='Moi International', city='Mombasa', country='Kenya',
+            latitude=Decimal('-4.034833'), longitude=Decimal('39.594250'),
+        )
+        cls.departure_datetime = timezone.now().replace(microsecond=0) + timedelta(days=10)
+
+    def save_quote(self, **fields):
+        quote = Quote.objects.create(**{
+            'aircraft': self.aircraft,
+            'departure_airport': self.departure_airport,
+            'arrival_airport': self.arrival_airport,
+            'departure_datetime': self.departure_datetime,
+            'trip_type': 'one_way',
+            'passenger_count': 4,
+            'flight_hours': Decimal('1.2'),
+            'legs': [],
+            'total_price': Decimal('4800.00'),
+            'commission_rate': Decimal('10.00'),
+            'rule_version': current_version(),
+            'expires_at': timezone.now() + timedelta(minutes=30),
+            **fields,
+        })
+        return str(quote.pk)
+
+    def live_quote(self, quote_id, passenger_count=4):
+        return live_quote(quote_id, self.aircraft.pk, 'HKJK', 'HKMO', self.departure_datetime, None, 'one_way', False, passenger_count)
+
+    def test_matching_quote_is_honoured(self):
+        quote_id = self.save_quote()
+        self.assertEqual(str(self.live_quote(quote_id).pk), quote_id)
+
+    def test_quote_for_another_party_size_is_refused(self):
+        self.assertIsNone(self.live_quote(self.save_quote(), passenger_count=6))
+
+    def test_expired_quote_is_refused(self):
+        self.assertIsNone(self.live_quote(self.save_quote(expires_at=timezone.now() - timedelta(seconds=1))))
+
+    def test_quote_priced_before_a_pricing_change_is_refused(self):
+        quote_id = self.save_quote()
+        bump_version()
+        self.assertIsNone(self.live_quote(quote_id))
+
+    def test_malformed_quote_id_is_refused(self):
+        self.assertIsNone(self.live_quote('not-a-quote'))
+
+
+class MoneyTests(SimpleTestCase):
+    """Money arithmetic stays in whole cents, rounds half up and splits without losing a cent"""
+
+    def test_scale_rounds_half_cents_up(self):
+        # 50 x 1.15 is 57.4999... in binary float
+        self.assertEqual(Money(50).scale(1.15), Money(58))
+        self.assertEqual(Money(5).scale(0.5), Money(3))
+        self.assertEqual(Money(4350).scale(Decimal('1.15')), Money(5003))
+
+    def test_from_decimal_rounds_to_the_cent(self):
+        self.assertEqual(Money.from_decimal('10.005'), Money(1001))
+        self.assertEqual(Money.from_decimal(Decimal('12.34')).to_decimal(), Decimal('12.34'))
+
+    def test_allocate_sums_exactly(self):
+        total = Money(10001)
+        for ratios in ([1, 1, 1], [3, 7], [1, 2, 3, 4, 5, 6, 7], [1000, 9000], [0, 1]):
+            shares = total.allocate(ratios)
+            self.assertEqual(len(shares), len(ratios))
+            self.assertEqual(sum(shares, Money()), total)
+
+    def test_allocate_gives_leftover_cents_to_the_largest_remainders(self):
+        self.assertEqual(Money(100).split(3), [Money(34), Money(33), Money(33)])
+        self.assertEqual(Money(5).allocate([1, 2]), [Money(2), Money(3)])
+
+    def test_allocate_refuses_zero_ratios(self):
+        with self.assertRaises(ValueError):
+            Money(100).allocate([0, 0])
+
+    def test_commission_and_owner_earnings_add_up_to_the_total(self):
+        for cents, rate in ((123457, '10'), (99999, '12.5'), (1, '33.33'), (4450000, Decimal('7.75'))):
+            commission, owner = split_commission(Money(cents), rate)
+            self.assertEqual(commission + owner, Money(cents))
+        self.assertEqual(split_commission(Money(10000), '12.5'), (Money(1250), Money(8750)))
+
+
+class CodeTests(TestCase):
+    """Booking, passenger and inquiry codes carry a check symbol and are redrawn when taken"""
+
+    def test_new_codes_are_valid(self):
+        for code in new_codes(200):
+            self.assertEqual(len(code), CODE_LENGTH)
+            self.assertTrue(is_valid_code(code), code)
+
+    def test_single_mistyped_symbols_and_swaps_are_detected(self):
+        for code in new_codes(50):
+            for position in range(CODE_LENGTH - 1):
+                for symbol in ALPHABET:
+                    if symbol != code[position]:
+                        self.assertFalse(is_valid_code(code[:position] + symbol + code[position + 1:]))
+                if position < CODE_LENGTH - 2 and code[position] != code[position + 1]:
+                    swapped = code[:position] + code[position + 1] + code[position] + code[position + 2:]
+                    self.assertFalse(is_valid_code(swapped))
+
+    def test_typed_code_is_normalized(self):
+        code = '01ABCDEFG'
+        code += check_symbol(code)
+        self.assertEqual(typed_code(f' oi-abcd-efg{code[-1].lower()} '), code)
+        self.assertEqual(typed_code('OLABCDEFG' + code[-1]), code)
+        self.assertIsNone(typed_code('01ABCDEFH' + code[-1]))
+        self.assertIsNone(typed_code('Mombasa'))
+
+    def test_taken_code_is_redrawn(self):
+        first = AircraftLeasingInquiry.objects.create(
+            leasing_type='aircraft_leasing', name='First', email='first@example.com', telephone='1', requirements='-'
+        )
+        second = AircraftLeasingInquiry.objects.create(
+            inquiry_code=first.inquiry_code, leasing_type='aircraft_leasing', name='Second',
+            email='second@example.com', telephone='2', requirements='-'
+        )
+
+        self.assertNotEqual(second.inquiry_code, first.inquiry_code)
+        self.assertTrue(is_valid_code(second.inquiry_code))
+        self.assertEqual(AircraftLeasingInquiry.objects.count(), 2)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        attempts = []
+
+        def insert():
+            attempts.append(1)
+            raise IntegrityError('NOT NULL constraint failed: myapplication_booking.client_id')
+
+        with self.assertRaises(IntegrityError):
+            insert_with_codes(insert, [], 'booking_order_id')
+        self.assertEqual(len(attempts), 1)
@@ -11,6 +11,13 @@ urlpatterns = [
     path('private-jet-charter/', views.private_jet_charter, name='private_jet_charter'),
     path('group-charter/', views.group_charter, name='group_charter'),
     path('find-aircraft/', views.find_aircraft, name='find_aircraft'),
+    path('api/find-aircraft/flexible/', views.find_aircraft_flexible, name='find_aircraft_flexible'),
+    path('api/search/aircraft/', views.api_search_aircraft, name='api_search_aircraft'),
+    path('api/search/quick/', views.quick_aircraft_search, name='quick_aircraft_search'),
+    path('api/quotes/batch/', views.api_batch_quote, name='api_batch_quote'),
+    path('api/fleet/free/', views.api_fleet_free, name='api_fleet_free'),
+    path('api/airports/nearby/', views.api_airports_nearby, name='api_airports_nearby'),
+    path('api/airports/bbox/', views.api_airports_in_bbox, name='api_airports_in_bbox'),
     path('search-airports/', views.search_airports, name='search_airports'),
     path('api/check-auth/', views.check_auth, name='check_auth'),
     path('api/login/', views.api_login, name='api_login'),
@@ -20,6 +27,7 @@ urlpatterns = [
     path('api/auth/register/', views.signup_view, name='signup'),
     
     path('api/create-booking/', views.create_booking, name='create_booking'),
+    path('api/booking-holds/claim/', views.claim_booking_hold, name='claim_booking_hold'),
     path('api/signup/', views.api_signup, name='api_signup'),
     path('api/check-username/', views.check_username_availability, name='check_username'),
     path('api/check-email/', views.check_email_availability, name='check_email'),
@@ -8,6 +8,8 @@ from django.http import JsonResponse
 from django.db.models import Q
 from django.db import models
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.contrib.auth.decorators import login_required
 
 from django.shortcuts import render, redirect
 from django.contrib import messages
@@ -17,114 +19,293 @@ from django.utils import timezone
 from .models import Aircraft, Airport, Availability
 from django.shortcuts import render, redirect
 from .forms import GroupInquiryForm
+from .search import MAX_REPOSITIONING_CANDIDATES, day_bounds, find_suitable_aircraft, flexible_search_candidates, get_availability_status
+from .geo import airport_coordinates, distance_table
+from .routing import fuel_stop_planner
+from .fleet_calendar import CALENDAR_HORIZON_DAYS, free_aircraft_ids
+from .distance_matrix import airport_distances
+from .flight_time import block_hours, flight_profile, flight_time_model
+from .money import Money, split_commission
+from .pricing import pricing_engine
+from .codes import typed_code
+from .quotes import booking_leg_times, live_quote, quoted_legs, save_search_quotes
+from .bookings import save_legs_and_passengers
+from .outbox import enqueue_email
+from .idempotency import idempotent
+from .spatial import airport_index
+from .availability import AVAILABLE_DAY_STATUSES, DAY_STATUS_LABELS, daily_availability
+from .search_cache import cached_search
 from decimal import Decimal
+import base64
+import json
+
+
+# Widest window accepted for flexible-date searches (days either side of the requested date)
+MAX_FLEXIBLE_DAYS = 7
+
+# Limits for the nearby-airport API
+MAX_NEARBY_RADIUS_NM = 2000
+MAX_NEARBY_RESULTS = 100
+
+
+def parse_search_request(data, airports=None):
+    """
+    Parse and validate the search fields posted by the booking form (or sent
+    to the JSON search endpoints). Raises ValueError with a user-facing message.
+
+    `airports` ({icao_code: Airport}) lets callers parsing several searches
+    load the airports once.
+    """
+    departure_icao = data.get('departure_airport', '').upper().strip()
+    arrival_icao = data.get('arrival_airport', '').upper().strip()
+    departure_date = data.get('departure_date')
+    departure_time = data.get('departure_time') or '09:00'  # Default time if not provided
+    trip_type = data.get('trip_type', 'one_way')
+
+    try:
+        passenger_count = int(data.get('passenger_count', 1))
+        flexible_days = min(max(int(data.get('flexible_days') or 0), 0), MAX_FLEXIBLE_DAYS)
+    except (TypeError, ValueError):
+        raise ValueError('Please fill in all required fields.')
+
+    # Handle empty leg data
+    is_empty_leg = data.get('is_empty_leg') == 'true'
+
+    # Handle regular round trip data
+    return_date = data.get('round_trip_return_date') if trip_type == 'round_trip' else None
+    return_time = (data.get('round_trip_return_time') or '17:00') if trip_type == 'round_trip' else None
+
+    # Validate required fields
+    if not all([departure_icao, arrival_icao, departure_date, passenger_count]):
+        raise ValueError('Please fill in all required fields.')
+
+    # Get airport details
+    if airports is None:
+        airports = {airport.icao_code: airport for airport in Airport.objects.filter(icao_code__in=[departure_icao, arrival_icao])}
+    if departure_icao not in airports or arrival_icao not in airports:
+        raise ValueError('One or both airports not found. Please select valid airports.')
+
+    # Convert dates to timezone-aware datetime objects
+    try:
+        departure_datetime = timezone.make_aware(datetime.strptime(f"{departure_date} {departure_time}", "%Y-%m-%d %H:%M"))
+        return_datetime = None
+        if return_date:
+            return_datetime = timezone.make_aware(datetime.strptime(f"{return_date} {return_time}", "%Y-%m-%d %H:%M"))
+    except ValueError:
+        raise ValueError('Invalid date or time format.')
+
+    return {
+        'departure_airport': airports[departure_icao],
+        'arrival_airport': airports[arrival_icao],
+        'passenger_count': passenger_count,
+        'departure_date': departure_date,
+        'departure_datetime': departure_datetime,
+        'return_datetime': return_datetime,
+        'trip_type': trip_type,
+        'is_empty_leg': is_empty_leg,
+        'empty_leg_return_date': data.get('return_date') if is_empty_leg else None,
+        'empty_leg_return_time': data.get('return_time') if is_empty_leg else None,
+        'stay_duration_days': data.get('stay_duration_days') if is_empty_leg else None,
+        'flexible_days': flexible_days,
+    }
+
+
+def quoted_flight_hours(aircraft, departure_airport, arrival_airport):
+    """Flight time of a search result, flown with fuel stops when the route is beyond the aircraft's range"""
+    route_plan = getattr(aircraft, 'route_plan', None)
+    if route_plan and route_plan.stops:
+        return route_plan.flight_hours(aircraft.aircraft_type)
+    return estimate_flight_time(departure_airport, arrival_airport, aircraft)
+
+
+def routed_flight_hours(aircraft, departure_airport, arrival_airport):
+    """
+    Flight time of a trip booked without a search result, routed with fuel
+    stops like the search; None when the aircraft cannot fly the route
+    within MAX_FUEL_STOPS fuel stops
+    """
+    aircraft.route_plan = fuel_stop_planner.plan(aircraft.aircraft_type, departure_airport.icao_code, arrival_airport.icao_code)
+    if aircraft.route_plan is None:
+        return None
+    return quoted_flight_hours(aircraft, departure_airport, arrival_airport)
+
+
+def quote_aircraft(aircraft, departure_airport, arrival_airport, passenger_count, trip_type, is_empty_leg, estimated_flight_hours=None,
+                   departure_datetime=None, return_datetime=None, price=None):
+    """
+    Estimate flight time and price one aircraft for a search result.
+    Callers that already worked out the flight time, or priced the whole
+    fleet with PricingTable.quote_fleet, can pass them in.
+    """
+    # Routes beyond the aircraft's range are flown with fuel stops
+    route_plan = getattr(aircraft, 'route_plan', None)
+    fuel_stops = route_plan.stops if route_plan else []
+
+    if estimated_flight_hours is None:
+        estimated_flight_hours = quoted_flight_hours(aircraft, departure_airport, arrival_airport)
+
+    # Price through the compiled pricing rules (empty leg return, surcharges, peak season)
+    if price is None:
+        price = pricing_engine.table().quote_trip(
+            aircraft, estimated_flight_hours, trip_type, is_empty_leg,
+            departure_datetime, return_datetime, now=timezone.now(),
+            departure_region=departure_airport.country, return_region=arrival_airport.country
+        )
+
+    return {
+        'aircraft': aircraft,
+        'estimated_flight_hours': estimated_flight_hours,
+        'base_price': price['base_price'],
+        'total_price': price['total_price'],
+        'can_accommodate': aircraft.aircraft_type.passenger_capacity >= passenger_count,
+        'is_empty_leg': is_empty_leg,  # Pass this to template
+        'original_price': price['original_price'],
+        'leg_prices': price['leg_prices'],
+        'commission_rate': price['commission_rate'],
+        'rule_version': price['rule_version'],
+        'positioning_distance_nm': aircraft.positioning_distance_nm,
+        'positioning_hours': aircraft.positioning_hours,
+        'positioning_cost': aircraft.positioning_cost,
+        'fuel_stops': fuel_stops,
+    }
+
+
+def search_available_aircraft(params):
+    """Run the aircraft search for parsed search params and return aircraft_with_details"""
+    # Create date range for searching (entire day flexibility)
+    departure_date_start, departure_date_end = day_bounds(params['departure_datetime'])
+
+    # Search strategy: Find aircraft that can accommodate the trip
+    available_aircraft = find_suitable_aircraft(
+        departure_airport=params['departure_airport'],
+        arrival_airport=params['arrival_airport'],
+        departure_date_start=departure_date_start,
+        departure_date_end=departure_date_end,
+        passenger_count=params['passenger_count'],
+        return_datetime=params['return_datetime']
+    )
+
+    # Calculate estimated flight duration, then price the whole fleet in one pass
+    flight_hours = [
+        quoted_flight_hours(aircraft, params['departure_airport'], params['arrival_airport'])
+        for aircraft in available_aircraft
+    ]
+    prices = pricing_engine.table().quote_fleet(
+        available_aircraft, flight_hours, params['trip_type'], params['is_empty_leg'],
+        params['departure_datetime'], params['return_datetime'], now=timezone.now(),
+        departure_region=params['departure_airport'].country, return_region=params['arrival_airport'].country
+    )
+    aircraft_with_details = []
+    for aircraft, hours, price in zip(available_aircraft, flight_hours, prices):
+        aircraft_info = quote_aircraft(
+            aircraft, params['departure_airport'], params['arrival_airport'],
+            params['passenger_count'], params['trip_type'], params['is_empty_leg'],
+            estimated_flight_hours=hours, price=price
+        )
+        aircraft_info['availability_status'] = get_availability_status(aircraft)
+        aircraft_with_details.append(aircraft_info)
+
+    # Sort by price and suitability
+    aircraft_with_details.sort(key=lambda x: (not x['can_accommodate'], x['total_price']))
+    return aircraft_with_details
+
+
+def build_flexible_matrix(params):
+    """
+    Build the aircraft x day availability and price matrix for a flexible-date
+    search covering `flexible_days` either side of the requested date.
+
+    Candidates and prices are worked out once; availability for every day comes
+    from one range fetch of availability windows and flight legs.
+    """
+    flexible_days = params['flexible_days']
+    departure_date_start, _ = day_bounds(params['departure_datetime'])
+    first_day_start = departure_date_start - timedelta(days=flexible_days)
+    day_count = 2 * flexible_days + 1
+
+    # Round trips keep the same stay length, so the return day moves with the departure day
+    stay_days = 0
+    if params['return_datetime']:
+        stay_days = (day_bounds(params['return_datetime'])[0] - departure_date_start).days
+
+    candidates = flexible_search_candidates(params['departure_airport'], params['arrival_airport'], params['passenger_count'])
+    daily = daily_availability(
+        [aircraft.id for aircraft in candidates],
+        first_day_start,
+        day_count + stay_days,
+    )
+
+    days = [(first_day_start + timedelta(days=offset)).date() for offset in range(day_count)]
+    flight_hours = [
+        quoted_flight_hours(aircraft, params['departure_airport'], params['arrival_airport'])
+        for aircraft in candidates
+    ]
+
+    # Weekend, peak season and last-minute pricing depend on the day, so each day is priced for the whole fleet
+    pricing = pricing_engine.table()
+    now = timezone.now()
+    day_prices = []
+    for offset in range(day_count):
+        shift = timedelta(days=offset - flexible_days)
+        day_prices.append(pricing.quote_fleet(
+            candidates, flight_hours, params['trip_type'], params['is_empty_leg'],
+            params['departure_datetime'] + shift,
+            params['return_datetime'] + shift if params['return_datetime'] else None,
+            now=now,
+            departure_region=params['departure_airport'].country,
+            return_region=params['arrival_airport'].country,
+        ))
+
+    rows = []
+    for index, aircraft in enumerate(candidates):
+        quote = quote_aircraft(
+            aircraft, params['departure_airport'], params['arrival_airport'],
+            params['passenger_count'], params['trip_type'], params['is_empty_leg'],
+            estimated_flight_hours=flight_hours[index], price=day_prices[flexible_days][index]
+        )
+        statuses = daily[aircraft.id]
+        cells = []
+        for offset, day in enumerate(days):
+            status = statuses[offset]
+            if status in AVAILABLE_DAY_STATUSES and stay_days and statuses[offset + stay_days] not in AVAILABLE_DAY_STATUSES:
+                status = 'return_unavailable'
+            available = status in AVAILABLE_DAY_STATUSES
+            cells.append({
+                'date': day,
+                'available': available,
+                'status': DAY_STATUS_LABELS[status],
+                'price': day_prices[offset][index]['total_price'] if available else None,
+            })
+        quote['cells'] = cells
+        rows.append(quote)
+
+    rows.sort(key=lambda x: (not x['can_accommodate'], x['total_price']))
+    return {'days': days, 'rows': rows}
 
 
 def find_aircraft(request):
     if request.method == 'POST':
-        # Get form data
-        departure_icao = request.POST.get('departure_airport', '').upper().strip()
-        arrival_icao = request.POST.get('arrival_airport', '').upper().strip()
-        passenger_count = int(request.POST.get('passenger_count', 1))
-        departure_date = request.POST.get('departure_date')
-        departure_time = request.POST.get('departure_time', '09:00')  # Default time if not provided
-        trip_type = request.POST.get('trip_type', 'one_way')
-        
-        # Handle empty leg data
-        is_empty_leg = request.POST.get('is_empty_leg') == 'true'
-        empty_leg_return_date = request.POST.get('return_date') if is_empty_leg else None
-        empty_leg_return_time = request.POST.get('return_time') if is_empty_leg else None
-        stay_duration_days = request.POST.get('stay_duration_days') if is_empty_leg else None
-        
-        # Handle regular round trip data
-        return_date = request.POST.get('round_trip_return_date') if trip_type == 'round_trip' else None
-        return_time = request.POST.get('round_trip_return_time', '17:00') if trip_type == 'round_trip' else None
-        
-        # Validate required fields
-        if not all([departure_icao, arrival_icao, departure_date, passenger_count]):
-            messages.error(request, 'Please fill in all required fields.')
-            return redirect('index')
-        
-        # Get airport details
-        try:
-            departure_airport = Airport.objects.get(icao_code=departure_icao)
-            arrival_airport = Airport.objects.get(icao_code=arrival_icao)
-        except Airport.DoesNotExist as e:
-            messages.error(request, 'One or both airports not found. Please select valid airports.')
-            return redirect('index')
-        
-        # Convert dates to datetime objects
         try:
-            departure_datetime = datetime.strptime(f"{departure_date} {departure_time}", "%Y-%m-%d %H:%M")
-            # Make timezone aware if using timezone support
-            if timezone.is_aware(timezone.now()):
-                departure_datetime = timezone.make_aware(departure_datetime)
-                
-            return_datetime = None
-            if return_date:
-                return_datetime = datetime.strptime(f"{return_date} {return_time}", "%Y-%m-%d %H:%M")
-                if timezone.is_aware(timezone.now()):
-                    return_datetime = timezone.make_aware(return_datetime)
-        except ValueError:
-            messages.error(request, 'Invalid date or time format.')
+            params = parse_search_request(request.POST)
+        except ValueError as e:
+            messages.error(request, str(e))
             return redirect('index')
-        
-        # Create date range for searching (entire day flexibility)
-        departure_date_start = departure_datetime.replace(hour=0, minute=0, second=0)
-        departure_date_end = departure_datetime.replace(hour=23, minute=59, second=59)
-        
-        # Search strategy: Find aircraft that can accommodate the trip
-        available_aircraft = find_suitable_aircraft(
-            departure_airport=departure_airport,
-            arrival_airport=arrival_airport,
-            departure_date_start=departure_date_start,
-            departure_date_end=departure_date_end,
-            passenger_count=passenger_count,
-            return_datetime=return_datetime
-        )
-        
-        # Calculate estimated flight duration and pricing
-        aircraft_with_details = []
-        for aircraft in available_aircraft:
-            # Estimate flight time (simplified calculation)
-            estimated_flight_hours = estimate_flight_time(departure_airport, arrival_airport, aircraft)
-
-            # Calculate base price
-            base_price = calculate_base_price(aircraft, estimated_flight_hours, trip_type)
-
-            # Apply empty leg pricing if applicable
-            if is_empty_leg:
-                # Convert base_price to Decimal for consistent calculations
-                one_way_price = Decimal(str(base_price))  # This is the initial price (e.g., 9000 from Nairobi to Mombasa)
-                return_leg_discount = one_way_price * Decimal('0.25')  # 25% discount on return
-                discounted_return_price = one_way_price - return_leg_discount  # Return leg at 75% of original price
-                
-                base_price = one_way_price + discounted_return_price  # Total: original + discounted return
-                # This equals: base_price * 1.75 (original + 75% of original)
-            
-            aircraft_info = {
-                'aircraft': aircraft,
-                'estimated_flight_hours': estimated_flight_hours,
-                'base_price': base_price,
-                'total_price': base_price * (2 if trip_type == 'round_trip' else 1),
-                'can_accommodate': aircraft.aircraft_type.passenger_capacity >= passenger_count,
-                'availability_status': get_availability_status(aircraft, departure_date_start, departure_date_end),
-                'is_empty_leg': is_empty_leg,  # Pass this to template
-                'original_price': calculate_base_price(aircraft, estimated_flight_hours, trip_type) if is_empty_leg else None
-            }
-            aircraft_with_details.append(aircraft_info)
-        
-        # Sort by price and suitability
-        aircraft_with_details.sort(key=lambda x: (not x['can_accommodate'], x['total_price']))
-        
+
+        departure_airport = params['departure_airport']
+        arrival_airport = params['arrival_airport']
+        # Identical route/day/passenger searches are served from the search cache
+        aircraft_with_details = cached_search(params, search_available_aircraft)
+        # Snapshot the prices shown so the booking uses them
+        aircraft_with_details = save_search_quotes(params, aircraft_with_details, request.user)
+
         context = {
             'aircraft_list': aircraft_with_details,
             'departure_airport': departure_airport,
             'arrival_airport': arrival_airport,
-            'departure_datetime': departure_datetime,
-            'return_datetime': return_datetime,
-            'passenger_count': passenger_count,
-            'trip_type': trip_type,
+            'departure_datetime': params['departure_datetime'],
+            'return_datetime': params['return_datetime'],
+            'passenger_count': params['passenger_count'],
+            'trip_type': params['trip_type'],
             'client_email': request.POST.get('client_email'),
             'client_name': request.POST.get('client_name'),
             'special_requests': request.POST.get('special_requests'),
@@ -132,14 +313,18 @@ def find_aircraft(request):
             'total_results': len(aircraft_with_details),
             
             # Empty leg specific context
-            'is_empty_leg': is_empty_leg,
-            'empty_leg_return_date': empty_leg_return_date,
-            'empty_leg_return_time': empty_leg_return_time,
-            'stay_duration_days': stay_duration_days,
+            'is_empty_leg': params['is_empty_leg'],
+            'empty_leg_return_date': params['empty_leg_return_date'],
+            'empty_leg_return_time': params['empty_leg_return_time'],
+            'stay_duration_days': params['stay_duration_days'],
+
+            # Flexible-date search (±N days)
+            'flexible_days': params['flexible_days'],
+            'date_matrix': build_flexible_matrix(params) if params['flexible_days'] else None,
         }
         
         if not aircraft_with_details:
-            messages.info(request, f'No aircraft found for your route {departure_airport.name} to {arrival_airport.name} on {departure_date}. Try adjusting your search criteria.')
+            messages.info(request, f'No aircraft found for your route {departure_airport.name} to {arrival_airport.name} on {params["departure_date"]}. Try adjusting your search criteria.')
         
         return render(request, 'booking/available_aircraft.html', context)
     
@@ -147,180 +332,436 @@ def find_aircraft(request):
     return redirect('index')
 
 
-def find_suitable_aircraft(departure_airport, arrival_airport, departure_date_start, departure_date_end, passenger_count, return_datetime=None):
-    """
-    Find aircraft suitable for the trip with lenient criteria
+@require_http_methods(["GET", "POST"])
+def find_aircraft_flexible(request):
     """
-    # Primary search: Aircraft currently at departure location or nearby
-    aircraft_at_departure = Aircraft.objects.filter(
-        current_location=departure_airport.icao_code,
-        is_active=True,
-        aircraft_type__passenger_capacity__gte=passenger_count
-    ).select_related('aircraft_type', 'owner')
-    
-    # Secondary search: Aircraft that could potentially be positioned
-    # (within reasonable range - you might want to implement distance calculation)
-    aircraft_nearby = Aircraft.objects.filter(
-        is_active=True,
-        aircraft_type__passenger_capacity__gte=passenger_count
-    ).exclude(
-        current_location=departure_airport.icao_code
-    ).select_related('aircraft_type', 'owner')
-    
-    # Filter by availability (more lenient approach)
-    suitable_aircraft = []
-    
-    # Check aircraft at departure location first
-    for aircraft in aircraft_at_departure:
-        if is_aircraft_available(aircraft, departure_date_start, departure_date_end, return_datetime):
-            suitable_aircraft.append(aircraft)
-    
-    # If not enough options, check nearby aircraft (with positioning cost consideration)
-    if len(suitable_aircraft) < 5:  # Show more options
-        for aircraft in aircraft_nearby[:10]:  # Limit to avoid too many queries
-            if is_aircraft_available(aircraft, departure_date_start, departure_date_end, return_datetime):
-                suitable_aircraft.append(aircraft)
-    
-    return suitable_aircraft
-
-
-def is_aircraft_available(aircraft, start_date, end_date, return_datetime=None):
+    JSON twin of the flexible-date search: availability and price of each
+    candidate aircraft for every day within ±flexible_days of departure_date
     """
-    Check if aircraft is available during the requested period
-    More lenient than strict time matching
-    """
-    # Check for conflicting bookings or maintenance periods
-    conflicting_availabilities = aircraft.availabilities.filter(
-        start_datetime__lt=end_date,
-        end_datetime__gt=start_date,
-        is_available=False
-    )
-    
-    if conflicting_availabilities.exists():
-        return False
-    
-    # If it's a round trip, check return date availability too
-    if return_datetime:
-        return_date_start = return_datetime.replace(hour=0, minute=0, second=0)
-        return_date_end = return_datetime.replace(hour=23, minute=59, second=59)
-        
-        conflicting_return = aircraft.availabilities.filter(
-            start_datetime__lt=return_date_end,
-            end_datetime__gt=return_date_start,
-            is_available=False
-        )
-        
-        if conflicting_return.exists():
-            return False
-    
-    return True
+    data = request.POST if request.method == 'POST' else request.GET
+    try:
+        params = parse_search_request(data)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
+    if not params['flexible_days']:
+        params['flexible_days'] = 3
 
-def estimate_flight_time(departure_airport, arrival_airport, aircraft):
+    matrix = build_flexible_matrix(params)
+    return JsonResponse({
+        'success': True,
+        'departure_airport': params['departure_airport'].icao_code,
+        'arrival_airport': params['arrival_airport'].icao_code,
+        'passenger_count': params['passenger_count'],
+        'trip_type': params['trip_type'],
+        'days': [day.isoformat() for day in matrix['days']],
+        'aircraft': [
+            dict(
+                serialize_search_result(row),
+                cells=[
+                    {
+                        'date': cell['date'].isoformat(),
+                        'available': cell['available'],
+                        'status': cell['status'],
+                        'price': float(cell['price']) if cell['price'] is not None else None,
+                    } for cell in row['cells']
+                ],
+            ) for row in matrix['rows']
+        ],
+    })
+
+
+# Fields of a search result exposed by the JSON search API
+SEARCH_RESULT_FIELDS = (
+    'id', 'registration', 'model', 'type', 'passenger_capacity', 'current_location',
+    'can_accommodate', 'availability_status', 'estimated_flight_hours', 'base_price',
+    'total_price', 'is_empty_leg', 'original_price', 'positioning_distance_nm',
+    'positioning_hours', 'positioning_cost', 'fuel_stops',
+)
+
+# Sort keys accepted by the JSON search API, prefix with '-' for descending
+SEARCH_SORT_KEYS = {
+    'price': 'total_price',
+    'flight_time': 'estimated_flight_hours',
+    'distance': 'positioning_distance_nm',
+}
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+
+def serialize_search_result(row):
+    """JSON-friendly version of one search result (a quote_aircraft dict)"""
+    aircraft = row['aircraft']
+
+    def money(value):
+        return float(value) if value is not None else None
+
+    return {
+        'id': aircraft.id,
+        'registration': aircraft.registration_number,
+        'model': aircraft.model_name,
+        'type': aircraft.aircraft_type.name,
+        'passenger_capacity': aircraft.aircraft_type.passenger_capacity,
+        'current_location': aircraft.current_location,
+        'can_accommodate': row['can_accommodate'],
+        'availability_status': row.get('availability_status'),
+        'estimated_flight_hours': row['estimated_flight_hours'],
+        'base_price': money(row['base_price']),
+        'total_price': money(row['total_price']),
+        'is_empty_leg': row['is_empty_leg'],
+        'original_price': money(row['original_price']),
+        'positioning_distance_nm': row['positioning_distance_nm'],
+        'positioning_hours': row['positioning_hours'],
+        'positioning_cost': row['positioning_cost'],
+        'fuel_stops': row['fuel_stops'],
+    }
+
+
+def encode_search_cursor(sort, key):
+    payload = json.dumps({'sort': sort, 'key': key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_search_cursor(cursor, sort):
+    """Return the sort key of the last result of the previous page"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        key = payload['key']
+        if payload['sort'] != sort or len(key) != 3:
+            raise ValueError
+        return [bool(key[0]), float(key[1]), int(key[2])]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor.')
+
+
+@require_http_methods(["GET"])
+@cache_control(public=True, max_age=60)
+def api_search_aircraft(request):
     """
-    Estimate flight time between two airports using aircraft-specific speed.
-    Adds buffer time for taxiing, etc.
+    JSON aircraft search on the same engine (and result cache) as find_aircraft.
+
+    Accepts the search form fields as query parameters plus:
+    - sort: price, flight_time or distance (to position), '-' prefix for descending
+    - limit: page size (default 20, max 100)
+    - cursor: next_cursor of the previous page
+    - fields: comma separated subset of SEARCH_RESULT_FIELDS
     """
     try:
-        import math
+        params = parse_search_request(request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
-        lat1, lon1 = float(departure_airport.latitude), float(departure_airport.longitude)
-        lat2, lon2 = float(arrival_airport.latitude), float(arrival_airport.longitude)
+    sort = request.GET.get('sort', 'price')
+    descending = sort.startswith('-')
+    sort_field = SEARCH_SORT_KEYS.get(sort.lstrip('-'))
+    if sort_field is None:
+        return JsonResponse({'success': False, 'message': f'Unknown sort key. Use one of: {", ".join(SEARCH_SORT_KEYS)}.'}, status=400)
 
-        # Haversine formula for distance in nautical miles
-        R = 3440  # Earth radius in nautical miles
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance_nm = R * c
+    fields = [field for field in request.GET.get('fields', '').split(',') if field]
+    unknown_fields = set(fields) - set(SEARCH_RESULT_FIELDS)
+    if unknown_fields:
+        return JsonResponse({'success': False, 'message': f'Unknown fields: {", ".join(sorted(unknown_fields))}.'}, status=400)
 
-        # Use actual speed from aircraft type
-        speed_knots = aircraft.aircraft_type.speed_knots or 400  # Fallback in case data is missing
-        flight_time = (distance_nm / speed_knots) + 0.5  # Add 30 min buffer
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid limit.'}, status=400)
 
-        return round(flight_time, 1)
-    except Exception as e:
-        # Log error if desired
-        return 2.0  # Fallback time
+    try:
+        after = decode_search_cursor(request.GET['cursor'], sort) if request.GET.get('cursor') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
+    results = cached_search(params, search_available_aircraft)
 
+    # Keyset ordering: missing values last, then the sort value, then aircraft id as tie-breaker
+    def sort_key(row):
+        value = row[sort_field]
+        value = float(value) if value is not None else 0.0
+        return [row[sort_field] is None, -value if descending else value, row['aircraft'].id]
 
+    keyed = sorted(((sort_key(row), row) for row in results), key=lambda item: item[0])
+    if after is not None:
+        keyed = [item for item in keyed if item[0] > after]
+    page = keyed[:limit]
 
-def calculate_base_price(aircraft, flight_hours, trip_type):
+    items = []
+    for _, row in page:
+        item = serialize_search_result(row)
+        items.append({field: item[field] for field in fields} if fields else item)
+
+    return JsonResponse({
+        'success': True,
+        'departure_airport': params['departure_airport'].icao_code,
+        'arrival_airport': params['arrival_airport'].icao_code,
+        'departure_date': params['departure_date'],
+        'passenger_count': params['passenger_count'],
+        'trip_type': params['trip_type'],
+        'sort': sort,
+        'count': len(results),
+        'results': items,
+        'next_cursor': encode_search_cursor(sort, page[-1][0]) if len(keyed) > limit else None,
+    })
+
+
+# Most routes accepted by one batch quote request
+MAX_BATCH_ROUTES = 20
+
+# Widest spread of departure and return dates accepted in one batch quote request
+MAX_BATCH_DATE_SPAN_DAYS = 366
+
+
+def quote_routes(routes):
     """
-    Calculate base price for the flight
+    Quote several (route, date, passengers) searches together.
+
+    The active fleet, every airport involved and the availability of the
+    fleet over all requested days are loaded once. Route distances,
+    positioning distances and flight times for all routes and aircraft are
+    then computed in one pass over the cached airport coordinates, instead of
+    re-running find_aircraft per route. As in the flexible-date matrix,
+    aircraft with confirmed or pending legs on the day are left out.
+
+    Returns one entry per route: {'params': parsed search with 'results'
+    and 'distance_nm'} or {'error': message}.
     """
-    # Convert Decimal to float to avoid type mixing
-    base_rate = float(aircraft.hourly_rate)
-    minimum_hours = float(aircraft.minimum_hours)
-    flight_hours_float = float(flight_hours)
-    
-    # Use minimum hours or actual flight time, whichever is higher
-    billable_hours = max(flight_hours_float, minimum_hours)
-    
-    base_price = base_rate * billable_hours
-    
-    return round(base_price, 2)
+    icao_codes = set()
+    for route in routes:
+        icao_codes.add(str(route.get('departure_airport', '')).upper().strip())
+        icao_codes.add(str(route.get('arrival_airport', '')).upper().strip())
+    airports = {airport.icao_code: airport for airport in Airport.objects.filter(icao_code__in=icao_codes)}
+
+    entries = []
+    for route in routes:
+        try:
+            entries.append({'params': parse_search_request(route, airports=airports)})
+        except ValueError as e:
+            entries.append({'error': str(e)})
+    parsed = [entry['params'] for entry in entries if 'params' in entry]
+    if not parsed:
+        return entries
+
+    # Availability of the whole fleet for every departure and return day, in one range fetch
+    day_starts = []
+    for params in parsed:
+        params['day_start'] = day_bounds(params['departure_datetime'])[0]
+        day_starts.append(params['day_start'])
+        if params['return_datetime']:
+            params['return_day_start'] = day_bounds(params['return_datetime'])[0]
+            day_starts.append(params['return_day_start'])
+    first_day_start = min(day_starts)
+    day_count = (max(day_starts) - first_day_start).days + 1
+    if day_count > MAX_BATCH_DATE_SPAN_DAYS:
+        raise ValueError(f'All dates in a batch must fall within {MAX_BATCH_DATE_SPAN_DAYS} days.')
+
+    fleet = list(Aircraft.objects.filter(is_active=True).select_related('aircraft_type', 'owner'))
+    daily = daily_availability([aircraft.id for aircraft in fleet], first_day_start, day_count)
+
+    points = airport_coordinates.points()
+    fleet_points = [points.get(aircraft.current_location.upper()) for aircraft in fleet]
+    profiles = [flight_profile(aircraft.aircraft_type) for aircraft in fleet]
+    pricing = pricing_engine.table()
+    now = timezone.now()
+
+    # Positioning distances from every departure airport to the whole fleet, in one table
+    departure_codes = list({params['departure_airport'].icao_code for params in parsed})
+    positioning_by_departure = dict(zip(
+        departure_codes,
+        distance_table([points.get(code) for code in departure_codes], fleet_points),
+    ))
+
+    for params in parsed:
+        departure_airport, arrival_airport = params['departure_airport'], params['arrival_airport']
+        positioning = positioning_by_departure[departure_airport.icao_code]
+        route_distance = airport_distances.distance_nm(departure_airport.icao_code, arrival_airport.icao_code)
+        params['distance_nm'] = round(route_distance, 1) if route_distance is not None else None
+
+        departure_offset = (params['day_start'] - first_day_start).days
+        return_offset = (params['return_day_start'] - first_day_start).days if params['return_datetime'] else None
+
+        in_position, elsewhere, plans = [], [], {}
+        for index, aircraft in enumerate(fleet):
+            if aircraft.aircraft_type.passenger_capacity < params['passenger_count']:
+                continue
+            statuses = daily[aircraft.id]
+            if statuses[departure_offset] not in AVAILABLE_DAY_STATUSES:
+                continue
+            if return_offset is not None and statuses[return_offset] not in AVAILABLE_DAY_STATUSES:
+                continue
+            plans[index] = fuel_stop_planner.plan(aircraft.aircraft_type, departure_airport.icao_code, arrival_airport.icao_code)
+            if plans[index] is None:
+                continue
+            if aircraft.current_location == departure_airport.icao_code:
+                in_position.append((0.0, index))
+            else:
+                elsewhere.append((positioning[index], index))
+
+        # Same candidate rule as find_suitable_aircraft: reposition only when few are in place
+        candidates = in_position
+        if len(in_position) < 5:
+            elsewhere.sort(key=lambda item: (item[0] is None, item[0] or 0))
+            candidates = in_position + elsewhere[:MAX_REPOSITIONING_CANDIDATES]
+
+        quoted = []
+        for distance, index in candidates:
+            aircraft = fleet[index]
+            if distance is None:
+                aircraft.positioning_distance_nm = aircraft.positioning_hours = aircraft.positioning_cost = None
+            elif distance == 0:
+                aircraft.positioning_distance_nm = aircraft.positioning_hours = aircraft.positioning_cost = 0.0
+            else:
+                aircraft.positioning_distance_nm = round(distance, 1)
+                aircraft.positioning_hours = round(block_hours(profiles[index], distance), 1)
+                aircraft.positioning_cost = round(aircraft.positioning_hours * float(aircraft.hourly_rate), 2)
+
+            aircraft.route_plan = plans[index]
+            quoted.append(aircraft)
+
+        flight_hours = [quoted_flight_hours(aircraft, departure_airport, arrival_airport) for aircraft in quoted]
+        prices = pricing.quote_fleet(
+            quoted, flight_hours, params['trip_type'], params['is_empty_leg'],
+            params['departure_datetime'], params['return_datetime'], now=now,
+            departure_region=departure_airport.country, return_region=arrival_airport.country
+        )
+        results = []
+        for aircraft, hours, price in zip(quoted, flight_hours, prices):
+            quote = quote_aircraft(
+                aircraft, departure_airport, arrival_airport, params['passenger_count'],
+                params['trip_type'], params['is_empty_leg'], estimated_flight_hours=hours, price=price
+            )
+            quote['availability_status'] = DAY_STATUS_LABELS[daily[aircraft.id][departure_offset]]
+            results.append(quote)
 
+        results.sort(key=lambda x: (not x['can_accommodate'], x['total_price']))
+        params['results'] = results
 
+    return entries
 
-def get_availability_status(aircraft, start_date, end_date):
+
+@login_required
+@require_http_methods(["POST"])
+def api_batch_quote(request):
     """
-    Get a human-readable availability status
+    Quote up to MAX_BATCH_ROUTES searches in one call. Expects a JSON body:
+    {"routes": [{"departure_airport": "HKJK", "arrival_airport": "HKMO",
+                 "departure_date": "2025-07-20", "passenger_count": 4,
+                 "trip_type": "one_way"}, ...]}
+    Each route accepts the same fields as the search form.
     """
-    # Check if there are any specific availability windows
-    availabilities = aircraft.availabilities.filter(
-        start_datetime__lte=end_date,
-        end_datetime__gte=start_date
-    )
-    
-    if not availabilities.exists():
-        return "Available (no restrictions)"
-    
-    available_windows = availabilities.filter(is_available=True)
-    if available_windows.exists():
-        return "Available"
-    else:
-        return "Limited availability"
+    try:
+        routes = json.loads(request.body)['routes']
+        if not isinstance(routes, list) or not all(isinstance(route, dict) for route in routes):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Expected a JSON body with a "routes" list.'}, status=400)
+
+    if not routes or len(routes) > MAX_BATCH_ROUTES:
+        return JsonResponse({'success': False, 'message': f'Send between 1 and {MAX_BATCH_ROUTES} routes.'}, status=400)
+
+    # The search parser expects form values: strings, and 'true' for flags
+    routes = [
+        {key: str(value).lower() if isinstance(value, bool) else str(value) for key, value in route.items()}
+        for route in routes
+    ]
+
+    try:
+        entries = quote_routes(routes)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    quotes = []
+    for index, entry in enumerate(entries):
+        if 'error' in entry:
+            quotes.append({'index': index, 'success': False, 'message': entry['error']})
+            continue
+        params = entry['params']
+        quotes.append({
+            'index': index,
+            'success': True,
+            'departure_airport': params['departure_airport'].icao_code,
+            'arrival_airport': params['arrival_airport'].icao_code,
+            'departure_date': params['departure_date'],
+            'passenger_count': params['passenger_count'],
+            'trip_type': params['trip_type'],
+            'distance_nm': params['distance_nm'],
+            'results': [serialize_search_result(row) for row in params['results']],
+        })
+    return JsonResponse({'success': True, 'quotes': quotes})
+
+
+@require_http_methods(["GET"])
+def api_fleet_free(request):
+    """
+    Active aircraft free on every requested day, from the materialized fleet
+    calendars. Pass either dates=YYYY-MM-DD,YYYY-MM-DD,... or start and end
+    (inclusive), and optionally passenger_count.
+    """
+    try:
+        if request.GET.get('dates'):
+            days = [datetime.strptime(value.strip(), '%Y-%m-%d').date() for value in request.GET['dates'].split(',') if value.strip()]
+        else:
+            start = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.GET.get('end') or request.GET.get('start', ''), '%Y-%m-%d').date()
+            days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        passenger_count = int(request.GET.get('passenger_count', 1))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Pass dates=YYYY-MM-DD,... or start and end dates.'}, status=400)
+
+    if not days or (max(days) - min(days)).days >= CALENDAR_HORIZON_DAYS:
+        return JsonResponse({'success': False, 'message': f'Dates must fall within {CALENDAR_HORIZON_DAYS} days.'}, status=400)
+
+    fleet = {
+        aircraft.id: aircraft
+        for aircraft in Aircraft.objects.filter(
+            is_active=True,
+            aircraft_type__passenger_capacity__gte=passenger_count
+        ).select_related('aircraft_type')
+    }
+    free_ids = free_aircraft_ids(days, list(fleet))
+
+    return JsonResponse({
+        'success': True,
+        'dates': [day.isoformat() for day in sorted(set(days))],
+        'count': len(free_ids),
+        'aircraft': [
+            {
+                'id': aircraft_id,
+                'registration': fleet[aircraft_id].registration_number,
+                'model': fleet[aircraft_id].model_name,
+                'type': fleet[aircraft_id].aircraft_type.name,
+                'passenger_capacity': fleet[aircraft_id].aircraft_type.passenger_capacity,
+                'current_location': fleet[aircraft_id].current_location,
+            } for aircraft_id in free_ids
+        ],
+    })
 
 
 # Additional helper view for AJAX requests (optional)
+@require_http_methods(["GET"])
+@cache_control(public=True, max_age=60)
 def quick_aircraft_search(request):
     """
     Quick AJAX search for aircraft availability
     """
-    if request.method == 'GET':
-        departure = request.GET.get('departure', '').upper()
-        arrival = request.GET.get('arrival', '').upper()
-        date = request.GET.get('date')
-        passengers = int(request.GET.get('passengers', 1))
-        
-        if not all([departure, arrival, date, passengers]):
-            return JsonResponse({'error': 'Missing required parameters'})
-        
-        try:
-            departure_airport = Airport.objects.get(icao_code=departure)
-            arrival_airport = Airport.objects.get(icao_code=arrival)
-            
-            # Quick count of available aircraft
-            aircraft_count = Aircraft.objects.filter(
-                current_location=departure,
-                is_active=True,
-                aircraft_type__passenger_capacity__gte=passengers
-            ).count()
-            
-            return JsonResponse({
-                'aircraft_count': aircraft_count,
-                'route': f"{departure_airport.name} to {arrival_airport.name}",
-                'estimated_flight_time': estimate_flight_time(departure_airport, arrival_airport)
-            })
-            
-        except Airport.DoesNotExist:
-            return JsonResponse({'error': 'Airport not found'})
-    
-    return JsonResponse({'error': 'Invalid request'})
+    try:
+        params = parse_search_request({
+            'departure_airport': request.GET.get('departure', ''),
+            'arrival_airport': request.GET.get('arrival', ''),
+            'departure_date': request.GET.get('date'),
+            'passenger_count': request.GET.get('passengers', 1),
+        })
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
+    results = cached_search(params, search_available_aircraft)
+    flight_times = [row['estimated_flight_hours'] for row in results]
+
+    return JsonResponse({
+        'aircraft_count': len(results),
+        'route': f"{params['departure_airport'].name} to {params['arrival_airport'].name}",
+        'estimated_flight_time': min(flight_times) if flight_times else None,
+    })
 
 def index(request):
     # Get all airports for the dropdown, ordered by name for better UX
@@ -341,6 +782,7 @@ from django.views.decorators.csrf import csrf_exempt
 from .models import Inquiry  # Assuming you have an Inquiry model
 
 @csrf_exempt  # Only if you're having CSRF issues, otherwise remove this
+@idempotent
 def save_inquiry(request):
     if request.method == 'POST':
         try:
@@ -359,8 +801,8 @@ def save_inquiry(request):
             
             return JsonResponse({'success': True})
         except Exception as e:
-            return JsonResponse({'success': False, 'error': str(e)})
-    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
 
 # Optional: Add this view for AJAX search functionality
@@ -1083,6 +1525,7 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
+from .holds import HoldConflict, claim_hold, consume_hold
 import logging
 
 logger = logging.getLogger(__name__)
@@ -1090,6 +1533,42 @@ logger = logging.getLogger(__name__)
 
 @require_http_methods(["POST"])
 @login_required
+def claim_booking_hold(request):
+    """
+    Hold the selected aircraft while the client fills in the booking form.
+    Takes the same aircraft, airport, date and trip fields as create_booking
+    and returns a hold_token to send along with the booking.
+    """
+    data = request.POST
+    try:
+        aircraft = Aircraft.objects.select_related('aircraft_type').get(id=data.get('aircraft_id'), is_active=True)
+        airports = {airport.icao_code: airport for airport in Airport.objects.filter(
+            icao_code__in=[data.get('departure_airport'), data.get('arrival_airport')]
+        )}
+        departure_airport = airports[data.get('departure_airport')]
+        arrival_airport = airports[data.get('arrival_airport')]
+        departure_datetime = timezone.make_aware(datetime.strptime(data.get('departure_datetime', ''), '%Y-%m-%d %H:%M'))
+        return_datetime = None
+        if data.get('return_datetime'):
+            return_datetime = timezone.make_aware(datetime.strptime(data['return_datetime'], '%Y-%m-%d %H:%M'))
+    except (Aircraft.DoesNotExist, KeyError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Invalid aircraft, airport or date selection.'}, status=400)
+
+    flight_hours = routed_flight_hours(aircraft, departure_airport, arrival_airport)
+    if flight_hours is None:
+        return JsonResponse({'success': False, 'message': 'This aircraft cannot fly this route within its range.'}, status=400)
+    legs = booking_leg_times(departure_datetime, return_datetime, data.get('trip_type', 'one_way'), flight_hours)
+    try:
+        token, expires_at = claim_hold(aircraft, legs, user=request.user)
+    except HoldConflict as e:
+        return JsonResponse({'success': False, 'message': f'Aircraft not available: {e}'}, status=409)
+
+    return JsonResponse({'success': True, 'hold_token': str(token), 'expires_at': expires_at.isoformat()})
+
+
+@require_http_methods(["POST"])
+@login_required
+@idempotent
 def create_booking(request):
     """Handle booking creation with empty leg support"""
     try:
@@ -1124,8 +1603,8 @@ def create_booking(request):
         catering_required = data.get('catering_required') == 'on'
         ground_transport = data.get('ground_transport') == 'on'
         
-        # Commission rate (you may want to set this based on user/business logic)
-        commission_rate = Decimal(data.get('commission_rate', '10.00'))  # Default 10%
+        # Commission rate override; defaults to the aircraft type's pricing rule
+        commission_rate = Decimal(data['commission_rate']) if data.get('commission_rate') else None
         
         # Validation
         errors = []
@@ -1180,17 +1659,6 @@ def create_booking(request):
                 'message': 'Please correct the following errors: ' + '; '.join(errors)
             }, status=400)
         
-        # Get related objects
-        try:
-            aircraft = get_object_or_404(Aircraft, id=aircraft_id)
-            departure_airport = get_object_or_404(Airport, icao_code=departure_airport_code)
-            arrival_airport = get_object_or_404(Airport, icao_code=arrival_airport_code)
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'message': f'Invalid aircraft or airport selection: {str(e)}'
-            }, status=400)
-        
         # Parse datetime strings
         try:
             departure_datetime = datetime.strptime(departure_datetime_str, '%Y-%m-%d %H:%M')
@@ -1205,32 +1673,59 @@ def create_booking(request):
                 'success': False,
                 'message': f'Invalid date format: {str(e)}'
             }, status=400)
-        
-        # Calculate flight hours using your existing function
-        flight_hours = Decimal(str(estimate_flight_time(departure_airport, arrival_airport, aircraft)))
-        
-        # Calculate pricing using your existing function that handles minimum hours
-        leg_price = Decimal(str(calculate_base_price(aircraft, flight_hours, trip_type)))
 
-        # Apply empty leg pricing if applicable
-        if is_empty_leg:
-            # Convert leg_price to Decimal for consistent calculations
-            one_way_price = Decimal(str(leg_price))  # This is the initial price (e.g., 9000 from Nairobi to Mombasa)
-            return_leg_discount = one_way_price * Decimal('0.25')  # 25% discount on return
-            discounted_return_price = one_way_price - return_leg_discount  # Return leg at 75% of original price
-            
-            leg_price = one_way_price + discounted_return_price  # Total: original + discounted return
-            # This equals: leg_price * 1.75 (original + 75% of original)
-        
-        # Calculate total price based on trip type
-        if trip_type == 'round_trip':
-            total_price = leg_price * 2
+        # A live quote from the search carries the aircraft, airports, legs and prices the client was shown
+        quote = live_quote(
+            data.get('quote_id'), aircraft_id, departure_airport_code, arrival_airport_code,
+            departure_datetime, return_datetime, trip_type, is_empty_leg, passenger_count
+        )
+
+        if quote:
+            aircraft, departure_airport, arrival_airport = quote.aircraft, quote.departure_airport, quote.arrival_airport
+            requested_legs = quoted_legs(quote)
+            flight_hours = quote.flight_hours
+            leg_prices = [leg['leg_price'] for leg in requested_legs]
+            total_price = Money.from_decimal(quote.total_price)
+            if commission_rate is None:
+                commission_rate = quote.commission_rate
         else:
-            total_price = leg_price
+            # Get related objects
+            try:
+                aircraft = get_object_or_404(Aircraft, id=aircraft_id)
+                departure_airport = get_object_or_404(Airport, icao_code=departure_airport_code)
+                arrival_airport = get_object_or_404(Airport, icao_code=arrival_airport_code)
+            except Exception as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Invalid aircraft or airport selection: {str(e)}'
+                }, status=400)
+
+            # Flight hours as the search quotes them, with fuel stops beyond the aircraft's range
+            flight_hours = routed_flight_hours(aircraft, departure_airport, arrival_airport)
+            if flight_hours is None:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'This aircraft cannot fly this route within its range.'
+                }, status=400)
+            flight_hours = Decimal(str(flight_hours))
+
+            # Price every leg through the compiled pricing rules (minimum hours, surcharges, empty leg return)
+            pricing = pricing_engine.table()
+            price = pricing.quote_trip(
+                aircraft, flight_hours, trip_type, is_empty_leg,
+                departure_datetime, return_datetime, now=timezone.now(),
+                departure_region=departure_airport.country, return_region=arrival_airport.country
+            )
+            leg_prices = price['leg_prices']
+            total_price = price['total_price']
+            if commission_rate is None:
+                commission_rate = Decimal(str(price['commission_rate']))
+
+            # Leg times, as held when the client opened the booking form
+            requested_legs = booking_leg_times(departure_datetime, return_datetime, trip_type, flight_hours)
         
-        # Calculate commission and owner earnings
-        agent_commission = total_price * (commission_rate / 100)
-        owner_earnings = total_price - agent_commission
+        # Calculate commission and owner earnings, in cents so they add up to the total
+        agent_commission, owner_earnings = split_commission(total_price, commission_rate)
         
         # Process empty leg return date/time if provided
         empty_leg_return_datetime = None
@@ -1245,105 +1740,91 @@ def create_booking(request):
                 pass  # If parsing fails, just leave as None
         
         # Create booking with transaction
-        with transaction.atomic():
-            # Create booking with empty leg fields
-            booking = Booking.objects.create(
-                client=request.user,
-                aircraft=aircraft,
-                trip_type=trip_type,
-                commission_rate=commission_rate,
-                total_price=total_price,
-                agent_commission=agent_commission,
-                owner_earnings=owner_earnings,
-                special_requests=special_requests,
-                status='pending',
+        try:
+            with transaction.atomic():
+                # Re-check the aircraft under its row lock, consuming the client's hold
+                consume_hold(aircraft, requested_legs, data.get('hold_token'))
+
+                # Create booking with empty leg fields
+                booking = Booking.objects.create(
+                    client=request.user,
+                    aircraft=aircraft,
+                    trip_type=trip_type,
+                    commission_rate=commission_rate,
+                    total_price=total_price.to_decimal(),
+                    agent_commission=agent_commission.to_decimal(),
+                    owner_earnings=owner_earnings.to_decimal(),
+                    special_requests=special_requests,
+                    status='pending',
                 
-                # Empty leg specific fields
-                is_empty_leg=is_empty_leg,
-                return_date=empty_leg_return_datetime.date() if empty_leg_return_datetime else None,
-                return_time=empty_leg_return_datetime.time() if empty_leg_return_datetime else None,
-                stay_duration_days=int(stay_duration_days) if stay_duration_days else None,
-            )
-            
-            # Create flight legs
-            flight_legs = []
-            
-            # First leg (departure)
-            arrival_datetime = departure_datetime + timedelta(hours=float(flight_hours))
-            first_leg = FlightLeg.objects.create(
-                booking=booking,
-                departure_airport=departure_airport,
-                arrival_airport=arrival_airport,
-                departure_datetime=departure_datetime,
-                arrival_datetime=arrival_datetime,
-                flight_hours=flight_hours,
-                passenger_count=passenger_count,
-                leg_price=leg_price,
-                sequence=1
-            )
-            flight_legs.append(first_leg)
-            
-            # Second leg for round trip
-            if trip_type == 'round_trip' and return_datetime:
-                return_arrival_datetime = return_datetime + timedelta(hours=float(flight_hours))
-                second_leg = FlightLeg.objects.create(
-                    booking=booking,
-                    departure_airport=arrival_airport,  # Swap airports for return
-                    arrival_airport=departure_airport,
-                    departure_datetime=return_datetime,
-                    arrival_datetime=return_arrival_datetime,
-                    flight_hours=flight_hours,
-                    passenger_count=passenger_count,
-                    leg_price=leg_price,
-                    sequence=2
+                    # Empty leg specific fields
+                    is_empty_leg=is_empty_leg,
+                    return_date=empty_leg_return_datetime.date() if empty_leg_return_datetime else None,
+                    return_time=empty_leg_return_datetime.time() if empty_leg_return_datetime else None,
+                    stay_duration_days=int(stay_duration_days) if stay_duration_days else None,
                 )
-                flight_legs.append(second_leg)
+                if quote:
+                    Quote.objects.filter(pk=quote.pk).update(booking=booking)
             
-            # Create passenger records
-            for i, passenger_data in enumerate(passengers_data):
-                Passenger.objects.create(
-                    booking=booking,
-                    name=passenger_data['name'],
-                    date_of_birth=passenger_data['date_of_birth'],
-                    passport_number=passenger_data['passport_number'],
-                    nationality=passenger_data['nationality']
+                # Create the flight legs (outbound, then the return of a round trip with the airports swapped)
+                # and passenger records with one insert each
+                airports = [(departure_airport, arrival_airport), (arrival_airport, departure_airport)]
+                flight_legs = save_legs_and_passengers(
+                    booking,
+                    [
+                        FlightLeg(
+                            departure_airport=leg_departure,
+                            arrival_airport=leg_arrival,
+                            departure_datetime=leg['departure_datetime'],
+                            arrival_datetime=leg['arrival_datetime'],
+                            flight_hours=flight_hours,
+                            passenger_count=passenger_count,
+                            leg_price=leg_price.to_decimal(),
+                            sequence=sequence,
+                        )
+                        for sequence, (leg, leg_price, (leg_departure, leg_arrival))
+                        in enumerate(zip(requested_legs, leg_prices, airports), start=1)
+                    ],
+                    [Passenger(**passenger_data) for passenger_data in passengers_data],
                 )
 
-            # Send confirmation email to client
-            try:
+                # Queue the confirmation email with the booking; it is sent in the background after commit
                 send_booking_email_confirmation(
                     booking, client_name, client_email, client_phone, 
                     company_name, flight_legs, passengers_data, 
                     catering_required, ground_transport
                 )
-                logger.info(f"Confirmation email sent to {client_email} for booking #{booking.id}")
-            except Exception as e:
-                logger.error(f"Failed to send confirmation email for booking #{booking.id}: {str(e)}")
-                # Don't fail the booking creation if email fails
-            
-            # Log the booking creation
-            logger.info(f"Booking created: #{booking.id} by user {request.user.username} - Empty Leg: {is_empty_leg}")
-            
+        except HoldConflict as e:
             return JsonResponse({
-                'success': True,
-                'message': f'{"Empty leg booking" if is_empty_leg else "Booking"} request submitted successfully. A confirmation email has been sent.',
-                'booking_id': booking.id,
-                'total_price': float(total_price),
-                'agent_commission': float(agent_commission),
-                'owner_earnings': float(owner_earnings),
-                'is_empty_leg': is_empty_leg,
-                'flight_legs': [
-                    {
-                        'sequence': leg.sequence,
-                        'departure': f"{leg.departure_airport.icao_code}",
-                        'arrival': f"{leg.arrival_airport.icao_code}",
-                        'departure_time': leg.departure_datetime.isoformat(),
-                        'flight_hours': float(leg.flight_hours),
-                        'leg_price': float(leg.leg_price)
-                    } for leg in flight_legs
-                ]
-            })
-    
+                'success': False,
+                'message': f'Aircraft not available: {e}'
+            }, status=409)
+
+        logger.info(f"Confirmation email queued for {client_email} for booking #{booking.id}")
+        
+        # Log the booking creation
+        logger.info(f"Booking created: #{booking.id} by user {request.user.username} - Empty Leg: {is_empty_leg}")
+        
+        return JsonResponse({
+            'success': True,
+            'message': f'{"Empty leg booking" if is_empty_leg else "Booking"} request submitted successfully. A confirmation email will be sent to you shortly.',
+            'booking_id': booking.id,
+            'total_price': float(total_price),
+            'agent_commission': float(agent_commission),
+            'owner_earnings': float(owner_earnings),
+            'is_empty_leg': is_empty_leg,
+            'flight_legs': [
+                {
+                    'sequence': leg.sequence,
+                    'departure': f"{leg.departure_airport.icao_code}",
+                    'arrival': f"{leg.arrival_airport.icao_code}",
+                    'departure_time': leg.departure_datetime.isoformat(),
+                    'flight_hours': float(leg.flight_hours),
+                    'leg_price': float(leg.leg_price)
+                } for leg in flight_legs
+            ]
+        })
+
     except Exception as e:
         logger.error(f"Booking creation error: {str(e)}")
         return JsonResponse({
@@ -1353,7 +1834,7 @@ def create_booking(request):
 
 
 def send_booking_email_confirmation(booking, client_name, client_email, client_phone, company_name, flight_legs, passengers_data, catering_required, ground_transport):
-    """Send booking confirmation email to client"""
+    """Queue the booking confirmation email to the client"""
     
     subject = f'Flight Booking Confirmation - #{booking.id}'
     
@@ -1381,14 +1862,13 @@ def send_booking_email_confirmation(booking, client_name, client_email, client_p
         plain_message = create_plain_text_confirmation(context)
         html_message = None
     
-    # Send email
-    send_mail(
+    # Queue the email; send_outbox_emails delivers it once the booking commits
+    enqueue_email(
         subject=subject,
         message=plain_message,
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[client_email],
         html_message=html_message,
-        fail_silently=False,
     )
 
 
@@ -1589,6 +2069,7 @@ import json
 
 @csrf_exempt
 @require_POST
+@idempotent
 def submit_cargo_request(request):
     try:
         data = json.loads(request.body)
@@ -1636,6 +2117,7 @@ logger = logging.getLogger(__name__)
 
 @csrf_exempt
 @require_POST
+@idempotent
 def submit_leasing_inquiry(request):
     try:
         # Get form data
@@ -1705,24 +2187,19 @@ def submit_leasing_inquiry(request):
                 }, status=400)
             leasing_inquiry.supporting_document_2 = supporting_document_2
         
-        # Save the inquiry
-        leasing_inquiry.save()
-        
-        # Send confirmation email
-        try:
+        # Save the inquiry and queue its confirmation email together; the email is sent in the background
+        with transaction.atomic():
+            leasing_inquiry.save()
             send_leasing_inquiry_confirmation(
                 leasing_inquiry, name, email, company, telephone, 
                 leasing_type, requirements, duration,
                 supporting_document_1, supporting_document_2
             )
-            logger.info(f"Leasing inquiry confirmation email sent to {email} for inquiry #{leasing_inquiry.id}")
-        except Exception as e:
-            logger.error(f"Failed to send confirmation email for leasing inquiry #{leasing_inquiry.id}: {str(e)}")
-            # Don't fail the inquiry submission if email fails
+        logger.info(f"Leasing inquiry confirmation email queued for {email} for inquiry #{leasing_inquiry.id}")
         
         return JsonResponse({
             'status': 'success',
-            'message': 'Your leasing inquiry has been submitted successfully! A confirmation email has been sent.'
+            'message': 'Your leasing inquiry has been submitted successfully! A confirmation email will be sent to you shortly.'
         })
         
     except Exception as e:
@@ -1733,7 +2210,7 @@ def submit_leasing_inquiry(request):
 
 
 def send_leasing_inquiry_confirmation(inquiry, name, email, company, telephone, leasing_type, requirements, duration, doc1, doc2):
-    """Send leasing inquiry confirmation email to client"""
+    """Queue the leasing inquiry confirmation email to the client"""
     
     subject = f'Aircraft Leasing Inquiry Confirmation - #{inquiry.id}'
     
@@ -1762,14 +2239,13 @@ def send_leasing_inquiry_confirmation(inquiry, name, email, company, telephone,
         plain_message = create_leasing_inquiry_text_confirmation(context)
         html_message = None
     
-    # Send email
-    send_mail(
+    # Queue the email; send_outbox_emails delivers it once the inquiry commits
+    enqueue_email(
         subject=subject,
         message=plain_message,
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[email],
         html_message=html_message,
-        fail_silently=False,
     )
 
 
@@ -4158,44 +4634,20 @@ from .models import (
 from .forms import (
     BookingForm, FlightLegForm, PassengerForm, ClientAccountForm
 )
+from .availability import availability_index
 
-def check_aircraft_availability(aircraft, flight_legs):
+def check_aircraft_availability(aircraft, flight_legs, refresh=False):
     """
     Check if aircraft is available for all flight legs
     Returns: (is_available, message)
+
+    Answered from the in-process availability index; pass refresh=True to
+    reload the aircraft's schedule from the database first.
     """
-    for leg in flight_legs:
-        departure_time = leg['departure_datetime']
-        arrival_time = leg['arrival_datetime']
-        
-        # Check for overlapping bookings
-        overlapping_bookings = Booking.objects.filter(
-            aircraft=aircraft,
-            status__in=['confirmed', 'pending'],
-            flight_legs__departure_datetime__lt=arrival_time,
-            flight_legs__arrival_datetime__gt=departure_time
-        ).exists()
-        
-        if overlapping_bookings:
-            return False, f"Aircraft not available from {departure_time} to {arrival_time}"
-        
-        # Check availability windows if they exist
-        availability_exists = Availability.objects.filter(
-            aircraft=aircraft,
-            start_datetime__lte=departure_time,
-            end_datetime__gte=arrival_time,
-            is_available=True
-        ).exists()
-        
-        # If availability records exist, aircraft must be in an available window
-        if Availability.objects.filter(aircraft=aircraft).exists() and not availability_exists:
-            return False, f"Aircraft not in available window for {departure_time} to {arrival_time}"
-    
-    return True, "Aircraft is available"
+    return availability_index.check(aircraft.id, flight_legs, refresh=refresh)
 
 
 import json
-import math
 from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
@@ -4204,98 +4656,127 @@ from django.http import JsonResponse
 from datetime import datetime
 
 
-def estimate_flight_time(departure_airport, arrival_airport, aircraft):
+def serialize_airport_point(airport, distance_nm=None):
+    result = {
+        'icao_code': airport.icao_code,
+        'iata_code': airport.iata_code,
+        'name': airport.name,
+        'city': airport.city,
+        'country': airport.country,
+        'latitude': airport.latitude,
+        'longitude': airport.longitude,
+        'is_private_aviation_friendly': airport.is_private_aviation_friendly,
+    }
+    if distance_nm is not None:
+        result['distance_nm'] = round(distance_nm, 1)
+    return result
+
+
+@require_http_methods(["GET"])
+def api_airports_nearby(request):
     """
-    Estimate flight time between two airports using aircraft-specific speed.
-    This matches your working implementation from the first view.
+    Airports around an airport (icao=HKJK) or a point (lat=..&lon=..), from
+    the in-memory spatial index. Pass radius_nm for every airport within that
+    distance, otherwise the `limit` nearest (default 5) are returned. Add
+    private_only=true to keep private-aviation friendly airports only.
     """
     try:
-        # Convert coordinates to float (handles both string and numeric inputs)
-        lat1, lon1 = float(departure_airport.latitude), float(departure_airport.longitude)
-        lat2, lon2 = float(arrival_airport.latitude), float(arrival_airport.longitude)
-
-        # Haversine formula for distance in nautical miles
-        R = 3440  # Earth radius in nautical miles
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance_nm = R * c
-
-        # Use actual speed from aircraft type
-        speed_knots = aircraft.aircraft_type.speed_knots or 400  # Fallback in case data is missing
-        flight_time = (distance_nm / speed_knots) + 0.5  # Add 30 min buffer
-
-        return round(flight_time, 1)
-    except Exception as e:
-        # Log error if desired
-        return 2.0  # Fallback time
+        if request.GET.get('icao'):
+            origin = airport_index.get(request.GET['icao'])
+            if origin is None:
+                return JsonResponse({'success': False, 'message': 'Unknown airport.'}, status=404)
+            latitude, longitude = origin.latitude, origin.longitude
+        else:
+            latitude, longitude = float(request.GET['lat']), float(request.GET['lon'])
+        radius_nm = float(request.GET['radius_nm']) if request.GET.get('radius_nm') else None
+        limit = int(request.GET.get('limit', 5))
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Pass icao, or lat and lon, with an optional radius_nm or limit.'}, status=400)
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return JsonResponse({'success': False, 'message': 'Coordinates out of range.'}, status=400)
+    private_only = request.GET.get('private_only') == 'true'
+    limit = max(1, min(limit, MAX_NEARBY_RESULTS))
+
+    if radius_nm is not None:
+        radius_nm = max(0.0, min(radius_nm, MAX_NEARBY_RADIUS_NM))
+        matches = airport_index.within_radius(latitude, longitude, radius_nm, private_only=private_only)[:MAX_NEARBY_RESULTS]
+    else:
+        matches = airport_index.nearest(latitude, longitude, limit, private_only=private_only)
+
+    return JsonResponse({
+        'success': True,
+        'count': len(matches),
+        'airports': [serialize_airport_point(airport, distance) for airport, distance in matches],
+    })
 
 
-def calculate_base_price(aircraft, flight_hours, trip_type):
+@require_http_methods(["GET"])
+def api_airports_in_bbox(request):
     """
-    Calculate base price for the flight.
-    This matches your working implementation from the first view.
+    Airports inside min_lat, min_lon, max_lat, max_lon (e.g. the visible map
+    area). A box with min_lon > max_lon crosses the antimeridian.
     """
-    # Convert Decimal to float to avoid type mixing
-    base_rate = float(aircraft.hourly_rate)
-    minimum_hours = float(aircraft.minimum_hours)
-    flight_hours_float = float(flight_hours)
-    
-    # Use minimum hours or actual flight time, whichever is higher
-    billable_hours = max(flight_hours_float, minimum_hours)
-    
-    base_price = base_rate * billable_hours
-    
-    return round(base_price, 2)
+    try:
+        box = [float(request.GET[key]) for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Pass min_lat, min_lon, max_lat and max_lon.'}, status=400)
+
+    airports = airport_index.in_bounding_box(*box, private_only=request.GET.get('private_only') == 'true')
+    return JsonResponse({
+        'success': True,
+        'count': len(airports),
+        'airports': [serialize_airport_point(airport) for airport in airports],
+    })
 
 
-def calculate_pricing(aircraft, flight_legs, trip_type, minimum_type='smart'):
+def estimate_flight_time(departure_airport, arrival_airport, aircraft):
     """
-    Simplified pricing calculation matching your first view's logic.
-    Removed complex surcharges and discounts to match working implementation.
+    Estimate flight time between two airports using the aircraft type's
+    climb, cruise and descent profile plus its taxi allowance.
+
+    Results are memoized per (profile, airport pair); see flight_time.py.
+    """
+    flight_time = flight_time_model.leg_hours(aircraft.aircraft_type, departure_airport.icao_code, arrival_airport.icao_code)
+    if flight_time is None:
+        return 2.0  # Fallback time for airports without coordinates
+    return flight_time
+
+
+def calculate_pricing(aircraft, flight_legs, trip_type, minimum_type='smart', is_empty_leg=False):
+    """
+    Price explicit flight legs through the compiled pricing rules (pricing.py),
+    leg by leg exactly as PricingTable.quote_trip prices a search result:
+    each leg bills at least the aircraft's minimum hours at its hourly rate,
+    adjusted for peak season (the Season calendar of the departure country),
+    weekend and last-minute departures, plus the discounted empty-leg return
+    for empty legs; the agent commission rate comes from the aircraft type's
+    pricing rule.
     
     Args:
         aircraft: Aircraft instance
-        flight_legs: List of flight leg data
+        flight_legs: List of flight leg data, with Airport instances as departure_airport
         trip_type: Type of trip (one_way, round_trip, multi_leg)
         minimum_type: How to apply minimum hours (kept for compatibility)
+        is_empty_leg: Whether the legs are booked as empty legs
     
-    Returns: pricing_details dictionary
+    Returns: pricing_details dictionary, with the price of every leg in leg_prices
     """
-    total_price = 0.0
-    total_hours = 0.0
-    actual_flight_hours = 0.0
-    
-    # Process each flight leg using the same logic as your working view
-    for leg in flight_legs:
-        flight_hours = float(leg['flight_hours'])
-        actual_flight_hours += flight_hours
-        
-        # Use the same pricing logic as your working view
-        leg_base_price = calculate_base_price(aircraft, flight_hours, trip_type)
-        total_price += leg_base_price
-        
-        # Calculate billable hours for this leg (for reporting)
-        base_rate = float(aircraft.hourly_rate)
-        minimum_hours = float(aircraft.minimum_hours)
-        billable_hours = max(flight_hours, minimum_hours)
-        total_hours += billable_hours
-    
-    # For round trips, double the price (matching your working view logic)
-    if trip_type == 'round_trip' and len(flight_legs) == 2:
-        total_price = total_price  # Already calculated per leg
-    
-    # Calculate commission (simple 10% like your working view)
-    commission_rate = Decimal('10.00')  # 10%
-    agent_commission = Decimal(str(total_price)) * (commission_rate / 100)
-    owner_earnings = Decimal(str(total_price)) - agent_commission
+    pricing = pricing_engine.table()
+    leg_prices, total_hours, actual_flight_hours = pricing.price_legs(
+        aircraft, flight_legs, now=timezone.now(), is_empty_leg=is_empty_leg
+    )
+    total_price = sum(leg_prices, Money())
+
+    commission_rate = Decimal(str(pricing.commission_rate(aircraft)))
+    agent_commission, owner_earnings = split_commission(total_price, commission_rate)
     
     return {
-        'total_price': Decimal(str(total_price)),
+        'total_price': total_price.to_decimal(),
+        'leg_prices': [price.to_decimal() for price in leg_prices],
         'commission_rate': commission_rate,
-        'agent_commission': agent_commission,
-        'owner_earnings': owner_earnings,
+        'agent_commission': agent_commission.to_decimal(),
+        'owner_earnings': owner_earnings.to_decimal(),
         'total_hours': Decimal(str(total_hours)),
         'actual_flight_hours': Decimal(str(actual_flight_hours)),
         'base_hourly_rate': aircraft.hourly_rate,
@@ -4304,35 +4785,6 @@ def calculate_pricing(aircraft, flight_legs, trip_type, minimum_type='smart'):
     }
 
 
-def calculate_flight_hours_haversine(departure_lat, departure_lng, arrival_lat, arrival_lng, aircraft_speed_knots):
-    """
-    Updated to match your working implementation's logic exactly
-    """
-    try:
-        # Convert latitude and longitude from degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [departure_lat, departure_lng, arrival_lat, arrival_lng])
-        
-        # Haversine formula (matching your working implementation)
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        # Earth's radius in nautical miles (matching your working implementation)
-        r = 3440  # Same as your working implementation
-        
-        # Distance in nautical miles
-        distance_nm = c * r
-        
-        # Use 30-minute buffer like your working implementation (0.5 hours)
-        flight_hours = (distance_nm / aircraft_speed_knots) + 0.5
-        
-        return round(flight_hours, 1)  # Match your working implementation's precision
-        
-    except Exception as e:
-        return 2.0  # Same fallback as your working implementation
-
-
 def ajax_calculate_flight_hours(request):
     """
     Updated AJAX endpoint using your working implementation's logic
@@ -4478,14 +4930,18 @@ def new_booking(request):
                 aircraft = booking.aircraft
                 trip_type = booking.trip_type
                 
-                # Check aircraft availability
-                available, availability_message = check_aircraft_availability(aircraft, valid_legs)
-                if not available:
-                    messages.error(request, f'Aircraft not available: {availability_message}')
-                else:
+                # Check aircraft availability under its row lock (held until this view's transaction
+                # commits), including other clients' booking holds
+                try:
+                    consume_hold(aircraft, valid_legs)
+                    available = True
+                except HoldConflict as e:
+                    available = False
+                    messages.error(request, f'Aircraft not available: {e}')
+                if available:
                     # Calculate pricing using your working implementation's logic
                     try:
-                        pricing_details = calculate_pricing(aircraft, valid_legs, trip_type)
+                        pricing_details = calculate_pricing(aircraft, valid_legs, trip_type, is_empty_leg=booking.is_empty_leg)
                         
                         # Set booking financials
                         booking.total_price = pricing_details['total_price']
@@ -4496,30 +4952,32 @@ def new_booking(request):
                         # Save the booking
                         booking.save()
                         
-                        # Save flight legs
-                        for i, leg_data in enumerate(valid_legs):
-                            FlightLeg.objects.create(
-                                booking=booking,
-                                sequence=i + 1,
-                                departure_airport=leg_data['departure_airport'],
-                                arrival_airport=leg_data['arrival_airport'],
-                                departure_datetime=leg_data['departure_datetime'],
-                                arrival_datetime=leg_data['arrival_datetime'],
-                                flight_hours=leg_data['flight_hours'],
-                                passenger_count=passenger_count,
-                                leg_price=pricing_details['total_price'] / len(valid_legs)
-                            )
-                        
-                        # Save passengers
-                        for form in valid_passenger_forms:
-                            passenger_data = form.cleaned_data
-                            Passenger.objects.create(
-                                booking=booking,
-                                name=passenger_data['name'],
-                                nationality=passenger_data.get('nationality', ''),
-                                date_of_birth=passenger_data.get('date_of_birth'),
-                                passport_number=passenger_data.get('passport_number', '')
-                            )
+                        # Save flight legs and passengers with one insert each
+                        save_legs_and_passengers(
+                            booking,
+                            [
+                                FlightLeg(
+                                    sequence=i + 1,
+                                    departure_airport=leg_data['departure_airport'],
+                                    arrival_airport=leg_data['arrival_airport'],
+                                    departure_datetime=leg_data['departure_datetime'],
+                                    arrival_datetime=leg_data['arrival_datetime'],
+                                    flight_hours=leg_data['flight_hours'],
+                                    passenger_count=passenger_count,
+                                    leg_price=pricing_details['leg_prices'][i]
+                                )
+                                for i, leg_data in enumerate(valid_legs)
+                            ],
+                            [
+                                Passenger(
+                                    name=form.cleaned_data['name'],
+                                    nationality=form.cleaned_data.get('nationality', ''),
+                                    date_of_birth=form.cleaned_data.get('date_of_birth'),
+                                    passport_number=form.cleaned_data.get('passport_number', '')
+                                )
+                                for form in valid_passenger_forms
+                            ],
+                        )
                         
                         messages.success(
                             request, 
@@ -4587,17 +5045,22 @@ def ajax_calculate_price(request):
             aircraft_id = data.get('aircraft_id')
             flight_legs = data.get('flight_legs', [])
             trip_type = data.get('trip_type', 'one_way')
+            is_empty_leg = bool(data.get('is_empty_leg'))
             
             aircraft = get_object_or_404(Aircraft, id=aircraft_id)
             
+            # Seasons are looked up for the country each leg departs from, as when the booking is saved
+            airports = Airport.objects.in_bulk({leg['departure_airport'] for leg in flight_legs if leg.get('departure_airport')})
+            
             # Convert string dates to datetime objects and ensure flight_hours is Decimal
             for leg in flight_legs:
+                leg['departure_airport'] = airports.get(int(leg['departure_airport'])) if leg.get('departure_airport') else None
                 leg['departure_datetime'] = datetime.fromisoformat(leg['departure_datetime'].replace('Z', '+00:00'))
                 leg['arrival_datetime'] = datetime.fromisoformat(leg['arrival_datetime'].replace('Z', '+00:00'))
                 leg['flight_hours'] = Decimal(str(leg['flight_hours']))
             
-            # Use your working implementation's pricing logic
-            pricing_details = calculate_pricing(aircraft, flight_legs, trip_type)
+            # Price the legs exactly as new_booking will save them
+            pricing_details = calculate_pricing(aircraft, flight_legs, trip_type, is_empty_leg=is_empty_leg)
             
             # Convert Decimal objects to float for JSON serialization
             response_data = {
@@ -4731,7 +5194,11 @@ def flightleg_list(request):
     query = request.GET.get('q', '')
     flightlegs = FlightLeg.objects.select_related('booking', 'departure_airport', 'arrival_airport').all()
     
-    if query:
+    # A booking code is matched exactly however it was typed
+    code = typed_code(query)
+    if code:
+        flightlegs = flightlegs.filter(booking__booking_order_id=code)
+    elif query:
         flightlegs = flightlegs.filter(
             Q(booking__booking_order_id__icontains=query) |
             Q(departure_airport__icao_code__icontains=query) |
@@ -4885,6 +5352,7 @@ def api_pricing_rules_list(request):
                 'peak_season_multiplier': str(rule.peak_season_multiplier),
                 'weekend_surcharge': str(rule.weekend_surcharge),
                 'last_minute_surcharge': str(rule.last_minute_surcharge),
+                'agent_commission_rate': str(rule.agent_commission_rate),
             })
         
         return JsonResponse({
@@ -4934,6 +5402,7 @@ def api_pricing_rule_create(request):
                 peak_season_multiplier=Decimal(str(data.get('peak_season_multiplier', '1.0'))),
                 weekend_surcharge=Decimal(str(data.get('weekend_surcharge', '0'))),
                 last_minute_surcharge=Decimal(str(data.get('last_minute_surcharge', '0'))),
+                agent_commission_rate=Decimal(str(data.get('agent_commission_rate', '10.00'))),
             )
         
         return JsonResponse({
@@ -4968,6 +5437,7 @@ def api_pricing_rule_detail(request, pk):
         'peak_season_multiplier': str(rule.peak_season_multiplier),
         'weekend_surcharge': str(rule.weekend_surcharge),
         'last_minute_surcharge': str(rule.last_minute_surcharge),
+        'agent_commission_rate': str(rule.agent_commission_rate),
     }
     
     return JsonResponse(data)
@@ -5001,7 +5471,8 @@ def api_pricing_rule_update(request, pk):
         # Update other fields
         decimal_fields = [
             'base_hourly_rate', 'minimum_hours', 'empty_leg_discount',
-            'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge'
+            'peak_season_multiplier', 'weekend_surcharge', 'last_minute_surcharge',
+            'agent_commission_rate'
         ]
         
         for field in decimal_fields:
@@ -5073,6 +5544,7 @@ def pricing_rule_create_view(request):
                 peak_season_multiplier=Decimal(request.POST.get('peak_season_multiplier', '1.0')),
                 weekend_surcharge=Decimal(request.POST.get('weekend_surcharge', '0')),
                 last_minute_surcharge=Decimal(request.POST.get('last_minute_surcharge', '0')),
+                agent_commission_rate=Decimal(request.POST.get('agent_commission_rate', '10.00')),
             )
             
             messages.success(request, 'Pricing rule created successfully')
@@ -5109,6 +5581,7 @@ def pricing_rule_update_view(request, pk):
             rule.peak_season_multiplier = Decimal(request.POST.get('peak_season_multiplier', rule.peak_season_multiplier))
             rule.weekend_surcharge = Decimal(request.POST.get('weekend_surcharge', rule.weekend_surcharge))
             rule.last_minute_surcharge = Decimal(request.POST.get('last_minute_surcharge', rule.last_minute_surcharge))
+            rule.agent_commission_rate = Decimal(request.POST.get('agent_commission_rate', rule.agent_commission_rate))
             
             rule.save()
             messages.success(request, 'Pricing rule updated successfully')
@@ -5170,8 +5643,11 @@ def owner_payments_list(request):
     # Base queryset
     payments = OwnerPayout.objects.select_related('owner', 'booking', 'booking__aircraft').all()
     
-    # Apply search filter
-    if search_query:
+    # Apply search filter; a booking code is matched exactly however it was typed
+    code = typed_code(search_query)
+    if code:
+        payments = payments.filter(booking__booking_order_id=code)
+    elif search_query:
         payments = payments.filter(
             Q(owner__username__icontains=search_query) |
             Q(owner__email__icontains=search_query) |
@@ -5263,69 +5739,54 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from .models import Aircraft, AircraftTracking
+from django.db.models import OuterRef, Subquery
 import json
+import math
 from django.core.serializers import serialize
 from decimal import Decimal
 
 @login_required
 def live_tracking(request):
-    # Get all active aircraft 
-    aircrafts = Aircraft.objects.filter( is_active=True).select_related('aircraft_type')
-    
-    # Get the latest tracking data for each aircraft
+    # Get all active aircraft, each annotated with the id of its latest tracking point
+    latest_point = AircraftTracking.objects.filter(aircraft=OuterRef('pk')).order_by('-timestamp').values('pk')[:1]
+    aircrafts = Aircraft.objects.filter(is_active=True).select_related('aircraft_type').annotate(
+        latest_tracking_id=Subquery(latest_point)
+    )
+
+    # Fetch the latest tracking points for all aircraft in one query, reading the float radian columns
+    latest_tracking = {
+        point['aircraft_id']: point
+        for point in AircraftTracking.objects.filter(
+            pk__in=[aircraft.latest_tracking_id for aircraft in aircrafts if aircraft.latest_tracking_id]
+        ).values('aircraft_id', 'latitude_radians', 'longitude_radians', 'altitude', 'heading', 'speed', 'timestamp')
+    }
+
     aircraft_data = []
     
     for aircraft in aircrafts:
-        try:
-            # Get the latest tracking data
-            latest_tracking = AircraftTracking.objects.filter(aircraft=aircraft).latest('timestamp')
-            
-            # Safely convert coordinates to float
-            try:
-                latitude = float(latest_tracking.latitude) if latest_tracking.latitude else None
-                longitude = float(latest_tracking.longitude) if latest_tracking.longitude else None
-            except (ValueError, TypeError):
-                latitude = None
-                longitude = None
-            
-            # Only include aircraft with valid coordinates
-            if latitude is not None and longitude is not None and not (latitude == 0 and longitude == 0):
-                aircraft_info = {
-                    'id': aircraft.id,
-                    'registration': aircraft.registration_number,
-                    'model': aircraft.model_name,
-                    'type': aircraft.aircraft_type.name if aircraft.aircraft_type else 'Unknown',
-                    'current_location': aircraft.current_location or 'Unknown',
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'altitude': latest_tracking.altitude or 0,
-                    'heading': latest_tracking.heading or 0,
-                    'speed': latest_tracking.speed or 0,
-                    'timestamp': latest_tracking.timestamp.isoformat(),
-                    'status': 'In Flight' if (latest_tracking.altitude or 0) > 500 else 'On Ground'
-                }
-            else:
-                # Aircraft with no valid location data
-                aircraft_info = {
-                    'id': aircraft.id,
-                    'registration': aircraft.registration_number,
-                    'model': aircraft.model_name,
-                    'type': aircraft.aircraft_type.name if aircraft.aircraft_type else 'Unknown',
-                    'current_location': aircraft.base_airport or 'Unknown',
-                    'latitude': None,  # Don't include on map
-                    'longitude': None,  # Don't include on map
-                    'altitude': 0,
-                    'heading': 0,
-                    'speed': 0,
-                    'timestamp': timezone.now().isoformat(),
-                    'status': 'No Data'
-                }
-            
-            aircraft_data.append(aircraft_info)
-            
-        except AircraftTracking.DoesNotExist:
-            # If no tracking data exists at all
-            aircraft_data.append({
+        point = latest_tracking.get(aircraft.id)
+        latitude = round(math.degrees(point['latitude_radians']), 6) if point else None
+        longitude = round(math.degrees(point['longitude_radians']), 6) if point else None
+
+        # Only include aircraft with valid coordinates
+        if latitude is not None and longitude is not None and not (latitude == 0 and longitude == 0):
+            aircraft_info = {
+                'id': aircraft.id,
+                'registration': aircraft.registration_number,
+                'model': aircraft.model_name,
+                'type': aircraft.aircraft_type.name if aircraft.aircraft_type else 'Unknown',
+                'current_location': aircraft.current_location or 'Unknown',
+                'latitude': latitude,
+                'longitude': longitude,
+                'altitude': point['altitude'] or 0,
+                'heading': point['heading'] or 0,
+                'speed': point['speed'] or 0,
+                'timestamp': point['timestamp'].isoformat(),
+                'status': 'In Flight' if (point['altitude'] or 0) > 500 else 'On Ground'
+            }
+        else:
+            # Aircraft with no tracking data or no valid location
+            aircraft_info = {
                 'id': aircraft.id,
                 'registration': aircraft.registration_number,
                 'model': aircraft.model_name,
@@ -5338,7 +5799,9 @@ def live_tracking(request):
                 'speed': 0,
                 'timestamp': timezone.now().isoformat(),
                 'status': 'No Data'
-            })
+            }
+        
+        aircraft_data.append(aircraft_info)
     
     # Filter aircraft with valid coordinates for the map
     map_aircraft_data = [aircraft for aircraft in aircraft_data if aircraft['latitude'] is not None and aircraft['longitude'] is not None]